@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+import wirecloud.commons.utils.cache
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0002_alter_json_description'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogueresource',
+            name='cache_generation',
+            field=models.BigIntegerField(default=wirecloud.commons.utils.cache.new_generation, editable=False, verbose_name='Cache generation'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from wirecloud.commons.utils.version import Version
+
+
+def version_sortable_forwards(apps, schema_editor):
+
+    CatalogueResource = apps.get_model("catalogue", "CatalogueResource")
+    for resource in CatalogueResource.objects.only('version').iterator():
+        CatalogueResource.objects.filter(pk=resource.pk).update(version_sortable=Version(resource.version).sortable_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0003_catalogueresource_cache_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogueresource',
+            name='version_sortable',
+            field=models.CharField(default='', editable=False, max_length=255, verbose_name='Sortable version'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(version_sortable_forwards, migrations.RunPython.noop),
+        migrations.AlterIndexTogether(
+            name='catalogueresource',
+            index_together=set([('vendor', 'short_name', 'version_sortable')]),
+        ),
+    ]
@@ -19,18 +19,21 @@
 
 from __future__ import unicode_literals
 
-import random
 from six.moves.urllib.parse import urlparse, urljoin
 
 from django.contrib.auth.models import User, Group
 from django.core.cache import cache
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import pre_save
+from django.dispatch import receiver
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
 from wirecloud.commons.fields import JSONField
+from wirecloud.commons.utils.cache import new_generation
 from wirecloud.commons.utils.http import get_absolute_reverse_url
 from wirecloud.commons.utils.template.parsers import TemplateParser
+from wirecloud.commons.utils.version import Version
 
 
 @python_2_unicode_compatible
@@ -47,6 +50,7 @@ class CatalogueResource(models.Model):
     vendor = models.CharField(_('Vendor'), max_length=250)
     short_name = models.CharField(_('Name'), max_length=250)
     version = models.CharField(_('Version'), max_length=150)
+    version_sortable = models.CharField(_('Sortable version'), max_length=255, editable=False)
     type = models.SmallIntegerField(_('Type'), choices=TYPE_CHOICES, null=False, blank=False)
 
     # Person who added the resource to catalogue!
@@ -61,31 +65,13 @@ class CatalogueResource(models.Model):
     popularity = models.DecimalField(_('popularity'), default=0, max_digits=2, decimal_places=1)
 
     json_description = JSONField(_('JSON description'))
+    cache_generation = models.BigIntegerField(_('Cache generation'), default=new_generation, editable=False)
 
     @property
     def local_uri_part(self):
 
         return self.vendor + '/' + self.short_name + '/' + self.version
 
-    @property
-    def cache_version_key(self):
-        return '_catalogue_resource_version/%s' % self.id
-
-    @property
-    def cache_version(self):
-        version = cache.get(self.cache_version_key)
-        if version is None:
-            version = random.randrange(1, 100000)
-            cache.set(self.cache_version_key, version)
-
-        return version
-
-    def invalidate_cache(self):
-        try:
-            cache.incr(self.cache_version_key)
-        except ValueError:
-            pass
-
     def is_available_for(self, user):
 
         return self.public or self.users.filter(id=user.id).exists() or len(set(self.groups.all()) & set(user.groups.all())) > 0
@@ -110,8 +96,35 @@ class CatalogueResource(models.Model):
         else:
             lang = None
 
-        parser = self.get_template(request, url_pattern_name=url_pattern_name)
-        return parser.get_resource_processed_info(lang=lang, process_urls=process_urls, translate=True, process_variables=process_variables)
+        if lang is None:
+            from django.utils import translation
+            lang = translation.get_language()
+
+        template_uri = self.get_template_url(request=request, url_pattern_name=url_pattern_name)
+        key = '_catalogue_resource_info/%s/%s/%s?process_urls=%s&process_variables=%s&base=%s' % (self.cache_generation, self.id, lang, process_urls, process_variables, template_uri)
+        info = cache.get(key)
+        if info is None:
+            parser = TemplateParser(self.json_description, base=template_uri)
+            info = parser.get_resource_processed_info(lang=lang, process_urls=process_urls, translate=True, process_variables=process_variables)
+            cache.set(key, info)
+
+        return info
+
+    def save(self, *args, **kwargs):
+
+        if self._state.adding or self.pk is None:
+            super(CatalogueResource, self).save(*args, **kwargs)
+            return
+
+        # The description may have changed, discard any cached info. The
+        # generation is atomically incremented before storing the changes, so
+        # the row remains locked until the new contents are committed and
+        # concurrent updates cannot reuse the same generation
+        with transaction.atomic():
+            if CatalogueResource.objects.filter(pk=self.pk).update(cache_generation=models.F('cache_generation') + 1) > 0:
+                self.refresh_from_db(fields=('cache_generation',))
+
+            super(CatalogueResource, self).save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
 
@@ -130,9 +143,6 @@ class CatalogueResource(models.Model):
             # TODO log this error
             pass  # ignore errors
 
-        # Remove cache for this resource
-        self.invalidate_cache()
-
         # Remove id attribute definetly
         self.id = None
 
@@ -145,11 +155,18 @@ class CatalogueResource(models.Model):
 
     class Meta:
         unique_together = ("short_name", "vendor", "version")
+        index_together = (("vendor", "short_name", "version_sortable"),)
 
     def __str__(self):
         return self.local_uri_part
 
 
+@receiver(pre_save, sender=CatalogueResource)
+def update_version_sortable(sender, instance, **kwargs):
+    # Also applied when loading fixtures (raw saves)
+    instance.version_sortable = Version(instance.version).sortable_key
+
+
 def get_template_url(vendor, name, version, url, request=None, url_pattern_name='wirecloud_catalogue.media'):
 
     if urlparse(url).scheme == '':
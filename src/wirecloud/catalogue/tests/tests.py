@@ -21,17 +21,20 @@ from __future__ import unicode_literals
 
 import json
 import os
+import shutil
 
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.http import Http404
 from django.test import Client, TestCase, TransactionTestCase
 from django.test.utils import override_settings
+from django.utils import translation
 from mock import MagicMock, Mock, patch
 
+import wirecloud.catalogue.models
 import wirecloud.catalogue.utils
 from wirecloud.catalogue.models import CatalogueResource
-from wirecloud.catalogue.utils import get_resource_data
+from wirecloud.catalogue.utils import get_latest_resource_versions, get_newer_resource_versions, get_resource_data, get_resources
 from wirecloud.catalogue.views import serve_catalogue_media
 from wirecloud.commons.utils.testcases import uses_extra_resources, WirecloudTestCase
 
@@ -393,6 +396,79 @@ class CatalogueAPITestCase(WirecloudTestCase, TransactionTestCase):
         self.assertEqual(len(result_json['resources']), 1)
         self.assertEqual(result_json['resources'][0]['lastVersion'], '1.10')
 
+    def test_last_version_query_budget(self):
+
+        self.client.login(username='test', password='admin')
+        resources = []
+
+        def add_resources(size):
+            for i in range(len(resources), size):
+                resources.append({'name': 'widget%s' % i, 'vendor': 'Test'})
+
+        def check_versions():
+            result = self.client.post(reverse('wirecloud_catalogue.resource_versions'), json.dumps(resources), **self.basic_request_meta)
+            self.assertEqual(result.status_code, 200)
+
+        add_resources(1)
+        with self.assertWithinBudget('wirecloud_catalogue.resource_versions', 'POST'):
+            check_versions()
+
+        self.assertQueryCountScales(add_resources, check_versions)
+
+    def test_get_resources(self):
+
+        with self.assertNumQueries(1):
+            result = get_resources((('Test', 'widget1', '1.10'), ('Test', 'widget2', '1.0'), ('Test', 'widget1', '0.404')))
+
+        self.assertEqual(set(result.keys()), {('Test', 'widget1', '1.10'), ('Test', 'widget2', '1.0')})
+        self.assertEqual(result[('Test', 'widget1', '1.10')].short_name, 'widget1')
+        self.assertEqual(get_resources(()), {})
+
+    def test_latest_resource_versions(self):
+
+        with self.assertNumQueries(1):
+            result = get_latest_resource_versions((('Test', 'widget1'), ('Test', 'widget2'), ('Test', 'inexistantwidget')))
+
+        self.assertEqual(set(result.keys()), {('Test', 'widget1'), ('Test', 'widget2')})
+        self.assertEqual(result[('Test', 'widget1')].version, '1.10')
+        self.assertEqual(result[('Test', 'widget2')].version, '1.0')
+        self.assertEqual(get_latest_resource_versions(()), {})
+
+    def test_newer_resource_versions(self):
+
+        with self.assertNumQueries(1):
+            result = get_newer_resource_versions((('Test', 'widget1', '1.2'), ('Test', 'widget2', '1.0'), ('Wirecloud', 'test', '0.0.1')))
+
+        self.assertEqual(set(result.keys()), {('Test', 'widget1'), ('Wirecloud', 'test')})
+        self.assertEqual([resource.version for resource in result[('Test', 'widget1')]], ['1.10'])
+        self.assertEqual(get_newer_resource_versions((('Test', 'widget1', '1.10'),)), {})
+
+    def test_resource_cache_generation(self):
+
+        resource = CatalogueResource.objects.get(vendor='Test', short_name='widget1', version='1.10')
+        generation = resource.cache_generation
+
+        # Saving the resource increments its generation
+        resource.popularity = 2
+        resource.save()
+        self.assertEqual(resource.cache_generation, generation + 1)
+        self.assertEqual(CatalogueResource.objects.get(pk=resource.pk).cache_generation, generation + 1)
+
+        resource.save(update_fields=('popularity',))
+        self.assertEqual(resource.cache_generation, generation + 2)
+
+        # Processed info is cached using the current generation
+        with patch('wirecloud.catalogue.models.cache') as cache_mock:
+            cache_mock.get.return_value = None
+            resource.get_processed_info()
+
+        self.assertEqual(cache_mock.get.call_count, 1)
+        self.assertTrue(cache_mock.get.call_args[0][0].startswith('_catalogue_resource_info/%s/%s/' % (generation + 2, resource.id)))
+
+        # New resources start after any previously used generation
+        new_resource = CatalogueResource.objects.create(vendor='Test', short_name='mashup', version='1.0', type=1, creation_date=resource.creation_date, json_description={})
+        self.assertGreater(new_resource.cache_generation, generation + 2)
+
     @uses_extra_resources(('Wirecloud_Test_1.0.wgt',), shared=True, public=True)
     def test_resource_entry_get(self):
 
@@ -514,7 +590,7 @@ class CatalogueAPITestCase(WirecloudTestCase, TransactionTestCase):
 
         url = reverse('wirecloud_catalogue.resource_userguide_entry', kwargs={'vendor': 'Wirecloud', 'name': 'Test', 'version': '1.0'})
 
-        with patch('wirecloud.catalogue.views.download_local_file', side_effect=Exception):
+        with patch('wirecloud.catalogue.views.get_rendered_doc', return_value=None):
             response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
             self.assertEqual(response.status_code, 200)
             response_text = response.content.decode('utf-8').lower()
@@ -525,11 +601,10 @@ class CatalogueAPITestCase(WirecloudTestCase, TransactionTestCase):
 
         url = reverse('wirecloud_catalogue.resource_userguide_entry', kwargs={'vendor': 'Test', 'name': 'widget1', 'version': '1.2'})
 
-        with patch('wirecloud.catalogue.views.download_local_file', side_effect=Exception):
-            response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
-            self.assertEqual(response.status_code, 200)
-            response_text = response.content.decode('utf-8').lower()
-            self.assertIn('http://example.org/doc', response_text)
+        response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+        self.assertEqual(response.status_code, 200)
+        response_text = response.content.decode('utf-8').lower()
+        self.assertIn('http://example.org/doc', response_text)
 
     @uses_extra_resources(('Wirecloud_Test_2.0.wgt',), shared=True, public=True)
     def test_resource_changelog_entry_from_version(self):
@@ -540,6 +615,74 @@ class CatalogueAPITestCase(WirecloudTestCase, TransactionTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertNotIn('1.0', response.content.decode('utf-8'))
 
+    @uses_extra_resources(('Wirecloud_Test_2.0.wgt',), shared=True, public=True)
+    def test_resource_changelog_entry_prerendered(self):
+
+        url = reverse('wirecloud_catalogue.resource_changelog_entry', kwargs={'vendor': 'Wirecloud', 'name': 'Test', 'version': '2.0'})
+        base_dir = wirecloud.catalogue.utils.wgt_deployer.get_base_dir('Wirecloud', 'Test', '2.0')
+        self.assertTrue(os.path.exists(os.path.join(base_dir, '.rendered', 'changelog.json')))
+
+        # Changelogs are rendered at install time
+        with patch('wirecloud.catalogue.utils.markdown') as markdown_mock:
+            response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+            filtered_response = self.client.get(url + '?from=1.0', HTTP_ACCEPT='application/xhtml+xml')
+
+        self.assertFalse(markdown_mock.markdown.called)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('1.0', response.content.decode('utf-8'))
+        self.assertEqual(filtered_response.status_code, 200)
+        self.assertNotIn('1.0', filtered_response.content.decode('utf-8'))
+        self.assertNotEqual(response['ETag'], filtered_response['ETag'])
+
+        response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    @uses_extra_resources(('Wirecloud_Test_1.0.wgt',), shared=True, public=True)
+    def test_resource_userguide_entry_rendered_on_first_use(self):
+
+        url = reverse('wirecloud_catalogue.resource_userguide_entry', kwargs={'vendor': 'Wirecloud', 'name': 'Test', 'version': '1.0'})
+        response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+
+        # Simulate a component installed by a previous version
+        base_dir = wirecloud.catalogue.utils.wgt_deployer.get_base_dir('Wirecloud', 'Test', '1.0')
+        shutil.rmtree(os.path.join(base_dir, '.rendered'))
+
+        response2 = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+        self.assertEqual(response2.status_code, 200)
+        self.assertEqual(response2.content, response.content)
+        self.assertEqual(response2['ETag'], response['ETag'])
+        self.assertTrue(os.path.exists(os.path.join(base_dir, '.rendered', 'doc.json')))
+
+    @uses_extra_resources(('Wirecloud_Test_1.0.wgt',), shared=True, public=True)
+    def test_resource_userguide_entry_rendered_docs_cannot_be_stored(self):
+
+        url = reverse('wirecloud_catalogue.resource_userguide_entry', kwargs={'vendor': 'Wirecloud', 'name': 'Test', 'version': '1.0'})
+        response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+
+        base_dir = wirecloud.catalogue.utils.wgt_deployer.get_base_dir('Wirecloud', 'Test', '1.0')
+        shutil.rmtree(os.path.join(base_dir, '.rendered'))
+
+        with patch('wirecloud.catalogue.utils.tempfile.mkstemp', side_effect=OSError):
+            response2 = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+
+        self.assertEqual(response2.status_code, 200)
+        self.assertEqual(response2.content, response.content)
+        self.assertFalse(os.path.exists(os.path.join(base_dir, '.rendered', 'doc.json')))
+
+    @uses_extra_resources(('Wirecloud_api-test_0.9.wgt',), shared=True, public=True)
+    def test_resource_userguide_entry_malformed_doc(self):
+
+        # api-test is installed although its userguide is not valid XHTML
+        base_dir = wirecloud.catalogue.utils.wgt_deployer.get_base_dir('Wirecloud', 'api-test', '0.9')
+        self.assertFalse(os.path.exists(os.path.join(base_dir, '.rendered', 'doc.json')))
+
+        url = reverse('wirecloud_catalogue.resource_userguide_entry', kwargs={'vendor': 'Wirecloud', 'name': 'api-test', 'version': '0.9'})
+        response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+        self.assertEqual(response.status_code, 200)
+        response_text = response.content.decode('utf-8').lower()
+        self.assertIn('error', response_text)
+        self.assertIn('userguide', response_text)
+
     def test_resource_changelog_entry_missing_component(self):
 
         url = reverse('wirecloud_catalogue.resource_changelog_entry', kwargs={'vendor': 'Wirecloud', 'name': 'nonexistent', 'version': '1.0'})
@@ -561,13 +704,31 @@ class CatalogueAPITestCase(WirecloudTestCase, TransactionTestCase):
 
         url = reverse('wirecloud_catalogue.resource_changelog_entry', kwargs={'vendor': 'Wirecloud', 'name': 'Test', 'version': '1.0'})
 
-        with patch('wirecloud.catalogue.views.download_local_file', side_effect=Exception):
+        with patch('wirecloud.catalogue.views.get_rendered_doc', return_value=None):
             response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
             self.assertEqual(response.status_code, 200)
             response_text = response.content.decode('utf-8').lower()
             self.assertIn('error', response_text)
             self.assertIn('changelog', response_text)
 
+    def test_resource_processed_info_is_cached_per_language(self):
+
+        resource = CatalogueResource.objects.get(vendor='Test', short_name='widget1', version='1.2')
+
+        with patch('wirecloud.catalogue.models.TemplateParser', wraps=wirecloud.catalogue.models.TemplateParser) as parser_mock:
+            info = resource.get_processed_info()
+            self.assertEqual(resource.get_processed_info(), info)
+            self.assertEqual(parser_mock.call_count, 1)
+
+            with translation.override('es'):
+                resource.get_processed_info()
+            self.assertEqual(parser_mock.call_count, 2)
+
+            # Saving the resource discards the cached info
+            resource.save()
+            resource.get_processed_info()
+            self.assertEqual(parser_mock.call_count, 3)
+
 
 class WGTDeploymentTestCase(WirecloudTestCase, TransactionTestCase):
 
@@ -18,30 +18,43 @@
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
 import errno
+import hashlib
+import io
 from io import BytesIO
 import json
+import logging
 import os
 import re
 from six.moves.urllib.parse import urljoin
 from six.moves.urllib.request import pathname2url, url2pathname
+import tempfile
 import time
 
 from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.db.models import OuterRef, Q, Subquery
 from django.utils import timezone
 from django.utils.translation import get_language, ugettext as _
 import markdown
 
 from wirecloud.catalogue.models import CatalogueResource
 from wirecloud.commons.utils.downloader import download_http_content, download_local_file
-from wirecloud.commons.utils.html import clean_html
-from wirecloud.commons.utils.http import get_absolute_reverse_url, force_trailing_slash
+from wirecloud.commons.utils.html import clean_html, get_changelog_sections
+from wirecloud.commons.utils.http import get_absolute_reverse_url, get_current_domain, get_current_scheme, force_trailing_slash
 from wirecloud.commons.utils.template import ObsoleteFormatError, TemplateParser, TemplateFormatError, TemplateParseException
+from wirecloud.commons.utils.timing import timed
 from wirecloud.commons.utils.version import Version
 from wirecloud.commons.utils.wgt import InvalidContents, WgtDeployer, WgtFile
 
 
+logger = logging.getLogger(__name__)
+
 wgt_deployer = WgtDeployer(settings.CATALOGUE_MEDIA_ROOT)
 
+DOC_KEYS = ('longdescription', 'doc', 'changelog')
+RENDERED_DOCS_DIR = '.rendered'
+RENDERED_DOCS_ORIGIN = 'http://rendered-docs.wirecloud.invalid/'
+
 
 def extract_resource_media_from_package(template, package, base_path):
 
@@ -82,7 +95,16 @@ def extract_resource_media_from_package(template, package, base_path):
     return overrides
 
 
-def check_invalid_doc_entry(wgt_file, doc_path):
+@timed('markdown')
+def render_doc_markdown(code, key):
+
+    if key == 'longdescription':
+        return markdown.markdown(code, output_format='xhtml5')
+    else:
+        return markdown.markdown(code, output_format='xhtml5', extensions=['markdown.extensions.codehilite', 'markdown.extensions.fenced_code'])
+
+
+def check_invalid_doc_entry(wgt_file, doc_path, key=None):
 
     try:
         doc_code = wgt_file.read(doc_path)
@@ -95,26 +117,35 @@ def check_invalid_doc_entry(wgt_file, doc_path):
         raise InvalidContents('file is not encoded using UTF-8: %s' % doc_path)
 
     try:
-        markdown.markdown(doc_code, output_format='xhtml5', extensions=['markdown.extensions.codehilite', 'markdown.extensions.fenced_code'])
+        return render_doc_markdown(doc_code, key)
     except:
         raise InvalidContents("file cannot be parsed as markdown: %s" % doc_path)
 
 
 def check_invalid_doc_content(wgt_file, resource_info, key):
+    """
+    Checks the documentation file referenced by the given field, returning
+    the rendered version of each of its translations (indexed by language,
+    ``None`` is used for the default version).
+    """
 
+    rendered = {}
     doc_url = resource_info[key]
     if doc_url != '' and not doc_url.startswith(('http://', 'https://')):
         doc_path = url2pathname(doc_url)
 
         # Check default version
-        check_invalid_doc_entry(wgt_file, doc_path)
+        rendered[None] = check_invalid_doc_entry(wgt_file, doc_path, key)
 
         # Check localized versions
         (doc_filename_root, doc_filename_ext) = os.path.splitext(doc_path)
-        pattern = re.escape(doc_filename_root) + '\.\w\w(?:-\w\w)?' + re.escape(doc_filename_ext)
+        pattern = re.escape(doc_filename_root) + '\.(\w\w(?:-\w\w)?)' + re.escape(doc_filename_ext)
         for filename in wgt_file.namelist():
-            if re.match(pattern, filename):
-                check_invalid_doc_entry(wgt_file, filename)
+            match = re.match(pattern, filename)
+            if match:
+                rendered[match.group(1)] = check_invalid_doc_entry(wgt_file, filename, key)
+
+    return rendered
 
 
 def check_invalid_image(wgt_file, resource_info, key):
@@ -181,11 +212,175 @@ def check_packaged_resource(wgt_file, resource_info=None):
 
     check_invalid_image(wgt_file, resource_info, 'image')
     check_invalid_image(wgt_file, resource_info, 'smartphoneimage')
-    check_invalid_doc_content(wgt_file, resource_info, 'longdescription')
-    check_invalid_doc_content(wgt_file, resource_info, 'doc')
-    check_invalid_doc_content(wgt_file, resource_info, 'changelog')
+    rendered_docs = dict((key, check_invalid_doc_content(wgt_file, resource_info, key)) for key in DOC_KEYS)
     check_invalid_embedded_resources(wgt_file, resource_info)
 
+    return rendered_docs
+
+
+def get_rendered_docs_path(base_dir, key, lang=None):
+
+    filename = key if lang is None else key + '.' + lang
+    return os.path.join(base_dir, RENDERED_DOCS_DIR, filename + '.json')
+
+
+def get_rendered_doc_base_url(vendor, name, version, doc_url):
+    """
+    Returns the base URL used for rendering documentation files. A
+    placeholder is used instead of the scheme and the domain, so the
+    rendered code can be served from any domain (see ``get_rendered_doc``).
+    """
+
+    base_url = urljoin(RENDERED_DOCS_ORIGIN, reverse('wirecloud_catalogue.media', kwargs={
+        'vendor': vendor,
+        'name': name,
+        'version': version,
+        'file_path': '',
+    }))
+    return force_trailing_slash(urljoin(base_url, pathname2url(os.path.dirname(url2pathname(doc_url)))))
+
+
+def store_rendered_doc(base_dir, key, lang, code, base_url, locales=None):
+
+    rendered = {
+        'code': clean_html(code, base_url=base_url),
+        'sections': None,
+    }
+    rendered['etag'] = hashlib.sha1(rendered['code'].encode('utf-8')).hexdigest()
+    if locales is not None:
+        rendered['locales'] = sorted(locales)
+
+    if key == 'changelog':
+        sections = get_changelog_sections(code)
+        if sections is not None:
+            prefix, sections = sections
+            rendered['sections'] = [prefix, [(version, clean_html(section, base_url=base_url)) for version, section in sections]]
+
+    path = get_rendered_docs_path(base_dir, key, lang)
+    directory = os.path.dirname(path)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(rendered, ensure_ascii=False))
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        logger.warning('Error storing rendered documentation file: %s' % path)
+
+    return rendered
+
+
+def render_resource_docs(vendor, name, version, resource_info, base_dir, rendered_docs=None):
+    """
+    Renders (markdown + html sanitization) the documentation files of a
+    component (long description, user guide and changelog), storing the
+    result next to its extracted media. ``rendered_docs`` can be used for
+    passing the markdown already rendered by ``check_packaged_resource``,
+    otherwise the extracted files are used. Returns the rendered documents
+    indexed by key and language (see ``store_rendered_doc``).
+    """
+
+    result = {}
+    for key in DOC_KEYS:
+        doc_url = resource_info[key]
+        if doc_url == '' or doc_url.startswith(('http://', 'https://', '//', '/')):
+            continue
+
+        if rendered_docs is not None:
+            docs = rendered_docs[key]
+        else:
+            docs = {}
+            doc_path = os.path.join(base_dir, url2pathname(doc_url))
+            (doc_filename_root, doc_filename_ext) = os.path.splitext(os.path.basename(doc_path))
+            pattern = re.compile(re.escape(doc_filename_root) + r'(?:\.(\w\w(?:-\w\w)?))?' + re.escape(doc_filename_ext) + '$')
+            try:
+                filenames = os.listdir(os.path.dirname(doc_path))
+            except OSError:
+                filenames = []
+
+            for filename in filenames:
+                match = pattern.match(filename)
+                if match is None:
+                    continue
+
+                try:
+                    doc_code = download_local_file(os.path.join(os.path.dirname(doc_path), filename)).decode('utf-8')
+                    docs[match.group(1)] = render_doc_markdown(doc_code, key)
+                except:
+                    logger.warning('Error rendering documentation file: %s' % filename)
+
+        if None not in docs:
+            continue
+
+        base_url = get_rendered_doc_base_url(vendor, name, version, doc_url)
+        rendered = {}
+        for lang in docs:
+            if lang is None:
+                continue
+
+            try:
+                rendered[lang] = store_rendered_doc(base_dir, key, lang, docs[lang], base_url)
+            except:
+                logger.warning('Error rendering documentation file: %s (%s)' % (doc_url, lang))
+
+        # Malformed documents are not stored, so they are rendered again on
+        # first use (see get_rendered_doc)
+        try:
+            rendered[None] = store_rendered_doc(base_dir, key, None, docs[None], base_url, locales=list(rendered))
+        except:
+            logger.warning('Error rendering documentation file: %s' % doc_url)
+            continue
+
+        result[key] = rendered
+
+    return result
+
+
+def get_rendered_doc(resource, key, lang=None, request=None):
+    """
+    Returns the rendered version of a documentation file of the given
+    resource (see ``render_resource_docs``) as a dict with the code, the
+    changelog sections and an ETag, using the translation for the given
+    language if available. Documentation of resources installed by previous
+    versions is rendered on first use. Returns ``None`` if the documentation
+    file is not available.
+    """
+
+    base_dir = wgt_deployer.get_base_dir(resource.vendor, resource.short_name, resource.version)
+    default_path = get_rendered_docs_path(base_dir, key)
+    rendered_docs = {}
+    if not os.path.exists(default_path):
+        rendered_docs = render_resource_docs(resource.vendor, resource.short_name, resource.version, resource.json_description, base_dir).get(key, {})
+
+    if lang is None:
+        lang = get_language()
+
+    try:
+        with io.open(default_path, 'r', encoding='utf-8') as f:
+            rendered = json.load(f)
+
+        if lang in rendered['locales']:
+            with io.open(get_rendered_docs_path(base_dir, key, lang), 'r', encoding='utf-8') as f:
+                rendered = json.load(f)
+    except (IOError, OSError, ValueError):
+        # Rendered documents cannot be stored (see store_rendered_doc), use
+        # the ones rendered by this call
+        if None not in rendered_docs:
+            return None
+
+        rendered = rendered_docs.get(lang, rendered_docs[None])
+
+    origin = get_current_scheme(request) + '://' + get_current_domain(request) + '/'
+    rendered['code'] = rendered['code'].replace(RENDERED_DOCS_ORIGIN, origin)
+    if rendered['sections'] is not None:
+        prefix, sections = rendered['sections']
+        rendered['sections'] = (prefix.replace(RENDERED_DOCS_ORIGIN, origin), [(version, section.replace(RENDERED_DOCS_ORIGIN, origin)) for version, section in sections])
+    rendered['etag'] = '"%s"' % hashlib.sha1((rendered['etag'] + origin).encode('utf-8')).hexdigest()
+
+    return rendered
+
 
 def add_packaged_resource(file, user, wgt_file=None, template=None, deploy_only=False):
 
@@ -207,7 +402,7 @@ def add_packaged_resource(file, user, wgt_file=None, template=None, deploy_only=
     )
     file_name = '_'.join(resource_id) + '.wgt'
 
-    check_packaged_resource(wgt_file, resource_info)
+    rendered_docs = check_packaged_resource(wgt_file, resource_info)
 
     local_dir = wgt_deployer.get_base_dir(*resource_id)
     local_wgt = os.path.join(local_dir, file_name)
@@ -216,6 +411,7 @@ def add_packaged_resource(file, user, wgt_file=None, template=None, deploy_only=
         os.makedirs(local_dir)
 
     overrides = extract_resource_media_from_package(template, wgt_file, local_dir)
+    render_resource_docs(resource_info['vendor'], resource_info['name'], resource_info['version'], resource_info, local_dir, rendered_docs)
     if close_wgt:
         wgt_file.close()
 
@@ -258,27 +454,11 @@ def get_resource_data(resource, user, request=None):
     cdate = resource.creation_date
     creation_timestamp = time.mktime(cdate.timetuple()) * 1e3 + cdate.microsecond / 1e3
 
-    longdescription = resource_info['longdescription']
-    if longdescription != '':
-        longdescription_relative_path = url2pathname(longdescription)
-        longdescription_base_url = force_trailing_slash(urljoin(resource.get_template_url(request=request, for_base=True), pathname2url(os.path.dirname(longdescription_relative_path))))
-        longdescription_path = os.path.join(wgt_deployer.get_base_dir(resource.vendor, resource.short_name, resource.version), longdescription_relative_path)
-
-        (filename_root, filename_ext) = os.path.splitext(longdescription_path)
-        localized_longdescription_path = filename_root + '.' + get_language() + filename_ext
-
-        try:
-            description_code = download_local_file(localized_longdescription_path).decode('utf-8')
-            longdescription = clean_html(markdown.markdown(description_code, output_format='xhtml5'), base_url=longdescription_base_url)
-        except:
-            try:
-                description_code = download_local_file(longdescription_path).decode('utf-8')
-                longdescription = clean_html(markdown.markdown(description_code, output_format='xhtml5'), base_url=longdescription_base_url)
-            except:
-                longdescription = resource_info['description']
-
-    else:
-        longdescription = resource_info['description']
+    longdescription = resource_info['description']
+    if resource_info['longdescription'] != '':
+        rendered = get_rendered_doc(resource, 'longdescription', request=request)
+        if rendered is not None:
+            longdescription = rendered['code']
 
     return {
         'id': resource.pk,
@@ -327,21 +507,71 @@ def get_resource_group_data(resources, user, request=None):
     return data
 
 
+def _build_components_query(components):
+
+    query = Q(pk__in=())
+    for vendor, name in components:
+        query |= Q(vendor=vendor, short_name=name)
+
+    return query
+
+
 def get_latest_resource_version(name, vendor):
 
-    resources = CatalogueResource.objects.filter(vendor=vendor, short_name=name)
-    if resources.count() > 0:
-        newest_version = Version(resources[0].version)
-        newest_resource = resources[0]
-        for resource in resources[1:]:
-            current_version = Version(resource.version)
-            if current_version > newest_version:
-                newest_version = current_version
-                newest_resource = resource
+    return CatalogueResource.objects.filter(vendor=vendor, short_name=name).order_by('-version_sortable').first()
+
+
+def get_latest_resource_versions(components):
+    """
+    Returns a dict with the latest version of each of the given components
+    (a list of (vendor, name) pairs), using a single query. Components not
+    available in the catalogue are not included.
+    """
+
+    components = set(components)
+    if len(components) == 0:
+        return {}
+
+    latest_version = CatalogueResource.objects.filter(vendor=OuterRef('vendor'), short_name=OuterRef('short_name')).order_by('-version_sortable').values('version_sortable')[:1]
+    resources = CatalogueResource.objects.filter(_build_components_query(components), version_sortable=Subquery(latest_version))
+
+    return dict(((resource.vendor, resource.short_name), resource) for resource in resources)
+
+
+def get_newer_resource_versions(components):
+    """
+    Returns a dict with the versions newer than the given ones for each of
+    the components (a list of (vendor, name, version) tuples), using a single
+    query. Versions are sorted from the newest to the oldest one.
+    """
+
+    query = Q(pk__in=())
+    for vendor, name, version in components:
+        query |= Q(vendor=vendor, short_name=name, version_sortable__gt=Version(version).sortable_key)
+
+    result = {}
+    for resource in CatalogueResource.objects.filter(query).order_by('-version_sortable'):
+        result.setdefault((resource.vendor, resource.short_name), []).append(resource)
+
+    return result
+
+
+def get_resources(components):
+    """
+    Returns a dict with the resources identified by the given (vendor, name,
+    version) tuples, using a single query. Components not available in the
+    catalogue are not included.
+    """
+
+    components = set(components)
+    if len(components) == 0:
+        return {}
 
-        return newest_resource
+    query = Q(pk__in=())
+    for vendor, name, version in components:
+        query |= Q(vendor=vendor, short_name=name, version=version)
 
-    return None
+    return dict(((resource.vendor, resource.short_name, resource.version), resource) for resource in CatalogueResource.objects.filter(query))
 
 
 def update_resource_catalogue_cache(orm=None):
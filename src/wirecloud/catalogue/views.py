@@ -20,10 +20,7 @@
 from __future__ import unicode_literals
 
 from io import BytesIO
-import os
 import json
-from six.moves.urllib.parse import urljoin
-from six.moves.urllib.request import pathname2url, url2pathname
 
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
@@ -33,19 +30,21 @@ from django.db.models import Q
 from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, get_list_or_404
 from django.utils.decorators import method_decorator
-from django.utils.translation import get_language, ugettext as _
+from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_GET
 import markdown
 
 from wirecloud.catalogue.models import CatalogueResource
 import wirecloud.catalogue.utils as catalogue_utils
-from wirecloud.catalogue.utils import get_latest_resource_version, get_resource_data, get_resource_group_data
+from wirecloud.catalogue.utils import get_latest_resource_versions, get_rendered_doc, get_resource_data, get_resource_group_data
 from wirecloud.catalogue.utils import add_packaged_resource
-from wirecloud.commons.utils.downloader import download_http_content, download_local_file
+from wirecloud.commons.utils.downloader import download_http_content
 from wirecloud.commons.baseviews import Resource
-from wirecloud.commons.utils.html import clean_html, filter_changelog
-from wirecloud.commons.utils.http import authentication_required, build_error_response, build_downloadfile_response, consumes, force_trailing_slash, parse_json_request, produces
+from wirecloud.commons.utils.cache import get_not_modified_response, get_version_etag
+from wirecloud.commons.utils.html import clean_html, filter_changelog_sections
+from wirecloud.commons.utils.http import authentication_required, build_error_response, build_downloadfile_response, consumes, parse_json_request, produces
 from wirecloud.commons.utils.template import TemplateParseException
+from wirecloud.commons.utils.timing import timer
 from wirecloud.commons.utils.transaction import commit_on_http_success
 from wirecloud.commons.utils.version import Version
 from wirecloud.commons.search_indexes import get_search_engine
@@ -63,6 +62,26 @@ def serve_catalogue_media(request, vendor, name, version, file_path):
     return response
 
 
+def build_doc_message_response(code):
+
+    with timer('markdown'):
+        code = markdown.markdown(code, output_format='xhtml5')
+
+    doc = clean_html(code)
+    return HttpResponse(doc, content_type='application/xhtml+xml; charset=UTF-8')
+
+
+def build_rendered_doc_response(request, code, etag):
+
+    not_modified_response = get_not_modified_response(request, etag)
+    if not_modified_response is not None:
+        return not_modified_response
+
+    response = HttpResponse(code, content_type='application/xhtml+xml; charset=UTF-8')
+    response['ETag'] = etag
+    return response
+
+
 class ResourceCollection(Resource):
 
     @method_decorator(login_required)
@@ -193,10 +212,11 @@ class ResourceVersionCollection(Resource):
     def create(self, request):
 
         resources = parse_json_request(request)
+        latest_versions = get_latest_resource_versions((g["vendor"], g["name"]) for g in resources)
 
         result = []
         for g in resources:
-            latest_resource_version = get_latest_resource_version(g["name"], g["vendor"])
+            latest_resource_version = latest_versions.get((g["vendor"], g["name"]))
             if latest_resource_version:
                 # the resource is still in the catalogue
                 g["lastVersion"] = latest_resource_version.version
@@ -224,31 +244,21 @@ class ResourceChangelogEntry(Resource):
         if resource_info['changelog'] == '':
             raise Http404
 
-        doc_relative_path = url2pathname(resource_info['changelog'])
-        doc_base_url = force_trailing_slash(urljoin(resource.get_template_url(request=request, for_base=True), pathname2url(os.path.dirname(doc_relative_path))))
-        doc_path = os.path.join(catalogue_utils.wgt_deployer.get_base_dir(vendor, name, version), doc_relative_path)
-
-        (doc_filename_root, doc_filename_ext) = os.path.splitext(doc_path)
-        localized_doc_path = doc_filename_root + '.' + get_language() + doc_filename_ext
-
-        try:
-            doc_code = download_local_file(localized_doc_path).decode('utf-8')
-        except:
-            try:
-                doc_code = download_local_file(doc_path).decode('utf-8')
-            except:
-                msg = _('Error opening the changelog file')
-                doc_code = '<div class="margin-top: 10px"><p>%s</p></div>' % msg
-
-        doc_pre_html = markdown.markdown(doc_code, output_format='xhtml5', extensions=['markdown.extensions.codehilite', 'markdown.extensions.fenced_code'])
+        rendered = get_rendered_doc(resource, 'changelog', request=request)
+        if rendered is None:
+            msg = _('Error opening the changelog file')
+            return build_doc_message_response('<div class="margin-top: 10px"><p>%s</p></div>' % msg)
 
+        doc = rendered['code']
+        etag = rendered['etag']
         if from_version:
-            doc_pre_html = filter_changelog(doc_pre_html, from_version)
-            if doc_pre_html.strip() == '':
+            if rendered['sections'] is not None:
+                doc = filter_changelog_sections(rendered['sections'], from_version)
+            if doc.strip() == '':
                 raise Http404
+            etag = get_version_etag(etag, from_version.vstring)
 
-        doc = clean_html(doc_pre_html, base_url=doc_base_url)
-        return HttpResponse(doc, content_type='application/xhtml+xml; charset=UTF-8')
+        return build_rendered_doc_response(request, doc, etag)
 
 
 class ResourceDocumentationEntry(Resource):
@@ -261,27 +271,13 @@ class ResourceDocumentationEntry(Resource):
         if resource_info['doc'] == '':
             raise Http404
 
-        doc_base_url = None
         if resource_info['doc'].startswith(('http://', 'https://')):
             doc_code = _('You can find the userguide of this component in this external <a target="_blank" href="%s">link</a>') % resource_info['doc']
-            doc_code = '<div style="margin-top: 10px"><p>%s</p></div>' % doc_code
-        else:
-            doc_relative_path = url2pathname(resource_info['doc'])
-            doc_base_url = force_trailing_slash(urljoin(resource.get_template_url(request=request, for_base=True), pathname2url(os.path.dirname(doc_relative_path))))
-            doc_path = os.path.join(catalogue_utils.wgt_deployer.get_base_dir(vendor, name, version), doc_relative_path)
+            return build_doc_message_response('<div style="margin-top: 10px"><p>%s</p></div>' % doc_code)
 
-            (doc_filename_root, doc_filename_ext) = os.path.splitext(doc_path)
-            localized_doc_path = doc_filename_root + '.' + get_language() + doc_filename_ext
+        rendered = get_rendered_doc(resource, 'doc', request=request)
+        if rendered is None:
+            msg = _('Error opening the userguide file')
+            return build_doc_message_response('<div class="margin-top: 10px"><p>%s</p></div>' % msg)
 
-            try:
-                doc_code = download_local_file(localized_doc_path).decode('utf-8')
-            except:
-                try:
-                    doc_code = download_local_file(doc_path).decode('utf-8')
-                except:
-                    msg = _('Error opening the userguide file')
-                    doc_code = '<div class="margin-top: 10px"><p>%s</p></div>' % msg
-
-        doc_pre_html = markdown.markdown(doc_code, output_format='xhtml5', extensions=['markdown.extensions.codehilite', 'markdown.extensions.fenced_code'])
-        doc = clean_html(doc_pre_html, base_url=doc_base_url)
-        return HttpResponse(doc, content_type='application/xhtml+xml; charset=UTF-8')
+        return build_rendered_doc_response(request, rendered['code'], rendered['etag'])
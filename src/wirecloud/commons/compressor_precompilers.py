@@ -20,36 +20,153 @@
 from __future__ import unicode_literals
 
 import fnmatch
+import hashlib
+import io
 from itertools import product
+import json
+import logging
 from pathlib import Path
 import os
+import tempfile
 
 from compressor.filters.css_default import CssAbsoluteFilter
+from django.conf import settings
 from django.contrib.staticfiles import finders
 
 import scss
 
 
+logger = logging.getLogger(__name__)
+
+_static_index = None
+
+
+def get_static_index():
+    """
+    Returns an index of the files provided by the staticfiles finders,
+    mapping each path to the ``(path, storage)`` pair of the finder that
+    would be used for serving it. The index is built only once per process,
+    so new static files are not detected until the process is restarted.
+    """
+
+    global _static_index
+
+    if _static_index is None:
+        index = {}
+        for finder in finders.get_finders():
+            # Skip finders generating their files (e.g. the JavaScript
+            # catalog finder)
+            if not getattr(finder, 'indexable', True):
+                continue
+
+            for path, storage in finder.list([]):
+                if getattr(storage, 'prefix', None) is not None:
+                    fullpath = "%s%s%s" % (storage.prefix, os.sep, path)
+                else:
+                    fullpath = path
+                # First match takes precedence, as in finders.find
+                index.setdefault(fullpath, (path, storage))
+
+        _static_index = index
+
+    return _static_index
+
+
+def find_static_file(path):
+
+    entry = get_static_index().get(os.path.normpath(path))
+    if entry is None:
+        return None
+
+    path, storage = entry
+    return storage.path(path)
+
+
 def django_finder(glob):
-    for finder in finders.get_finders():
-        for path, storage in finder.list([]):
-            if getattr(storage, 'prefix', None) is not None:
-                fullpath = "%s%s%s" % (storage.prefix, os.sep, path)
-            else:
-                fullpath = path
-            if fnmatch.fnmatchcase(fullpath, glob):
-                yield path, storage
+    for fullpath, entry in get_static_index().items():
+        if fnmatch.fnmatchcase(fullpath, glob):
+            yield entry
 
 
 scss.config.IMAGES_ROOT = django_finder
 
 
-def get_scss_compiler(namespace, relpath):
+def get_file_hash(filename):
+    with open(filename, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def get_scss_cache_dir():
+    return getattr(settings, 'WIRECLOUD_SCSS_CACHE_DIR', os.path.join(settings.COMPRESS_ROOT, settings.COMPRESS_OUTPUT_DIR, 'scss'))
+
+
+def get_scss_cache_path(basename, context, content):
+
+    key = json.dumps([scss.__version__, basename, context, hashlib.sha1(content.encode('utf-8')).hexdigest()])
+    return os.path.join(get_scss_cache_dir(), hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def load_compiled_scss(cache_path):
+    """
+    Returns the CSS code stored in the given compilation cache entry, or
+    ``None`` if the entry is not available, if any of the files imported
+    while compiling it has changed or if any of the paths searched without
+    success while resolving the imports is now available.
+    """
+
+    try:
+        with io.open(cache_path, encoding='utf-8') as f:
+            entry = json.loads(f.read())
+        dependencies = entry['dependencies']
+        missing = entry['missing']
+    except (IOError, OSError, KeyError, ValueError):
+        return None
+
+    for path in missing:
+        if find_static_file(path) is not None:
+            return None
+
+    for path, file_hash in dependencies:
+        filename = find_static_file(path)
+        try:
+            if filename is None or get_file_hash(filename) != file_hash:
+                return None
+        except (IOError, OSError):
+            return None
+
+    return entry['css']
+
+
+def store_compiled_scss(cache_path, css, dependencies, missing):
+
+    entry = {
+        'css': css,
+        'dependencies': dependencies,
+        'missing': missing,
+    }
+
+    directory = os.path.dirname(cache_path)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False))
+        os.rename(tmp_path, cache_path)
+    except (IOError, OSError):
+        logger.warning('Error storing compiled SCSS file: %s' % cache_path)
+
+
+def get_scss_compiler(namespace, relpath, extension=None):
+
+    if extension is None:
+        extension = DjangoSCSSExtension()
 
     namespace.set_variable('$theme', scss.types.String.unquoted(relpath.split('/')[1]))
     compiler = scss.compiler.Compiler(
         namespace=namespace,
-        extensions=(scss.extension.core.CoreExtension, scss.extension.compass.CompassExtension, DjangoSCSSExtension)
+        extensions=(scss.extension.core.CoreExtension, scss.extension.compass.CompassExtension, extension)
     )
     compiler.base_path = '/'.join(relpath.split('/')[:3])
     return compiler
@@ -57,6 +174,13 @@ def get_scss_compiler(namespace, relpath):
 
 class DjangoSCSSExtension(scss.extension.Extension):
 
+    def __init__(self):
+        super(DjangoSCSSExtension, self).__init__()
+        # (path, hash) pairs of the imported files
+        self.dependencies = []
+        # Paths searched without success while resolving the imports
+        self.missing = []
+
     def _get_possible_import_paths(self, source_file, path):
         """
         Returns an iterable of possible paths for an import.
@@ -86,13 +210,21 @@ class DjangoSCSSExtension(scss.extension.Extension):
         scss.log.debug('Searching for %s in %s', filename, paths)
 
         for name in paths:
-            result = finders.find(os.path.join(compilation.compiler.base_path, name))
+            path = os.path.join(compilation.compiler.base_path, name)
+            result = find_static_file(path)
+
+            if not result:
+                if os.path.normpath(path) not in self.missing:
+                    self.missing.append(os.path.normpath(path))
+                continue
 
-            if result:
-                origin = Path(result[:-len(name)])
-                relpath = Path(name)
+            origin = Path(result[:-len(name)])
+            relpath = Path(name)
 
-                return scss.source.SourceFile.read(origin, relpath)
+            dependency = (os.path.normpath(path), get_file_hash(result))
+            if dependency not in self.dependencies:
+                self.dependencies.append(dependency)
+            return scss.source.SourceFile.read(origin, relpath)
 
         return None
 
@@ -102,12 +234,22 @@ class SCSSPrecompiler(object):
     def __init__(self, content, attrs, filter_type=None, filename=None, charset=None):
         self.filename = filename
         self.content = content
+        self.context = attrs.get('context', 'platform')
         self.namespace = scss.namespace.Namespace()
-        self.namespace.set_variable('$context', scss.types.String.unquoted(attrs.get('context', 'platform')))
+        self.namespace.set_variable('$context', scss.types.String.unquoted(self.context))
 
     def input(self, filename=None, basename=None, **kwargs):
 
-        compiler = get_scss_compiler(self.namespace, basename)
-        source = scss.source.SourceFile.from_string(self.content, relpath=basename)
-        content = compiler.compile_sources(source)
+        # Compiled files are cached using the contents of the file and the
+        # contents of all the imported files
+        cache_path = get_scss_cache_path(basename, self.context, self.content)
+        content = load_compiled_scss(cache_path)
+
+        if content is None:
+            extension = DjangoSCSSExtension()
+            compiler = get_scss_compiler(self.namespace, basename, extension)
+            source = scss.source.SourceFile.from_string(self.content, relpath=basename)
+            content = compiler.compile_sources(source)
+            store_compiled_scss(cache_path, content, extension.dependencies, extension.missing)
+
         return CssAbsoluteFilter(content).input(filename, basename, **kwargs)
@@ -23,8 +23,9 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "{{ project_name }}.settings")
 
 # This application object is used by any WSGI server configured to use this
 # file. This includes Django's development server, if the WSGI_APPLICATION
-# setting points here.
-from django.core.wsgi import get_wsgi_application
+# setting points here. WireCloud's version also loads the WireCloud plugins
+# and fills its caches before serving the first request.
+from wirecloud.platform.wsgi import get_wsgi_application
 application = get_wsgi_application()
 
 # Apply WSGI middleware here.
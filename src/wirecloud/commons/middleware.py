@@ -20,14 +20,23 @@
 from __future__ import unicode_literals
 
 from importlib import import_module
+from itertools import islice
+import logging
+import random
 
+from django.conf import settings
 from django.contrib.auth.middleware import get_user
+from django.db import connections
 from django.core.urlresolvers import reverse
 from django.utils.functional import SimpleLazyObject
 from django.utils.http import http_date, parse_http_date_safe
 from django.utils.translation import ugettext as _
 
 from wirecloud.commons.exceptions import HttpBadCredentials
+from wirecloud.commons.utils import timing
+
+
+logger = logging.getLogger(__name__)
 
 
 class URLMiddleware(object):
@@ -210,3 +219,66 @@ class ConditionalGetMiddleware(object):
                     response.status_code = 304
 
         return response
+
+
+class ServerTimingMiddleware(object):
+    """
+    Collects the time spent on database queries, cache accesses, template
+    parsing, HTML/markdown processing, proxied requests and JSON
+    serialization for a sample of the requests (controlled by the
+    ``WIRECLOUD_SERVER_TIMING_SAMPLE_RATE`` setting, disabled by default).
+    Metrics are sent using the ``Server-Timing`` header to staff users (or to
+    any user if ``DEBUG`` is ``True``) and, if the
+    ``WIRECLOUD_SERVER_TIMING_LOG`` setting is ``True``, they are also
+    logged.
+    """
+
+    def process_request(self, request):
+
+        sample_rate = getattr(settings, 'WIRECLOUD_SERVER_TIMING_SAMPLE_RATE', 0)
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return
+
+        # Same approach used by django.test.utils.CaptureQueriesContext
+        databases = []
+        for connection in connections.all():
+            databases.append((connection, connection.force_debug_cursor, len(connection.queries_log)))
+            connection.force_debug_cursor = True
+
+        request._server_timing = (timing.activate(), databases)
+
+    def process_response(self, request, response):
+
+        if getattr(request, '_server_timing', None) is None:
+            return response
+
+        timings, databases = request._server_timing
+        request._server_timing = None
+        timing.deactivate()
+
+        queries = []
+        for connection, force_debug_cursor, initial_queries in databases:
+            connection.force_debug_cursor = force_debug_cursor
+            queries += islice(connection.queries_log, initial_queries, None)
+
+        timings.record('db', sum(float(query['time']) for query in queries) * 1000, queries=len(queries))
+
+        header = timings.to_header()
+        user = getattr(request, 'user', None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            if response.has_header('Server-Timing'):
+                # Keep the metrics provided by other servers (e.g. proxied ones)
+                response['Server-Timing'] = '%s, %s' % (response['Server-Timing'], header)
+            else:
+                response['Server-Timing'] = header
+
+        if getattr(settings, 'WIRECLOUD_SERVER_TIMING_LOG', False):
+            logger.info('%(method)s %(path)s %(status_code)s (%(total).3fms): %(metrics)s', {
+                'method': request.method,
+                'path': request.path,
+                'status_code': response.status_code,
+                'total': timings.total,
+                'metrics': header,
+            }, extra={'server_timing': timings.metrics})
+
+        return response
@@ -2,12 +2,13 @@ from wirecloud.commons.tests.admin_commands import BaseAdminCommandTestCase, Con
 from wirecloud.commons.tests.basic_views import BasicViewTestCase
 from wirecloud.commons.tests.search_indexes import SearchAPITestCase
 from wirecloud.commons.tests.template import TemplateUtilsTestCase
-from wirecloud.commons.tests.utils import GeneralUtilsTestCase, HTMLCleanupTestCase, WGTTestCase, HTTPUtilsTestCase
+from wirecloud.commons.tests.utils import CacheUtilsTestCase, GeneralUtilsTestCase, HTMLCleanupTestCase, SCSSPrecompilerTestCase, ServerTimingTestCase, BudgetsTestCase, WGTTestCase, HTTPUtilsTestCase
 
 __all__ = (
     "BaseAdminCommandTestCase", "ConvertCommandTestCase",
     "StartprojectCommandTestCase", "BasicViewTestCase",
     "ResetSearchIndexesCommandTestCase", "SearchAPITestCase",
-    "TemplateUtilsTestCase", "GeneralUtilsTestCase",
-    "HTMLCleanupTestCase", "WGTTestCase", "HTTPUtilsTestCase"
+    "TemplateUtilsTestCase", "CacheUtilsTestCase", "GeneralUtilsTestCase",
+    "HTMLCleanupTestCase", "SCSSPrecompilerTestCase", "ServerTimingTestCase", "BudgetsTestCase",
+    "WGTTestCase", "HTTPUtilsTestCase"
 )
@@ -23,9 +23,15 @@ import copy
 import json
 import os
 import rdflib
+import shutil
+from tempfile import mkdtemp
 from unittest import TestCase
 
+from django.test.utils import override_settings
+from mock import patch
+
 from wirecloud.commons.utils.template.parsers import ObsoleteFormatError, TemplateFormatError, TemplateParser, TemplateParseException
+from wirecloud.commons.utils.template.parsers.cache import clear_template_cache, get_template_hash
 from wirecloud.commons.utils.template.parsers.xml import WIRECLOUD_TEMPLATE_NS
 from wirecloud.commons.utils.template.writers.json import write_json_description
 from wirecloud.commons.utils.template.writers.rdf import write_rdf_description
@@ -1894,3 +1900,109 @@ class TemplateUtilsTestCase(TestCase):
         self.assertEqual(processed_info['smartphoneimage'], 'images/smartphone.png')
         self.assertEqual(processed_info['contents']['src'], 'code.html')
         self.assertEqual(processed_info['altcontents'][0]['src'], 'native.html')
+
+    def test_get_resource_processed_info_translations(self):
+
+        template = TemplateParser(write_json_description(self.operator_with_translation_info))
+
+        processed_info = template.get_resource_processed_info(lang='es', process_urls=False)
+        self.assertEqual(processed_info['title'], 'Operador de prueba')
+        self.assertEqual(processed_info['preferences'][0]['label'], 'Etiqueta de la pref1')
+        self.assertEqual(processed_info['preferences'][0]['options'][1]['label'], 'Etiqueta de la opción 2')
+        self.assertEqual(processed_info['wiring']['inputs'][0]['actionlabel'], 'Etiqueta de acción del input 1')
+        self.assertNotIn('translations', processed_info)
+        self.assertNotIn('translation_index_usage', processed_info)
+
+        # Unknown languages fallback to the default language
+        processed_info = template.get_resource_processed_info(lang='fr', process_urls=False)
+        self.assertEqual(processed_info['title'], 'Template Test Operator')
+        self.assertEqual(processed_info['wiring']['outputs'][2]['description'], 'Output3 description')
+
+        # Processing translations does not modify the parsed description
+        self.assertEqual(template.get_resource_info(), self.operator_with_translation_info)
+
+    def test_template_parser_sniffs_json_format(self):
+
+        json_description = write_json_description(self.operator_with_translation_info)
+        clear_template_cache()
+        with patch('wirecloud.commons.utils.template.parsers.ApplicationMashupTemplateParser') as xml_parser_mock:
+            with patch('wirecloud.commons.utils.template.parsers.RDFTemplateParser') as rdf_parser_mock:
+                template = TemplateParser(json_description)
+
+        self.assertFalse(xml_parser_mock.called)
+        self.assertFalse(rdf_parser_mock.called)
+        self.assertEqual(template.get_resource_info(), self.operator_with_translation_info)
+
+    def test_template_parser_sniffs_rdf_format(self):
+
+        rdf_description = write_rdf_description(self.operator_with_translation_info)
+        clear_template_cache()
+        with patch('wirecloud.commons.utils.template.parsers.ApplicationMashupTemplateParser') as xml_parser_mock:
+            with patch('wirecloud.commons.utils.template.parsers.JSONTemplateParser') as json_parser_mock:
+                template = TemplateParser(rdf_description)
+
+        self.assertFalse(xml_parser_mock.called)
+        self.assertFalse(json_parser_mock.called)
+        self.assertEqual(template.get_resource_info(), self.operator_with_translation_info)
+
+    def test_template_parser_cache(self):
+
+        json_description = write_json_description(self.operator_with_translation_info)
+        clear_template_cache()
+        info = TemplateParser(json_description).get_resource_info()
+        info['title'] = 'modified'
+
+        with patch('wirecloud.commons.utils.template.parsers.JSONTemplateParser') as json_parser_mock:
+            template = TemplateParser(json_description)
+
+        self.assertFalse(json_parser_mock.called)
+        self.assertEqual(template.get_resource_version(), '2.0')
+        self.assertEqual(template.get_resource_info(), self.operator_with_translation_info)
+
+    def test_template_parser_cache_does_not_store_invalid_descriptions(self):
+
+        info = copy.deepcopy(self.operator_with_translation_info)
+        info['vendor'] = 'Wire/cloud'
+        json_description = write_json_description(info)
+        clear_template_cache()
+
+        self.assertRaises(TemplateParseException, TemplateParser(json_description).get_resource_info)
+        self.assertRaises(TemplateParseException, TemplateParser(json_description).get_resource_info)
+
+    def test_template_parser_disk_cache(self):
+
+        json_description = write_json_description(self.operator_with_translation_info)
+        cache_dir = mkdtemp()
+        try:
+            with override_settings(WIRECLOUD_TEMPLATE_CACHE_DIR=cache_dir):
+                clear_template_cache()
+                TemplateParser(json_description).get_resource_info()
+                clear_template_cache()
+
+                with patch('wirecloud.commons.utils.template.parsers.JSONTemplateParser') as json_parser_mock:
+                    template = TemplateParser(json_description)
+
+            self.assertFalse(json_parser_mock.called)
+            self.assertEqual(template.get_resource_info(), self.operator_with_translation_info)
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def test_template_parser_cache_key_depends_on_parsers(self):
+
+        json_description = write_json_description(self.operator_with_translation_info)
+        key = get_template_hash(json_description)
+
+        with patch('wirecloud.commons.utils.template.parsers.cache.get_parsers_signature', return_value='other'):
+            self.assertNotEqual(get_template_hash(json_description), key)
+
+    def test_get_translation_plan(self):
+
+        template = TemplateParser(write_json_description(self.operator_with_translation_info))
+
+        plan = template.get_translation_plan()
+        self.assertIs(template.get_translation_plan(), plan)
+        targets = set((path, field) for path, field, template_value, indexes in plan)
+        self.assertEqual(len(targets), len(self.operator_with_translation_info['translation_index_usage']))
+        self.assertIn(((), 'title'), targets)
+        self.assertIn((('preferences', 0, 'options', 1), 'label'), targets)
+        self.assertIn((('wiring', 'inputs', 2), 'actionlabel'), targets)
@@ -19,21 +19,37 @@
 
 from __future__ import unicode_literals
 
+import gzip
 from io import BytesIO
+import json
 import os
+import re
+import shutil
+import tempfile
 import zipfile
 
 import django
-from django.http import Http404, UnreadablePostError
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404, HttpResponse, UnreadablePostError
+from django.test import RequestFactory, TestCase
 from django.test.utils import override_settings
 from mock import DEFAULT, patch, Mock, ANY
 
+from wirecloud.commons import compressor_precompilers
 from wirecloud.commons.exceptions import ErrorResponse
-from wirecloud.commons.utils.html import clean_html, filter_changelog
-from wirecloud.commons.utils.http import build_downloadfile_response, build_sendfile_response, get_current_domain, get_current_scheme, get_content_type, normalize_boolean_param, produces, validate_url_param
+from wirecloud.commons.middleware import ServerTimingMiddleware
+from wirecloud.commons.utils import timing
+from wirecloud.commons.utils.cache import CacheableData, compress_payload, get_accepted_encoding, get_cache_stats, get_not_modified_response, get_or_rebuild
+from wirecloud.commons.utils.encoding import iterencode_dict, iterencode_list
+from wirecloud.commons.utils.html import clean_html, filter_changelog, filter_changelog_sections, get_changelog_sections
+from wirecloud.commons.utils.http import build_downloadfile_response, build_json_collection_response, build_sendfile_response, get_current_domain, get_current_scheme, get_content_type, normalize_boolean_param, produces, validate_url_param
 from wirecloud.commons.utils.log import SkipUnreadablePosts
 from wirecloud.commons.utils.mimeparser import best_match, InvalidMimeType, parse_mime_type
+from wirecloud.commons.utils.testcases import WirecloudTestCase
 from wirecloud.commons.utils.version import Version
 from wirecloud.commons.utils.wgt import WgtFile
 
@@ -42,6 +58,141 @@ from wirecloud.commons.utils.wgt import WgtFile
 __test__ = False
 
 
+class CacheUtilsTestCase(TestCase):
+
+    tags = ('wirecloud-utils', 'wirecloud-cache-utils', 'wirecloud-noselenium')
+
+    def setUp(self):
+        super(CacheUtilsTestCase, self).setUp()
+        cache.clear()
+
+    def test_get_or_rebuild_miss(self):
+
+        rebuild = Mock(return_value='value')
+
+        self.assertEqual(get_or_rebuild('key', rebuild, stale_key='stale_key'), 'value')
+        self.assertEqual(get_or_rebuild('key', rebuild, stale_key='stale_key'), 'value')
+
+        rebuild.assert_called_once_with()
+        self.assertEqual(cache.get('stale_key'), 'value')
+        self.assertIsNone(cache.get('_cache_lock/key'))
+        self.assertEqual(get_cache_stats()['rebuilds'], 1)
+
+    def test_get_or_rebuild_locked_stale(self):
+
+        rebuild = Mock(return_value='value')
+        cache.set('_cache_lock/key', True)
+        cache.set('stale_key', 'old_value')
+
+        self.assertEqual(get_or_rebuild('key', rebuild, stale_key='stale_key', allow_stale=True), 'old_value')
+
+        self.assertFalse(rebuild.called)
+        self.assertEqual(get_cache_stats()['stale_hits'], 1)
+
+    def test_get_or_rebuild_locked_waits(self):
+
+        rebuild = Mock(return_value='value')
+        cache.set('_cache_lock/key', True)
+        cache.set('stale_key', 'old_value')
+
+        def sleep(seconds):
+            cache.set('key', 'new_value')
+
+        with patch('wirecloud.commons.utils.cache.time.sleep', side_effect=sleep):
+            self.assertEqual(get_or_rebuild('key', rebuild, stale_key='stale_key'), 'new_value')
+
+        self.assertFalse(rebuild.called)
+        self.assertEqual(get_cache_stats()['waits'], 1)
+
+    def test_get_or_rebuild_lock_released_without_value(self):
+
+        rebuild = Mock(return_value='value')
+        cache.set('_cache_lock/key', True)
+
+        def sleep(seconds):
+            cache.delete('_cache_lock/key')
+
+        with patch('wirecloud.commons.utils.cache.time.sleep', side_effect=sleep):
+            self.assertEqual(get_or_rebuild('key', rebuild), 'value')
+
+        rebuild.assert_called_once_with()
+        self.assertEqual(cache.get('key'), 'value')
+
+    @override_settings(WIRECLOUD_CACHE_WAIT_TIMEOUT=0)
+    def test_get_or_rebuild_wait_timeout(self):
+
+        rebuild = Mock(return_value='value')
+        cache.set('_cache_lock/key', True)
+
+        self.assertEqual(get_or_rebuild('key', rebuild), 'value')
+
+        rebuild.assert_called_once_with()
+        # The lock is owned by other worker
+        self.assertTrue(cache.get('_cache_lock/key'))
+        self.assertEqual(get_cache_stats()['wait_timeouts'], 1)
+
+    def test_get_or_rebuild_error(self):
+
+        rebuild = Mock(side_effect=Exception)
+
+        self.assertRaises(Exception, get_or_rebuild, 'key', rebuild)
+        self.assertIsNone(cache.get('key'))
+        self.assertIsNone(cache.get('_cache_lock/key'))
+
+    def test_compress_payload(self):
+
+        data = '{"key": "%s"}' % ('value' * 100)
+        encodings = compress_payload(data)
+
+        self.assertIn('gzip', encodings)
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(encodings['gzip'])).read(), data.encode('utf-8'))
+
+    def test_compress_payload_small_data(self):
+
+        self.assertEqual(compress_payload('{}'), {})
+
+    def test_get_accepted_encoding(self):
+
+        encodings = {'gzip': b'', 'br': b''}
+
+        request = Mock(META={'HTTP_ACCEPT_ENCODING': 'gzip, deflate'})
+        self.assertEqual(get_accepted_encoding(request, encodings), 'gzip')
+
+        request = Mock(META={'HTTP_ACCEPT_ENCODING': 'gzip, deflate, br'})
+        self.assertEqual(get_accepted_encoding(request, encodings), 'br')
+
+        request = Mock(META={'HTTP_ACCEPT_ENCODING': 'gzip;q=0, deflate'})
+        self.assertIsNone(get_accepted_encoding(request, encodings))
+
+        request = Mock(META={})
+        self.assertIsNone(get_accepted_encoding(request, encodings))
+
+    def test_cacheable_data_precompressed_response(self):
+
+        data = CacheableData('[%s]' % ', '.join(['1'] * 200), etag='"etag"', precompress=True)
+
+        request = Mock(META={'HTTP_ACCEPT_ENCODING': 'gzip'})
+        response = data.get_response(request=request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['ETag'], 'W/"etag"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(response.content)).read(), data.get_data().encode('utf-8'))
+
+        request = Mock(META={})
+        response = data.get_response(request=request)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['ETag'], '"etag"')
+        self.assertEqual(response.content, data.get_data().encode('utf-8'))
+
+    def test_get_not_modified_response_weak_etag(self):
+
+        request = Mock(META={'HTTP_IF_NONE_MATCH': 'W/"etag"'})
+        self.assertEqual(get_not_modified_response(request, '"etag"').status_code, 304)
+
+        request = Mock(META={'HTTP_IF_NONE_MATCH': 'W/"other"'})
+        self.assertIsNone(get_not_modified_response(request, '"etag"'))
+
+
 class HTMLCleanupTestCase(TestCase):
 
     tags = ('wirecloud-utils', 'wirecloud-html-cleanup', 'wirecloud-noselenium')
@@ -134,11 +285,281 @@ class HTMLCleanupTestCase(TestCase):
         expected_code = '<h1>v1.0.2</h1><p>v1.0.2 change list</p><h1>v1.0.1</h1><p>v1.0.1 change list</p>'
         self.assertEqual(filter_changelog(initial_code, Version('1.0.0.1')), expected_code)
 
+    def test_changelog_sections(self):
+        initial_code = '<h1>My Widgets changes</h1> my intro<h2>v1.0.2</h2> tail <p>v1.0.2 change list</p><h2>Extra header</h2><p>my extra info</p><h2>v1.0.1</h2><p>v1.0.1 change list</p><h2>v1.0.0</h2><p>Initial release</p> tail'
+        sections = get_changelog_sections(initial_code)
+
+        self.assertEqual([version for version, code in sections[1]], [Version('1.0.2').sortable_key, Version('1.0.1').sortable_key, Version('1.0.0').sortable_key])
+        for version in ('0.9', '1.0.0', '1.0.0.1', '1.0.1', '1.0.2', '1.0.3'):
+            self.assertEqual(filter_changelog_sections(sections, Version(version)), filter_changelog(initial_code, Version(version)))
+
+    def test_changelog_sections_no_versions(self):
+        self.assertIsNone(get_changelog_sections('<h1>Changes</h1><p>change list</p>'))
+
+
+class SCSSPrecompilerTestCase(TestCase):
+
+    tags = ('wirecloud-utils', 'wirecloud-scss', 'wirecloud-noselenium')
+
+    BASENAME = 'theme/wirecloud.defaulttheme/css/gadget.scss'
+
+    def setUp(self):
+        super(SCSSPrecompilerTestCase, self).setUp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.filename = finders.find(self.BASENAME)
+        with open(self.filename, 'r') as f:
+            self.content = f.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super(SCSSPrecompilerTestCase, self).tearDown()
+
+    def compile(self):
+        with override_settings(WIRECLOUD_SCSS_CACHE_DIR=self.cache_dir):
+            with patch('wirecloud.commons.compressor_precompilers.get_scss_compiler', wraps=compressor_precompilers.get_scss_compiler) as compiler_mock:
+                precompiler = compressor_precompilers.SCSSPrecompiler(self.content, {'context': 'widget'}, filename=self.filename)
+                result = precompiler.input(filename=self.filename, basename=self.BASENAME)
+
+        return result, compiler_mock.called
+
+    def test_static_index(self):
+
+        self.assertEqual(compressor_precompilers.find_static_file(self.BASENAME), self.filename)
+        self.assertEqual(compressor_precompilers.find_static_file('theme/wirecloud.defaulttheme/css/../css/gadget.scss'), self.filename)
+        self.assertIsNone(compressor_precompilers.find_static_file('theme/wirecloud.defaulttheme/css/missing.scss'))
+
+        results = list(compressor_precompilers.django_finder('theme/wirecloud.defaulttheme/css/gadget.*'))
+        self.assertEqual(len(results), 1)
+
+    def test_compilation_cache(self):
+
+        css, compiled = self.compile()
+        self.assertTrue(compiled)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        with open(os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0]), 'r') as f:
+            entry = json.loads(f.read())
+        self.assertIn('theme/wirecloud.defaulttheme/css/_variables.scss', [path for path, file_hash in entry['dependencies']])
+
+        # Compiled code is reused by other processes
+        css2, compiled = self.compile()
+        self.assertFalse(compiled)
+        self.assertEqual(css2, css)
+
+    def test_compilation_cache_dependency_changed(self):
+
+        css, compiled = self.compile()
+
+        with patch('wirecloud.commons.compressor_precompilers.get_file_hash', return_value='other'):
+            css2, compiled = self.compile()
+
+        self.assertTrue(compiled)
+        self.assertEqual(css2, css)
+
+    def test_compilation_cache_missing_import_added(self):
+
+        self.content = "@import 'tutorial';\n" + self.content
+        self.compile()
+
+        cache_path = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(cache_path, 'r') as f:
+            entry = json.loads(f.read())
+        self.assertIn('theme/wirecloud.defaulttheme/css/_tutorial.scss', entry['missing'])
+
+        # A partial shadowing the imported file is added
+        find_static_file = compressor_precompilers.find_static_file
+
+        def find_new_static_file(path):
+            return self.filename if path == 'theme/wirecloud.defaulttheme/css/_tutorial.scss' else find_static_file(path)
+
+        self.assertIsNotNone(compressor_precompilers.load_compiled_scss(cache_path))
+        with patch('wirecloud.commons.compressor_precompilers.find_static_file', side_effect=find_new_static_file):
+            self.assertIsNone(compressor_precompilers.load_compiled_scss(cache_path))
+
+
+@override_settings(WIRECLOUD_SERVER_TIMING_SAMPLE_RATE=1.0)
+class ServerTimingTestCase(TestCase):
+
+    tags = ('wirecloud-utils', 'wirecloud-server-timing', 'wirecloud-noselenium')
+
+    def setUp(self):
+        super(ServerTimingTestCase, self).setUp()
+        cache.clear()
+        self.middleware = ServerTimingMiddleware()
+        self.request = RequestFactory().get('/api/features')
+        self.request.user = User(username='admin', is_staff=True)
+
+    def process_request(self):
+        self.assertIsNone(self.middleware.process_request(self.request))
+
+        User.objects.count()
+        cache.get('missing')
+        cache.set('key', 'value')
+        cache.get('key')
+        clean_html('<p>a</p>')
+
+        return self.middleware.process_response(self.request, HttpResponse())
+
+    def test_server_timing_header(self):
+
+        response = self.process_request()
+
+        metrics = {metric.split(';')[0]: metric for metric in re.split(r', (?=[\w-]+;)', response['Server-Timing'])}
+        self.assertEqual(set(metrics.keys()), {'db', 'cache', 'html', 'total'})
+        self.assertIn('desc="1 queries"', metrics['db'])
+        self.assertIn('desc="1 hits, 1 misses, 1 sets"', metrics['cache'])
+        self.assertIn('desc="1 calls"', metrics['html'])
+
+        # Metrics are only collected while processing sampled requests
+        self.assertIsNone(timing.get_current())
+        self.assertFalse(connection.force_debug_cursor)
+
+    def test_server_timing_header_upstream_metrics(self):
+
+        self.middleware.process_request(self.request)
+        upstream_response = HttpResponse()
+        upstream_response['Server-Timing'] = 'app;dur=5.0'
+        response = self.middleware.process_response(self.request, upstream_response)
+
+        self.assertTrue(response['Server-Timing'].startswith('app;dur=5.0, '))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(WIRECLOUD_SERVER_TIMING_SAMPLE_RATE=0)
+    def test_server_timing_not_sampled(self):
+
+        response = self.process_request()
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_server_timing_disabled_by_default(self):
+
+        with self.settings():
+            del settings.WIRECLOUD_SERVER_TIMING_SAMPLE_RATE
+            response = self.process_request()
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertFalse(connection.force_debug_cursor)
+
+    @override_settings(WIRECLOUD_SERVER_TIMING_LOG=True)
+    def test_server_timing_header_not_sent_to_other_users(self):
+
+        self.request.user = AnonymousUser()
+        with patch('wirecloud.commons.middleware.logger') as logger_mock:
+            response = self.process_request()
+
+        self.assertFalse(response.has_header('Server-Timing'))
+        # Metrics are still logged
+        self.assertEqual(logger_mock.info.call_count, 1)
+
+    @override_settings(DEBUG=True)
+    def test_server_timing_header_debug(self):
+
+        self.request.user = AnonymousUser()
+        response = self.process_request()
+
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    @override_settings(WIRECLOUD_SERVER_TIMING_LOG=True)
+    def test_server_timing_log(self):
+
+        with patch('wirecloud.commons.middleware.logger') as logger_mock:
+            response = self.process_request()
+
+        self.assertEqual(logger_mock.info.call_count, 1)
+        self.assertEqual(logger_mock.info.call_args[0][1]['metrics'], response['Server-Timing'])
+        self.assertEqual(logger_mock.info.call_args[1]['extra']['server_timing']['db']['queries'], 1)
+
+    def test_timer(self):
+
+        # Recording metrics outside sampled requests does nothing
+        with timing.timer('test'):
+            pass
+
+        timings = timing.activate()
+        try:
+            with timing.timer('test'):
+                pass
+            timing.timed('test')(lambda: None)()
+        finally:
+            timing.deactivate()
+
+        self.assertEqual(timings.metrics['test']['calls'], 2)
+
+
+class BudgetsTestCase(WirecloudTestCase, TestCase):
+
+    tags = ('wirecloud-utils', 'wirecloud-budgets', 'wirecloud-noselenium')
+    populate = False
+    use_search_indexes = False
+
+    def test_within_budget(self):
+
+        with self.assertWithinBudget('test', queries=1, time=1000):
+            User.objects.count()
+
+    def test_query_budget_exceeded(self):
+
+        with self.assertRaisesRegexp(AssertionError, 'GET wirecloud.workspace_entry exceeded its query budget: 2 queries executed, 1 allowed'):
+            with self.assertWithinBudget('wirecloud.workspace_entry', queries=1):
+                User.objects.count()
+                User.objects.count()
+
+    def test_time_budget_exceeded(self):
+
+        with patch('wirecloud.commons.utils.testcases.time') as time_mock:
+            time_mock.time.side_effect = (0, 2)
+            with self.assertRaisesRegexp(AssertionError, 'exceeded its time budget: 2000.000ms spent, 1000ms allowed'):
+                with self.assertWithinBudget('test', time=1000):
+                    pass
+
+    def test_time_budget_optional(self):
+
+        with patch('wirecloud.commons.utils.testcases.time') as time_mock:
+            time_mock.time.side_effect = (0, 2)
+            with self.assertWithinBudget('wirecloud.workspace_entry', 'GET'):
+                pass
+
+    @override_settings(WIRECLOUD_TEST_TIME_BUDGET=1000)
+    def test_time_budget_setting(self):
+
+        with patch('wirecloud.commons.utils.testcases.time') as time_mock:
+            time_mock.time.side_effect = (0, 2)
+            with self.assertRaisesRegexp(AssertionError, 'GET wirecloud.workspace_entry exceeded its time budget'):
+                with self.assertWithinBudget('wirecloud.workspace_entry', 'GET'):
+                    pass
+
+    def test_query_count_scales(self):
+
+        def populate(size):
+            User.objects.bulk_create([User(username='user%s' % i) for i in range(User.objects.count(), size)])
+
+        # Constant number of queries
+        self.assertQueryCountScales(populate, lambda: list(User.objects.all()))
+
+        # One query per item
+        def get_users():
+            for user_id in User.objects.values_list('pk', flat=True):
+                User.objects.get(pk=user_id)
+
+        self.assertQueryCountScales(populate, get_users, per_item=1)
+        with self.assertRaisesRegexp(AssertionError, 'The number of queries grows with the number of items: 51 queries for 50 items, 61 queries for 60 items'):
+            self.assertQueryCountScales(populate, get_users, sizes=(50, 60))
+
 
 class GeneralUtilsTestCase(TestCase):
 
     tags = ('wirecloud-utils', 'wirecloud-general-utils', 'wirecloud-noselenium')
 
+    def test_version_sortable_key(self):
+
+        versions = ('0.0.1', '0.1', '1a1', '1a2', '1a10', '1b1', '1rc1', '1-dev', '1.0', '1.0.0.1', '1.2', '1.10', '2', '10', '123456789')
+        for version1 in versions:
+            for version2 in versions:
+                key1 = Version(version1).sortable_key
+                key2 = Version(version2).sortable_key
+                self.assertEqual(Version(version1) < Version(version2), key1 < key2, '%s - %s' % (version1, version2))
+                self.assertEqual(Version(version1) == Version(version2), key1 == key2, '%s - %s' % (version1, version2))
+
     def test_skipunreadableposts_filter(self):
 
         record = Mock()
@@ -160,6 +581,18 @@ class GeneralUtilsTestCase(TestCase):
         filter = SkipUnreadablePosts()
         self.assertTrue(filter.filter(record))
 
+    def test_iterencode_list(self):
+
+        items = [{'b': 1, 'a': 'value'}, 2, 'item']
+        self.assertEqual(''.join(iterencode_list(iter(items))), json.dumps(items, sort_keys=True))
+        self.assertEqual(''.join(iterencode_list(iter([]))), '[]')
+
+    def test_iterencode_dict(self):
+
+        items = [('a', {'d': 1, 'c': [1, 2]}), ('b', None)]
+        self.assertEqual(''.join(iterencode_dict(iter(items))), json.dumps(dict(items), sort_keys=True))
+        self.assertEqual(''.join(iterencode_dict(iter([]))), '{}')
+
     def test_mimeparser_parse_mime_type(self):
 
         self.assertEqual(parse_mime_type('application/xhtml;q=0.5'), ('application/xhtml', {'q': '0.5'}))
@@ -672,3 +1105,20 @@ class HTTPUtilsTestCase(TestCase):
                 mocks['socket'].getfqdn.return_value = 'example.com'
                 mocks['get_current_scheme'].return_value = 'http'
                 self.assertEqual(get_current_domain(request), 'example.com:8443')
+
+    def test_build_json_collection_response(self):
+
+        response = build_json_collection_response(iterencode_list(iter([1, 2])), 2, etag='"etag"')
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, b'[1, 2]')
+        self.assertEqual(response['ETag'], '"etag"')
+
+    @override_settings(WIRECLOUD_JSON_STREAMING_THRESHOLD=1)
+    def test_build_json_collection_response_streaming(self):
+
+        response = build_json_collection_response(iterencode_list(iter([1, 2])), 2, etag='"etag"')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b'[1, 2]')
+        self.assertEqual(response['ETag'], '"etag"')
@@ -18,10 +18,29 @@
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
 import hashlib
+import json
+import logging
 import time
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_bytes
 from django.utils.http import http_date
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_STATS = ('rebuilds', 'rebuild_time', 'stale_hits', 'waits', 'wait_time', 'wait_timeouts')
+PREFERRED_ENCODINGS = ('br', 'gzip')
 
 
 def patch_cache_headers(response, timestamp=None, cache_timeout=None, etag=None):
@@ -50,9 +69,119 @@ def patch_cache_headers(response, timestamp=None, cache_timeout=None, etag=None)
     return response
 
 
+def new_generation():
+    """
+    Returns the initial value for a generation counter. Generation counters
+    are stored along the objects they version and are incremented every time
+    the object is modified, so they can be used for building cache keys
+    without requiring extra cache lookups. Initial values are based on the
+    current time (in microseconds), so new counters start after any value
+    used by previously deleted objects (even if their ids are reused).
+    """
+
+    return int(time.time() * 1000000)
+
+
+def get_version_etag(*parts):
+    """
+    Builds an ETag from the parts identifying the version of a resource, so
+    it can be computed without building the response.
+    """
+
+    return '"%s"' % hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf8')).hexdigest()
+
+
+def get_not_modified_response(request, etag, timestamp=None):
+    """
+    Returns a 304 response if the client already has the version of the
+    resource identified by the given ETag, ``None`` otherwise.
+    """
+
+    # Compressed responses use the weak version of the ETag
+    if etag is None or request.META.get('HTTP_IF_NONE_MATCH') not in (etag, 'W/' + etag):
+        return None
+
+    return patch_cache_headers(HttpResponseNotModified(), timestamp, etag=etag)
+
+
+def compress_payload(data):
+    """
+    Returns a dict with the precompressed variants (indexed by content
+    encoding) of the given payload. Only the variants smaller than the
+    original payload are returned.
+    """
+
+    data = force_bytes(data)
+    encodings = {}
+    if len(data) < getattr(settings, 'WIRECLOUD_PRECOMPRESS_MIN_SIZE', 200):
+        return encodings
+
+    compressed_data = compress_string(data)
+    if len(compressed_data) < len(data):
+        encodings['gzip'] = compressed_data
+
+    if brotli is not None:
+        compressed_data = brotli.compress(data)
+        if len(compressed_data) < len(data):
+            encodings['br'] = compressed_data
+
+    return encodings
+
+
+def get_accepted_encoding(request, encodings):
+    """
+    Returns the content encoding to use for responding the given request
+    from the available ``encodings`` or ``None`` if the request does not
+    accept any of them.
+    """
+
+    accepted = set()
+    for value in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        params = value.split(';')
+        encoding = params[0].strip().lower()
+        params = dict(param.strip().partition('=')[::2] for param in params[1:])
+        try:
+            if float(params.get('q', 1)) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(encoding)
+
+    for encoding in PREFERRED_ENCODINGS:
+        if encoding in encodings and encoding in accepted:
+            return encoding
+
+    return None
+
+
+def build_precompressed_response(request, data, encodings, status=200, content_type='application/json; charset=UTF-8', etag=None):
+    """
+    Returns a response for the given payload, using one of its precompressed
+    variants (see ``compress_payload``) if accepted by the client.
+    """
+
+    encoding = get_accepted_encoding(request, encodings) if request is not None else None
+    if encoding is None:
+        response = HttpResponse(data, status=status, content_type=content_type)
+        if etag is not None:
+            response['ETag'] = etag
+    else:
+        response = HttpResponse(encodings[encoding], status=status, content_type=content_type)
+        response['Content-Encoding'] = encoding
+        # Same ETag used by GZipMiddleware for compressed responses
+        if etag is None:
+            etag = '"%s"' % hashlib.sha1(force_bytes(data)).hexdigest()
+        response['ETag'] = 'W/' + etag
+
+    if len(encodings) > 0:
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+    return response
+
+
 class CacheableData(object):
 
-    def __init__(self, data, timestamp=None, timeout=0, content_type='application/json; charset=UTF-8'):
+    def __init__(self, data, timestamp=None, timeout=0, content_type='application/json; charset=UTF-8', etag=None, precompress=False):
 
         self.data = data
 
@@ -62,15 +191,112 @@ class CacheableData(object):
 
         self.timeout = timeout
         self.content_type = content_type
+        self.etag = etag
+        self.encodings = compress_payload(data) if precompress else {}
 
     def get_data(self):
 
         return self.data
 
-    def get_response(self, status_code=200, cacheable=True):
+    def get_response(self, status_code=200, cacheable=True, request=None):
+        """
+        Returns a response for this data. The precompressed versions of the
+        data are used if ``request`` is provided and the client accepts them.
+        """
 
-        response = HttpResponse(self.data, status=status_code, content_type=self.content_type)
+        etag = getattr(self, 'etag', None)
+        response = build_precompressed_response(request, self.data, getattr(self, 'encodings', {}), status=status_code, content_type=self.content_type, etag=etag)
         if cacheable:
             patch_cache_headers(response, self.timestamp, self.timeout)
 
         return response
+
+
+def _increment_stat(name, delta=1):
+
+    key = '_cache_stats/%s' % name
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # The counter is not present (or has been evicted)
+        if not cache.add(key, delta, None):
+            cache.incr(key, delta)
+
+
+def get_cache_stats():
+    """
+    Returns the counters collected by ``get_or_rebuild`` across all the
+    workers sharing the cache. Times are provided in milliseconds.
+    """
+
+    values = cache.get_many(['_cache_stats/%s' % name for name in CACHE_STATS])
+    return {name: values.get('_cache_stats/%s' % name, 0) for name in CACHE_STATS}
+
+
+def get_or_rebuild(key, rebuild, stale_key=None, allow_stale=False, timeout=DEFAULT_TIMEOUT):
+    """
+    Returns the value stored in the cache using the given key, calling
+    ``rebuild`` for computing it on cache misses.
+
+    Only one worker will call ``rebuild`` at a time (a lock is stored in the
+    cache for this purpose), other workers will wait for the value to be
+    available. Rebuilt values are also stored using ``stale_key`` (if
+    provided), so the previous value can be returned instead of waiting when
+    ``allow_stale`` is ``True``. Allow stale values only when returning
+    outdated data is correct.
+    """
+
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock_timeout = getattr(settings, 'WIRECLOUD_CACHE_LOCK_TIMEOUT', 30)
+    wait_timeout = getattr(settings, 'WIRECLOUD_CACHE_WAIT_TIMEOUT', 5)
+
+    lock_key = '_cache_lock/%s' % key
+    locked = cache.add(lock_key, True, lock_timeout)
+    if not locked:
+
+        if allow_stale and stale_key is not None:
+            value = cache.get(stale_key)
+            if value is not None:
+                _increment_stat('stale_hits')
+                return value
+
+        start = time.time()
+        while time.time() - start < wait_timeout:
+            time.sleep(0.05)
+
+            value = cache.get(key)
+            if value is not None:
+                wait_time = int((time.time() - start) * 1000)
+                _increment_stat('waits')
+                _increment_stat('wait_time', wait_time)
+                logger.debug('Waited %(time)sms for %(key)s to be rebuilt by another worker', {'key': key, 'time': wait_time})
+                return value
+
+            if cache.get(lock_key) is None:
+                # The other worker has released the lock without storing a
+                # value (e.g. due to an error), so rebuild it by ourselves
+                break
+
+        else:
+            _increment_stat('wait_timeouts')
+            logger.warning('Timeout waiting for %(key)s to be rebuilt by another worker', {'key': key})
+
+        locked = cache.add(lock_key, True, lock_timeout)
+
+    start = time.time()
+    try:
+        value = rebuild()
+        cache.set(key, value, timeout)
+        if stale_key is not None:
+            cache.set(stale_key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key)
+
+    _increment_stat('rebuilds')
+    _increment_stat('rebuild_time', int((time.time() - start) * 1000))
+
+    return value
@@ -123,6 +123,7 @@ def load_default_wirecloud_conf(settings, instance_type='platform'):
 
     settings['URL_MIDDLEWARE_CLASSES'] = {
         'default': (
+            'wirecloud.commons.middleware.ServerTimingMiddleware',
             'django.middleware.security.SecurityMiddleware',
             'django.contrib.sessions.middleware.SessionMiddleware',
             'wirecloud.commons.middleware.ConditionalGetMiddleware',
@@ -134,6 +135,7 @@ def load_default_wirecloud_conf(settings, instance_type='platform'):
             'django.contrib.messages.middleware.MessageMiddleware',
         ),
         'api': (
+            'wirecloud.commons.middleware.ServerTimingMiddleware',
             'django.middleware.security.SecurityMiddleware',
             'django.contrib.sessions.middleware.SessionMiddleware',
             'wirecloud.commons.middleware.ConditionalGetMiddleware',
@@ -144,6 +146,7 @@ def load_default_wirecloud_conf(settings, instance_type='platform'):
             'django.contrib.auth.middleware.SessionAuthenticationMiddleware',
         ),
         'proxy': (
+            'wirecloud.commons.middleware.ServerTimingMiddleware',
             'django.middleware.security.SecurityMiddleware',
             'django.contrib.sessions.middleware.SessionMiddleware',
             'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -157,6 +160,11 @@ def load_default_wirecloud_conf(settings, instance_type='platform'):
         'compressor.finders.CompressorFinder',
     )
 
+    if instance_type == 'platform':
+        settings['STATICFILES_FINDERS'] += (
+            'wirecloud.platform.i18n.JavaScriptCatalogFinder',
+        )
+
     settings['LOGGING'] = {
         'version': 1,
         'disable_existing_loggers': True,
@@ -43,3 +43,38 @@ class LazyEncoderXHTML(LazyEncoder):
             chunk = chunk.replace('<', '\\u003c')
             chunk = chunk.replace('>', '\\u003e')
             yield chunk
+
+
+def iterencode_list(items, encoder=None):
+    """
+    Encodes the values provided by the ``items`` iterable as a JSON array,
+    yielding a chunk per item. Items are consumed as they are encoded.
+    """
+
+    if encoder is None:
+        encoder = JSONEncoder(sort_keys=True)
+
+    yield '['
+    separator = ''
+    for item in items:
+        yield separator + encoder.encode(item)
+        separator = ', '
+    yield ']'
+
+
+def iterencode_dict(items, encoder=None):
+    """
+    Encodes the ``(key, value)`` pairs provided by the ``items`` iterable as a
+    JSON object, yielding a chunk per pair. Pairs are consumed as they are
+    encoded.
+    """
+
+    if encoder is None:
+        encoder = JSONEncoder(sort_keys=True)
+
+    yield '{'
+    separator = ''
+    for key, value in items:
+        yield separator + encoder.encode(key) + ': ' + encoder.encode(value)
+        separator = ', '
+    yield '}'
@@ -25,12 +25,14 @@ from lxml import etree
 from lxml.html import fragment_fromstring, XHTMLParser
 from six.moves.urllib.parse import urljoin, urlparse
 
+from wirecloud.commons.utils.timing import timed
 from wirecloud.commons.utils.version import Version
 
 
 VERSION_HEADER_RE = re.compile('[\s(]')
 
 
+@timed('html')
 def clean_html(code, base_url=None):
     parser = XHTMLParser()
     doc = fragment_fromstring(code, create_parent=True, parser=parser)
@@ -73,6 +75,7 @@ def clean_html(code, base_url=None):
     return (doc.text or '') + ''.join([etree.tostring(child, method='xml').decode('utf-8') for child in doc.iterchildren()])
 
 
+@timed('html')
 def filter_changelog(code, from_version):
 
     parser = XHTMLParser()
@@ -110,3 +113,67 @@ def filter_changelog(code, from_version):
                 break
 
     return (doc.text or '') + ''.join([etree.tostring(child, method='xml').decode('utf-8') for child in doc.iterchildren()])
+
+
+def _get_header_version(header):
+
+    if header.text is None:
+        return None
+
+    title = header.text[1:] if header.text.startswith('v') else header.text
+    try:
+        return Version(VERSION_HEADER_RE.split(title, 1)[0])
+    except:
+        return None
+
+
+@timed('html')
+def get_changelog_sections(code):
+    """
+    Splits a changelog into sections, one per version, using the same rules
+    used by ``filter_changelog``. Returns a tuple with the code preceding the
+    first element and the list of sections as ``(version sortable key,
+    code)`` tuples, or ``None`` if no version header is found.
+    """
+
+    parser = XHTMLParser()
+    doc = fragment_fromstring(code, create_parent=True, parser=parser)
+
+    headerelement = None
+    for header in doc.xpath('/div/h1|/div/h2|/div/h3'):
+        if _get_header_version(header) is not None:
+            headerelement = header.tag
+            break
+
+    if headerelement is None:
+        return None
+
+    sections = []
+    for element in doc.iterchildren():
+        version = _get_header_version(element) if element.tag == headerelement else None
+        if version is not None:
+            sections.append((version.sortable_key, []))
+
+        # Elements preceding the first version are discarded
+        if len(sections) > 0:
+            sections[-1][1].append(etree.tostring(element, method='xml').decode('utf-8'))
+
+    return doc.text or '', [(version, ''.join(elements)) for version, elements in sections]
+
+
+def filter_changelog_sections(sections, from_version):
+    """
+    Equivalent to ``filter_changelog`` but using the sections returned by
+    ``get_changelog_sections``.
+    """
+
+    prefix, sections = sections
+    from_key = from_version.sortable_key
+
+    code = prefix
+    for version, section in sections:
+        if version <= from_key:
+            break
+        code += section
+
+    return code
@@ -26,7 +26,7 @@ import socket
 from six.moves.urllib.parse import urljoin, urlparse, unquote
 
 from django.core.urlresolvers import reverse
-from django.http import HttpResponse, HttpResponseRedirect, Http404
+from django.http import HttpResponse, HttpResponseRedirect, Http404, StreamingHttpResponse
 from django.utils.encoding import smart_str
 from django.utils.translation import ugettext as _
 from lxml import etree
@@ -424,6 +424,28 @@ def build_downloadfile_response(request, file_path, base_dir):
         return build_sendfile_response(file_path, base_dir)
 
 
+def build_json_collection_response(chunks, size, etag=None, content_type='application/json; charset=UTF-8'):
+    """
+    Returns a response for the JSON document provided by ``chunks`` (see
+    ``wirecloud.commons.utils.encoding.iterencode_list``). Collections with
+    more than ``WIRECLOUD_JSON_STREAMING_THRESHOLD`` items are streamed, so
+    the full document is never held in memory. ``etag`` should be computed
+    from the version of the items, as streamed responses are not hashed.
+    """
+
+    from django.conf import settings
+
+    if size > getattr(settings, 'WIRECLOUD_JSON_STREAMING_THRESHOLD', 200):
+        response = StreamingHttpResponse((chunk.encode('utf-8') for chunk in chunks), content_type=content_type)
+    else:
+        response = HttpResponse(''.join(chunks), content_type=content_type)
+
+    if etag is not None:
+        response['ETag'] = etag
+
+    return response
+
+
 def parse_json_request(request):
 
     try:
@@ -17,15 +17,20 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict
 from copy import deepcopy
 from six.moves.urllib.parse import urljoin
 
+from lxml import etree
+import rdflib
 import six
 
+from wirecloud.commons.utils.timing import timed
 from wirecloud.commons.utils.template.base import ObsoleteFormatError, TemplateFormatError, TemplateParseException
+from wirecloud.commons.utils.template.parsers.cache import cache_template_info, get_cached_template_info, get_template_hash
 from wirecloud.commons.utils.template.parsers.json import JSONTemplateParser
 from wirecloud.commons.utils.template.parsers.xml import ApplicationMashupTemplateParser
-from wirecloud.commons.utils.template.parsers.rdf import RDFTemplateParser
+from wirecloud.commons.utils.template.parsers.rdf import RDF_NS, RDFTemplateParser
 
 
 __all__ = ('ObsoleteFormatError', 'TemplateFormatError', 'TemplateParseException', 'TemplateParser')
@@ -42,19 +47,64 @@ def absolutize_url_field(value, base_url):
     return value
 
 
+def _resolve_path(data, path):
+    for key in path:
+        data = data[key]
+
+    return data
+
+
+class CachedTemplateParser(object):
+    """
+    Parser used for descriptions that have already been parsed and validated.
+    """
+
+    def __init__(self, info):
+        self._info = info
+
+    def _init(self):
+        pass
+
+    def get_resource_type(self):
+        return self._info['type']
+
+    def get_resource_name(self):
+        return self._info['name']
+
+    def get_resource_vendor(self):
+        return self._info['vendor']
+
+    def get_resource_version(self):
+        return self._info['version']
+
+    def get_resource_info(self):
+        return dict(self._info)
+
+
 class TemplateParser(object):
 
     _doc = None
     _parser = None
+    _cached = False
+    _translation_plan = None
     parsers = (ApplicationMashupTemplateParser, JSONTemplateParser, RDFTemplateParser)
 
+    @timed('template-parser')
     def __init__(self, template, base=None):
 
         self.base = base
 
-        for parser in self.parsers:
+        self._cache_key = get_template_hash(template)
+        if self._cache_key is not None:
+            info = get_cached_template_info(self._cache_key)
+            if info is not None:
+                self._parser = CachedTemplateParser(info)
+                self._cached = True
+                return
+
+        for parser, data in self._sniff_template(template):
             try:
-                self._parser = parser(template)
+                self._parser = parser(data)
                 # We have found a valid parser for this document, stop
                 # searching
                 break
@@ -74,6 +124,52 @@ class TemplateParser(object):
 
         self._parser._init()
 
+    def _sniff_template(self, template):
+        """
+        Returns the list of (parser, data) pairs to try for the given
+        template. The format is detected from the leading characters and, for
+        XML documents, from the namespace of the root element, so usually
+        only one parser has to be run.
+        """
+
+        if isinstance(template, dict):
+            return ((JSONTemplateParser, template),)
+        elif isinstance(template, rdflib.Graph):
+            return ((RDFTemplateParser, template),)
+        elif not isinstance(template, (six.text_type, bytes)):
+            return tuple((parser, template) for parser in self.parsers)
+
+        if isinstance(template, six.text_type):
+            head = template.lstrip('\ufeff \t\r\n')[:1]
+            is_xml = head == '<'
+        else:
+            head = template.lstrip(b'\xef\xbb\xbf \t\r\n')[:1]
+            is_xml = head == b'<'
+
+        if head in ('{', b'{'):
+            return ((JSONTemplateParser, template),)
+        elif not is_xml:
+            # N3/Turtle descriptions
+            return ((RDFTemplateParser, template),)
+
+        try:
+            doc = etree.fromstring(template.encode('utf-8') if isinstance(template, six.text_type) else template)
+        except etree.XMLSyntaxError:
+            # N3 documents can also start with "<" (IRIs)
+            return ((RDFTemplateParser, template),)
+
+        root_element_qname = etree.QName(doc)
+        if root_element_qname.namespace == RDF_NS and root_element_qname.localname == 'RDF':
+            graph = rdflib.Graph()
+            try:
+                graph.parse(data=template, format='xml')
+            except Exception:
+                return ()
+
+            return ((RDFTemplateParser, graph),)
+
+        return ((ApplicationMashupTemplateParser, doc),)
+
     def set_base(self, base):
         self.base = base
 
@@ -91,7 +187,13 @@ class TemplateParser(object):
 
     def get_resource_info(self):
 
-        return self._parser.get_resource_info()
+        info = self._parser.get_resource_info()
+        if self._cache_key is not None and not self._cached:
+            # Only store descriptions that have been fully validated
+            cache_template_info(self._cache_key, info)
+            self._cached = True
+
+        return info
 
     def get_absolute_url(self, url, base=None):
 
@@ -100,50 +202,83 @@ class TemplateParser(object):
 
         return urljoin(base, url)
 
+    def get_translation_plan(self):
+        """
+        Returns the list of fields that have to be localized. Each entry is a
+        ``(path, field, template, indexes)`` tuple where ``path`` is the
+        sequence of keys leading to the dict containing ``field``,
+        ``template`` is the original (untranslated) value and ``indexes`` are
+        the translation indexes used by that value.
+
+        The plan only depends on the description, so it is computed once per
+        parser and then reused for every language.
+        """
+
+        if self._translation_plan is not None:
+            return self._translation_plan
+
+        info = self.get_resource_info()
+
+        variables = {}
+        if info['type'] in ('widget', 'operator'):
+            for i, pref in enumerate(info['preferences']):
+                variables[pref['name']] = ('preferences', i)
+            for i, prop in enumerate(info['properties']):
+                variables[prop['name']] = ('properties', i)
+            for i, inputendpoint in enumerate(info['wiring']['inputs']):
+                variables[inputendpoint['name']] = ('wiring', 'inputs', i)
+            for i, outputendpoint in enumerate(info['wiring']['outputs']):
+                variables[outputendpoint['name']] = ('wiring', 'outputs', i)
+
+        targets = OrderedDict()
+
+        def add_target(path, container, fields, index):
+            token = '__MSG_' + index + '__'
+            for field in fields:
+                value = container[field]
+                if isinstance(value, six.string_types) and token in value:
+                    targets.setdefault((path, field), (value, []))[1].append(index)
+
+        for index, usages in six.iteritems(info.get('translation_index_usage', {})):
+            for use in usages:
+                if use['type'] == 'resource':
+                    add_target((), info, (use['field'],), index)
+                elif use['type'] in ('vdef', 'inputendpoint', 'outputendpoint'):
+                    path = variables[use['variable']]
+                    variable = _resolve_path(info, path)
+                    add_target(path, variable, tuple(variable), index)
+                elif use['type'] == 'upo':
+                    path = variables[use['variable']]
+                    for i, option in enumerate(_resolve_path(info, path)['options']):
+                        add_target(path + ('options', i), option, tuple(option), index)
+
+        self._translation_plan = tuple((path, field, template, tuple(indexes)) for (path, field), (template, indexes) in six.iteritems(targets))
+        return self._translation_plan
+
     def get_resource_processed_info(self, base=None, lang=None, process_urls=True, translate=True, process_variables=False):
-        info = deepcopy(self.get_resource_info())
+        source = self.get_resource_info()
+        # Translations are not part of the processed info, so there is no
+        # need to copy them
+        info = deepcopy({key: value for key, value in six.iteritems(source) if key not in ('translations', 'translation_index_usage')})
 
         if translate and lang is None:
             from django.utils import translation
             lang = translation.get_language()
 
-        variables = {}
-        if info['type'] in ('widget', 'operator'):
-            for pref in info['preferences']:
-                variables[pref['name']] = pref
-            for prop in info['properties']:
-                variables[prop['name']] = prop
-            for inputendpoint in info['wiring']['inputs']:
-                variables[inputendpoint['name']] = inputendpoint
-            for outputendpoint in info['wiring']['outputs']:
-                variables[outputendpoint['name']] = outputendpoint
-
         # process translations
-        if translate and len(info['translations']) > 0:
-
-            translation = info['translations'][info['default_lang']]
-            if lang in info['translations']:
-                translation.update(info['translations'][lang])
-
-            for index in translation:
-                value = translation[index]
-                usages = info['translation_index_usage'][index]
-                for use in usages:
-                    if use['type'] == 'resource':
-                        info[use['field']] = info[use['field']].replace('__MSG_' + index + '__', value)
-                    elif use['type'] in ('vdef', 'inputendpoint', 'outputendpoint'):
-                        variable = variables[use['variable']]
-                        for field in variable:
-                            if isinstance(variable[field], six.string_types):
-                                variable[field] = variable[field].replace('__MSG_' + index + '__', value)
-                    elif use['type'] == 'upo':
-                        variable = variables[use['variable']]
-                        for option in variable['options']:
-                            for field in option:
-                                if isinstance(option[field], six.string_types):
-                                    option[field] = option[field].replace('__MSG_' + index + '__', value)
-        del info['translations']
-        del info['translation_index_usage']
+        translations = source.get('translations', {})
+        if translate and len(translations) > 0:
+
+            translation = dict(translations[source['default_lang']])
+            if lang in translations:
+                translation.update(translations[lang])
+
+            for path, field, template, indexes in self.get_translation_plan():
+                value = template
+                for index in indexes:
+                    if index in translation:
+                        value = value.replace('__MSG_' + index + '__', translation[index])
+                _resolve_path(info, path)[field] = value
 
         # Provide a fallback for the title
         if info['title'] == '':
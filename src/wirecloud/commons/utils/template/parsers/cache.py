@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from copy import deepcopy
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+import six
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+_parsers_signature = None
+
+
+def _get_setting(name, default):
+    # Template parsers are also used by wirecloud-admin commands, where
+    # Django settings may not be configured
+    if not settings.configured:
+        return default
+
+    return getattr(settings, name, default)
+
+
+def get_parsers_signature():
+    """
+    Returns a signature of the code of the template parsers (the files of the
+    ``wirecloud.commons.utils.template`` package), so cached descriptions are
+    discarded when the parsers change.
+    """
+
+    global _parsers_signature
+
+    if _parsers_signature is None:
+        digest = hashlib.sha1()
+        template_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for root, dirs, files in os.walk(template_dir):
+            dirs[:] = sorted(directory for directory in dirs if directory != '__pycache__')
+            for filename in sorted(files):
+                if filename.endswith(('.pyc', '.pyo')):
+                    continue
+
+                path = os.path.join(root, filename)
+                digest.update(os.path.relpath(path, template_dir).encode('utf-8'))
+                with io.open(path, 'rb') as f:
+                    digest.update(f.read())
+
+        _parsers_signature = digest.hexdigest()
+
+    return _parsers_signature
+
+
+def get_template_hash(template):
+    """
+    Returns the key used for caching the parsed version of the given template
+    or ``None`` if the template cannot be cached (only raw descriptions are
+    cached).
+    """
+
+    if isinstance(template, six.text_type):
+        template = template.encode('utf-8')
+    elif not isinstance(template, bytes):
+        return None
+
+    digest = hashlib.sha1(get_parsers_signature().encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(template)
+    return digest.hexdigest()
+
+
+def _get_disk_path(key):
+    cache_dir = _get_setting('WIRECLOUD_TEMPLATE_CACHE_DIR', None)
+    if cache_dir is None:
+        return None
+
+    return os.path.join(cache_dir, key[:2], key + '.json')
+
+
+def _read_from_disk(key):
+    path = _get_disk_path(key)
+    if path is None or not os.path.exists(path):
+        return None
+
+    try:
+        with io.open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        logger.warning('Error reading cached template description: %s' % path)
+        return None
+
+
+def _write_to_disk(key, info):
+    path = _get_disk_path(key)
+    if path is None:
+        return
+
+    directory = os.path.dirname(path)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with io.open(fd, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(info, ensure_ascii=False))
+        os.rename(tmp_path, path)
+    except (IOError, OSError):
+        logger.warning('Error storing cached template description: %s' % path)
+
+
+def _store(key, info):
+    max_entries = _get_setting('WIRECLOUD_TEMPLATE_CACHE_SIZE', 128)
+    with _lock:
+        # Re-insert the entry so it becomes the most recently used one
+        _entries.pop(key, None)
+        _entries[key] = info
+        while len(_entries) > max_entries:
+            _entries.popitem(last=False)
+
+
+def get_cached_template_info(key):
+    """
+    Returns a copy of the normalized description stored for the given key or
+    ``None`` if the description is not available in the cache.
+    """
+
+    with _lock:
+        info = _entries.get(key)
+
+    if info is None:
+        info = _read_from_disk(key)
+        if info is None:
+            return None
+
+    _store(key, info)
+    return deepcopy(info)
+
+
+def cache_template_info(key, info):
+
+    info = deepcopy(info)
+    _store(key, info)
+    _write_to_disk(key, info)
+
+
+def clear_template_cache():
+
+    with _lock:
+        _entries.clear()
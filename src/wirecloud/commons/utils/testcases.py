@@ -28,6 +28,7 @@ import shutil
 import stat
 import sys
 from tempfile import mkdtemp
+import time
 from six.moves.urllib.error import URLError, HTTPError
 from six.moves.urllib.parse import unquote, urlparse
 
@@ -35,8 +36,10 @@ from django.apps import apps
 from django.contrib.auth.models import Group, User
 from django.contrib.staticfiles import finders
 from django.core import management
+from django.db import connection
 from django.test import LiveServerTestCase, TestCase
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.utils import translation
 import mock
 import haystack
@@ -344,6 +347,52 @@ DEFAULT_TEST_HAYSTACK_CONNECTIONS = {
 }
 
 
+# Maximum number of database queries (and, optionally, maximum time in
+# milliseconds) allowed for processing a request to the main REST endpoints,
+# indexed by url pattern name and HTTP method. See
+# WirecloudTestCase.assertWithinBudget
+ENDPOINT_BUDGETS = {
+    ('wirecloud.workspace_entry', 'GET'): {'queries': 20},
+    ('wirecloud.workspace_wiring', 'PUT'): {'queries': 10},
+    ('wirecloud.iwidget_entry', 'POST'): {'queries': 12},
+    ('wirecloud.iwidget_collection', 'PUT'): {'queries': 12},
+    ('wirecloud.tab_order', 'POST'): {'queries': 10},
+    ('wirecloud.platform_preferences', 'POST'): {'queries': 6},
+    ('wirecloud_catalogue.resource_versions', 'POST'): {'queries': 3},
+}
+
+
+class BudgetContext(CaptureQueriesContext):
+
+    def __init__(self, testcase, name, queries=None, time=None):
+        self.testcase = testcase
+        self.name = name
+        self.max_queries = queries
+        self.max_time = time
+        super(BudgetContext, self).__init__(connection)
+
+    def __enter__(self):
+        self.start = time.time()
+        return super(BudgetContext, self).__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed_time = (time.time() - self.start) * 1000
+        super(BudgetContext, self).__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+
+        if self.max_queries is not None and len(self) > self.max_queries:
+            self.testcase.fail("%s exceeded its query budget: %d queries executed, %d allowed\nCaptured queries were:\n%s" % (
+                self.name,
+                len(self),
+                self.max_queries,
+                '\n'.join(query['sql'] for query in self.captured_queries),
+            ))
+
+        if self.max_time is not None and elapsed_time > self.max_time:
+            self.testcase.fail("%s exceeded its time budget: %.3fms spent, %dms allowed" % (self.name, elapsed_time, self.max_time))
+
+
 class WirecloudTestCase(object):
 
     base_resources = ()
@@ -475,6 +524,51 @@ class WirecloudTestCase(object):
 
         super(WirecloudTestCase, self).tearDown()
 
+    def assertWithinBudget(self, endpoint, method='GET', **budget):
+        """
+        Returns a context manager failing if the code executed inside it
+        exceeds the budget defined for the given endpoint on
+        ``ENDPOINT_BUDGETS``. The ``queries`` and ``time`` keyword arguments
+        can be used for overriding it::
+
+            with self.assertWithinBudget('wirecloud.workspace_entry', 'GET'):
+                self.client.get(url, HTTP_ACCEPT='application/json')
+
+        Time budgets (in milliseconds) are only checked when passed using the
+        ``time`` keyword argument or when the ``WIRECLOUD_TEST_TIME_BUDGET``
+        setting is defined, as they depend on the machine running the tests.
+        """
+
+        from django.conf import settings
+
+        endpoint_budget = {'time': getattr(settings, 'WIRECLOUD_TEST_TIME_BUDGET', None)}
+        endpoint_budget.update(ENDPOINT_BUDGETS.get((endpoint, method), {}))
+        endpoint_budget.update(budget)
+        return BudgetContext(self, '%s %s' % (method, endpoint), **endpoint_budget)
+
+    def assertQueryCountScales(self, populate, operation, sizes=(1, 50), per_item=0):
+        """
+        Checks how the number of queries made by ``operation`` grows with the
+        number of items (e.g. widgets) it has to process. ``populate(size)``
+        is called for preparing each of the scenarios and then the queries
+        made by ``operation()`` are counted. Fails if the number of queries
+        grows more than ``per_item`` queries per item (by default, the number
+        of queries must not depend on the number of items).
+        """
+
+        counts = []
+        for size in sizes:
+            populate(size)
+            with CaptureQueriesContext(connection) as context:
+                operation()
+            counts.append(len(context))
+
+        for size, count in zip(sizes[1:], counts[1:]):
+            if count - counts[0] > (size - sizes[0]) * per_item:
+                self.fail('The number of queries grows with the number of items: %s' % ', '.join(
+                    '%d queries for %d items' % (count, size) for size, count in zip(sizes, counts)
+                ))
+
     def changeLanguage(self, new_language):
 
         from django.conf import settings
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Collection of the time spent on each kind of operation (database queries,
+cache accesses, template parsing, ...) while processing a request. Metrics
+are only collected for the requests sampled by the
+``wirecloud.commons.middleware.ServerTimingMiddleware``, recording a metric
+outside them does nothing.
+"""
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+from functools import wraps
+import threading
+import time
+
+
+_local = threading.local()
+
+
+class RequestTimings(object):
+
+    def __init__(self):
+        self.start = time.time()
+        self.metrics = OrderedDict()
+
+    def record(self, name, duration, **counters):
+        """
+        Adds ``duration`` (in milliseconds) and the given counters to the
+        metric identified by ``name``. Counters default to one call.
+        """
+
+        if len(counters) == 0:
+            counters = {'calls': 1}
+
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = {'duration': 0.0}
+
+        metric['duration'] += duration
+        for counter, value in counters.items():
+            metric[counter] = metric.get(counter, 0) + value
+
+    @property
+    def total(self):
+        return (time.time() - self.start) * 1000
+
+    def to_header(self):
+        """
+        Returns the metrics using the format of the Server-Timing header.
+        """
+
+        entries = []
+        for name, metric in self.metrics.items():
+            counters = ', '.join('%s %s' % (metric[counter], counter) for counter in sorted(metric) if counter != 'duration')
+            entries.append('%s;dur=%.3f;desc="%s"' % (name, metric['duration'], counters))
+
+        entries.append('total;dur=%.3f' % self.total)
+        return ', '.join(entries)
+
+
+def activate():
+    """
+    Starts collecting metrics on the current thread.
+    """
+
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def deactivate():
+
+    timings = get_current()
+    _local.timings = None
+    return timings
+
+
+def get_current():
+    """
+    Returns the metrics being collected on the current thread or ``None``
+    if metrics are not being collected.
+    """
+
+    return getattr(_local, 'timings', None)
+
+
+def record(name, duration, **counters):
+
+    timings = get_current()
+    if timings is not None:
+        timings.record(name, duration, **counters)
+
+
+class timer(object):
+    """
+    Context manager recording the time spent on its block::
+
+        with timer('json'):
+            data = json.dumps(value)
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.timings = get_current()
+        if self.timings is not None:
+            self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.timings is not None:
+            self.timings.record(self.name, (time.time() - self.start) * 1000)
+
+
+def timed(name):
+    """
+    Decorator recording the time spent on each call to the decorated
+    function.
+    """
+
+    def decorator(func):
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -31,6 +31,7 @@ def cmp(a, b):
 class Version(object):
 
     version_re = regex.compile(r'^([1-9]\d*|0)((?:\.(?:[1-9]\d*|0))*)(?:(a|b|rc)([1-9]\d*))?(-dev.*)?$')
+    PRERELEASE_KEYS = {'a': '1', 'b': '2', 'rc': '3'}
 
     def __init__(self, vstring, reverse=False):
 
@@ -59,6 +60,39 @@ class Version(object):
 
         self.reverse = reverse
 
+    @property
+    def sortable_key(self):
+        """
+        String that sorts (using plain string comparison) in the same order
+        as versions are compared, so it can be used for sorting and comparing
+        versions in database queries. Only digits are used, so the order does
+        not depend on the collation used by the database.
+        """
+
+        def encode_number(number):
+            # Numbers are prefixed by its length, numbers with more than 9
+            # digits are not supported (they are sorted as 999999999)
+            number = six.text_type(min(number, 999999999))
+            return six.text_type(len(number)) + number
+
+        # Trailing zeros are not relevant (1.0 == 1.0.0)
+        version = list(self.version)
+        while len(version) > 1 and version[-1] == 0:
+            version.pop()
+
+        # "0" is used as terminator as it sorts before any encoded number
+        # (1 < 1.1), followed by the development flag
+        key = ''.join(encode_number(number) for number in version)
+        key += '0' + ('0' if self.dev else '1')
+
+        # alpha < beta < release candidates < final releases
+        if self.prerelease is None:
+            key += '4'
+        else:
+            key += self.PRERELEASE_KEYS[self.prerelease[0]] + encode_number(self.prerelease[1])
+
+        return key
+
     def __cmp__(self, other):
 
         if isinstance(other, six.string_types):
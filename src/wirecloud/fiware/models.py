@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from wirecloud.platform.context.models import get_user_context_cache_key
+
+
+def invalidate_user_context(sender, instance, **kwargs):
+    # fiware_token_available is cached per user
+    cache.delete(get_user_context_cache_key(instance.user_id))
+
+
+if 'social_django' in settings.INSTALLED_APPS:
+    from social_django.models import UserSocialAuth
+
+    post_save.connect(invalidate_user_context, sender=UserSocialAuth)
+    post_delete.connect(invalidate_user_context, sender=UserSocialAuth)
@@ -128,10 +128,12 @@ class FiWarePlugin(WirecloudPlugin):
             'fiware_version': {
                 'label': _('FIWARE version'),
                 'description': _('FIWARE version of the platform'),
+                'volatility': 'deployment',
             },
             'fiware_token_available': {
                 'label': _('FIWARE token available'),
                 'description': _('Indicates if the current user has associated a FIWARE auth token that can be used for accessing other FIWARE resources'),
+                'volatility': 'user',
             },
         }
 
@@ -23,6 +23,7 @@ from copy import deepcopy
 import json
 import sys
 
+from django.core.cache import cache
 from django.test import TestCase
 from mock import patch, MagicMock, Mock
 
@@ -295,3 +296,14 @@ class TestSocialAuthBackend(WirecloudTestCase, TestCase):
 
         self.assertEqual(UserSocialAuth.objects.create.call_count, 0)
         org_social.user.group.add.assert_called_with(user)
+
+    def test_user_context_is_invalidated_on_social_auth_changes(self):
+
+        from wirecloud.fiware.models import invalidate_user_context
+        from wirecloud.platform.context.models import get_user_context_cache_key
+
+        cache.set(get_user_context_cache_key(5), {'fiware_token_available': False})
+
+        invalidate_user_context(self.social_django.models.UserSocialAuth, Mock(user_id=5))
+
+        self.assertIsNone(cache.get(get_user_context_cache_key(5)))
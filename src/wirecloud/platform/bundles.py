@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import hashlib
+from io import BytesIO
+import json
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.template import Context, Template
+from django.utils.encoding import force_bytes
+from lxml import etree
+from rjsmin import jsmin
+
+
+BUNDLE_MANIFEST = 'cache/bundles.json'
+SCRIPT_BUNDLES_DIR = 'cache/js'
+
+WIDGET_API_BUNDLE = 'widget-api'
+OPERATOR_API_BUNDLE = 'operator-api'
+WIDGET_STYLE_BUNDLE = 'widget-style/%s'
+PLATFORM_SCRIPTS_BUNDLE = 'platform-scripts/%s/%s'
+
+PLATFORM_VIEWS = ('classic', 'embedded', 'smartphone')
+
+VLQ_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+WIDGET_API_FILES = (
+    'js/WirecloudAPI/WirecloudAPIBootstrap.js',
+    'js/WirecloudAPI/WirecloudWidgetAPI.js',
+    'js/WirecloudAPI/WirecloudAPICommon.js',
+)
+
+OPERATOR_API_FILES = (
+    'js/WirecloudAPI/WirecloudAPIBootstrap.js',
+    'js/WirecloudAPI/WirecloudOperatorAPI.js',
+    'js/WirecloudAPI/WirecloudAPICommon.js',
+)
+
+_bundle_manifest = None
+_runtime_bundles = {}
+
+
+def get_widget_style_files(theme):
+    from wirecloud.platform.core.plugins import BASE_CSS, STYLED_ELEMENTS_CSS
+
+    return tuple('theme/%s/%s' % (theme, cssfile) for cssfile in ('css/gadget.scss',) + BASE_CSS + STYLED_ELEMENTS_CSS)
+
+
+def get_platform_script_files(theme, view):
+    from wirecloud.platform.plugins import get_extra_javascripts
+
+    files = get_extra_javascripts(view)
+
+    header_js = 'theme/%s/js/wirecloud/ui/WirecloudHeader.js' % theme
+    if finders.find(header_js):
+        files = [header_js if path == 'js/wirecloud/ui/WirecloudHeader.js' else path for path in files]
+
+    return tuple(files)
+
+
+def get_bundle_definitions():
+    """
+    Returns the files included in each of the bundles used by WireCloud,
+    indexed by bundle name.
+    """
+
+    from wirecloud.platform.themes import get_theme_registry
+
+    bundles = {
+        WIDGET_API_BUNDLE: ('js', WIDGET_API_FILES),
+        OPERATOR_API_BUNDLE: ('js', OPERATOR_API_FILES),
+    }
+
+    for theme in get_theme_registry().themes:
+        bundles[WIDGET_STYLE_BUNDLE % theme] = ('css', get_widget_style_files(theme))
+        for view in PLATFORM_VIEWS:
+            bundles[PLATFORM_SCRIPTS_BUNDLE % (theme, view)] = ('platform-js', get_platform_script_files(theme, view))
+
+    return bundles
+
+
+def compress_files(kind, files):
+    """
+    Renders a compress block including the given static files, returning the
+    URLs of the resulting files. Depending on the compressor configuration,
+    this may require compiling and compressing the files.
+    """
+
+    code = '{% load compress %}{% load static from staticfiles %}{% compress ' + kind + ' %}\n'
+
+    for path in files:
+        if kind == 'js':
+            code += '<script type="text/javascript" src="{%% static "%s" %%}"></script>\n' % path
+        else:
+            css_type = 'text/x-scss' if path.endswith('.scss') else 'text/css'
+            code += '<link rel="stylesheet" href="{%% static "%s" %%}" context="widget" type="%s" />\n' % (path, css_type)
+
+    code += '{% endcompress %}'
+
+    result = Template(code).render(Context())
+    # Compressor output is HTML (e.g. link elements may be not closed)
+    doc = etree.parse(BytesIO(result.encode('utf-8')), etree.HTMLParser(encoding='utf-8'))
+
+    if kind == 'js':
+        return [element.get('src') for element in doc.iter('script')]
+    else:
+        return [element.get('href') for element in doc.iter('link')]
+
+
+def encode_vlq(value):
+
+    value = (-value << 1) | 1 if value < 0 else value << 1
+
+    result = ''
+    while True:
+        digit = value & 31
+        value >>= 5
+        if value > 0:
+            digit |= 32
+        result += VLQ_CHARS[digit]
+        if value == 0:
+            return result
+
+
+def bundle_scripts(files, cache=None):
+    """
+    Concatenates and minifies the given static files, returning the code of
+    the bundle and its source map. Minification does not keep track of
+    positions, so each line of the bundle is mapped to the start of the file
+    it comes from. Minified code can be reused between calls through the
+    ``cache`` parameter.
+    """
+
+    if cache is None:
+        cache = {}
+
+    code = ''
+    mappings = []
+    previous_source = 0
+    for index, path in enumerate(files):
+        if path not in cache:
+            absolute_path = finders.find(path)
+            if absolute_path is None:
+                raise ImproperlyConfigured('%s static file is not available' % path)
+
+            with open(absolute_path, 'rb') as f:
+                cache[path] = jsmin(f.read().decode('utf-8')).strip()
+
+        file_code = cache[path] + ';\n'
+        lines = file_code.count('\n')
+        mappings.append('A' + encode_vlq(index - previous_source) + 'AA')
+        mappings += ['AAAA'] * (lines - 1)
+        previous_source = index
+        code += file_code
+
+    source_map = {
+        'version': 3,
+        'sources': [staticfiles_storage.url(path) for path in files],
+        'names': [],
+        'mappings': ';'.join(mappings),
+    }
+
+    return code, source_map
+
+
+def save_script_bundle(name, files, cache=None):
+    """
+    Stores a bundle (and its source map) with the given static files. Bundle
+    file names include the hash of its contents, so they can be cached
+    forever.
+    """
+
+    code, source_map = bundle_scripts(files, cache)
+
+    file_hash = hashlib.sha1(force_bytes(code)).hexdigest()
+    basename = '%s.%s.js' % (name.replace('/', '-'), file_hash[:12])
+    path = '%s/%s' % (SCRIPT_BUNDLES_DIR, basename)
+
+    if not staticfiles_storage.exists(path):
+        source_map['file'] = basename
+        staticfiles_storage.save(path + '.map', ContentFile(force_bytes(json.dumps(source_map, sort_keys=True))))
+        code += '//# sourceMappingURL=%s.map\n' % basename
+        staticfiles_storage.save(path, ContentFile(force_bytes(code)))
+
+    return staticfiles_storage.url(path)
+
+
+def get_file_hash(url):
+
+    path = url[len(settings.STATIC_URL):] if url.startswith(settings.STATIC_URL) else url
+    try:
+        with staticfiles_storage.open(path) as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except (IOError, OSError):
+        return None
+
+
+def build_bundle_manifest():
+    """
+    Builds the manifest describing the URLs (and the hash of the contents)
+    of the files generated by compressor for each of the bundles.
+    """
+
+    from wirecloud.platform.core.plugins import get_version_hash
+
+    bundles = {}
+    minified_code = {}
+    for name, (kind, files) in get_bundle_definitions().items():
+        if kind == 'platform-js':
+            urls = [save_script_bundle(name, files, minified_code)]
+        else:
+            urls = compress_files(kind, files)
+
+        bundles[name] = [{'url': url, 'hash': get_file_hash(url)} for url in urls]
+
+    return {
+        'version': get_version_hash(),
+        'bundles': bundles,
+    }
+
+
+def save_bundle_manifest(manifest):
+
+    if staticfiles_storage.exists(BUNDLE_MANIFEST):
+        staticfiles_storage.delete(BUNDLE_MANIFEST)
+
+    staticfiles_storage.save(BUNDLE_MANIFEST, ContentFile(force_bytes(json.dumps(manifest, sort_keys=True))))
+
+
+def get_bundle_manifest():
+    """
+    Returns the bundle manifest generated by the ``compressbundles`` command.
+    Raises ``ImproperlyConfigured`` if the manifest is missing or outdated.
+    """
+
+    global _bundle_manifest
+
+    if _bundle_manifest is None:
+        from wirecloud.platform.core.plugins import get_version_hash
+
+        try:
+            with staticfiles_storage.open(BUNDLE_MANIFEST) as f:
+                manifest = json.loads(f.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            raise ImproperlyConfigured('Missing bundle manifest, please run the compressbundles command')
+
+        if manifest.get('version') != get_version_hash():
+            raise ImproperlyConfigured('Outdated bundle manifest, please run the compressbundles command')
+
+        _bundle_manifest = manifest
+
+    return _bundle_manifest
+
+
+def get_bundle_files(name):
+    """
+    Returns the URLs of the files of the given bundle. If compression is
+    enabled, URLs are obtained from the bundle manifest, otherwise they are
+    obtained by rendering the compress block at runtime (as precompilers
+    are used even if compression is disabled). Platform scripts are not
+    bundled at runtime.
+    """
+
+    if settings.COMPRESS_ENABLED:
+        bundles = get_bundle_manifest()['bundles']
+        if name not in bundles:
+            raise ImproperlyConfigured('%s bundle is not available in the bundle manifest, please run the compressbundles command' % name)
+
+        return tuple(entry['url'] for entry in bundles[name])
+
+    if name not in _runtime_bundles or settings.DEBUG is True:
+        kind, files = get_bundle_definitions()[name]
+        if kind == 'platform-js':
+            _runtime_bundles[name] = tuple(staticfiles_storage.url(path) for path in files)
+        else:
+            _runtime_bundles[name] = tuple(compress_files(kind, files))
+
+    return _runtime_bundles[name]
+
+
+def clear_cache():
+
+    global _bundle_manifest
+    global _runtime_bundles
+
+    _bundle_manifest = None
+    _runtime_bundles = {}
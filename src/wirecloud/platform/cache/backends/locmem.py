@@ -1,25 +1,44 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-"""Infinite caching locmem class.  Caches forever when passed timeout of 0.
+"""Infinite caching locmem class.  Caches forever when passed timeout of 0."""
 
-This actually doesn't cache "forever", just for a very long time.  On
-32 bit systems, it will cache for 68 years, quite a bit longer than any
-computer will last.  On a 64 bit machine, your cache will expire about
-285 billion years after the Sun goes red-giant and destroys Earth."""
+import time
 
 from django.core.cache.backends import locmem
 from django.utils.encoding import smart_str
-import sys
+
+from wirecloud.commons.utils.timing import record
+
+
+MISSING = object()
 
 
 class LocMemCache(locmem.LocMemCache):
+
+    def get(self, key, default=None, version=None, acquire_lock=True):
+        start = time.time()
+        value = super(LocMemCache, self).get(key, MISSING, version, acquire_lock)
+        hit = value is not MISSING
+        # acquire_lock is False when called internally (e.g. from incr)
+        if acquire_lock:
+            record('cache', (time.time() - start) * 1000, hits=int(hit), misses=int(not hit))
+        return value if hit else default
+
     def add(self, key, value, timeout=None, version=None):
-        if timeout is 0:
-            timeout = sys.maxint
-        return super(LocMemCache, self).add(smart_str(key), value, timeout, version)
+        if timeout == 0:
+            # Never expire
+            timeout = None
+        start = time.time()
+        result = super(LocMemCache, self).add(smart_str(key), value, timeout, version)
+        record('cache', (time.time() - start) * 1000, sets=1)
+        return result
 
     def set(self, key, value, timeout=None, version=None):
-        if timeout is 0:
-            timeout = sys.maxint
-        return super(LocMemCache, self).set(smart_str(key), value, timeout, version)
+        if timeout == 0:
+            # Never expire
+            timeout = None
+        start = time.time()
+        result = super(LocMemCache, self).set(smart_str(key), value, timeout, version)
+        record('cache', (time.time() - start) * 1000, sets=1)
+        return result
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Two-tier cache backend.
+
+Values are stored in a shared cache (e.g. memcached) and in a bounded
+in-process LRU cache. Modified keys are broadcast to the other processes
+through an invalidation channel (see ``wirecloud.platform.cache.channels``),
+so they can drop them from their local tier. Keys starting with one of the
+``SHARED_ONLY_PREFIXES`` (by default, the locks and the statistics used by
+``wirecloud.commons.utils.cache``) are only stored in the shared cache, they
+are neither cached locally nor broadcast. Example configuration::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'wirecloud.platform.cache.backends.twotier.TwoTierCache',
+            'OPTIONS': {
+                'SHARED_CACHE': 'shared',
+                'LOCAL_MAX_ENTRIES': 1000,
+            },
+        },
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': '127.0.0.1:11211',
+        },
+    }
+"""
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+from six.moves import cPickle as pickle
+
+from wirecloud.commons.utils.timing import record
+from wirecloud.platform.cache.channels import CLEAR_ALL
+
+
+DEFAULT_SHARED_ONLY_PREFIXES = ('_cache_lock/', '_cache_stats/')
+
+# Local tiers and channels are shared by all the threads of the process
+_local_tiers = {}
+_channels = {}
+_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+
+    def __init__(self, location, params):
+        super(TwoTierCache, self).__init__(params)
+
+        options = params.get('OPTIONS', {})
+        self._name = location
+        self._shared_cache_alias = options.get('SHARED_CACHE', 'shared')
+        self._shared_cache = None
+        self._channel = None
+        self._channel_class = options.get('CHANNEL', 'wirecloud.platform.cache.channels.SharedCacheChannel')
+        self._channel_options = options.get('CHANNEL_OPTIONS', {})
+
+        self._local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 1000))
+        # Entries are also discarded after LOCAL_TIMEOUT seconds, bounding the
+        # time outdated values can be used if messages are lost
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 300)
+        self._shared_only_prefixes = tuple(options.get('SHARED_ONLY_PREFIXES', DEFAULT_SHARED_ONLY_PREFIXES))
+        with _tiers_lock:
+            self._local, self._lock = _local_tiers.setdefault(location, (OrderedDict(), threading.RLock()))
+
+    @property
+    def shared_cache(self):
+        if self._shared_cache is None:
+            self._shared_cache = caches[self._shared_cache_alias]
+        return self._shared_cache
+
+    @property
+    def channel(self):
+        if self._channel is None:
+            with _tiers_lock:
+                if self._name not in _channels:
+                    _channels[self._name] = import_string(self._channel_class)(self._shared_cache_alias, self._channel_options)
+                self._channel = _channels[self._name]
+        return self._channel
+
+    def _sync(self):
+        keys = self.channel.poll()
+        with self._lock:
+            if keys is None:
+                self._local.clear()
+            else:
+                for key in keys:
+                    self._local.pop(key, None)
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+
+            expiry, pickled = entry
+            if expiry is not None and expiry <= time.time():
+                del self._local[key]
+                return None
+
+            # Mark the entry as the most recently used one
+            self._local.pop(key)
+            self._local[key] = entry
+
+        return pickled
+
+    def _local_set(self, key, value, timeout):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            self._local_delete(key)
+            return
+
+        if self._local_timeout is not None:
+            timeout = self._local_timeout if timeout is None else min(timeout, self._local_timeout)
+
+        expiry = time.time() + timeout if timeout is not None else None
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local.pop(key, None)
+            self._local[key] = (expiry, pickled)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _is_shared_only(self, key):
+        return key.startswith(self._shared_only_prefixes)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.time()
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+
+        added = self.shared_cache.add(key, value, timeout, version)
+        if added and not self._is_shared_only(key):
+            self._local_set(local_key, value, timeout)
+            self.channel.publish((local_key,))
+
+        record('cache', (time.time() - start) * 1000, sets=1)
+        return added
+
+    def _get(self, key, version):
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+
+        if self._is_shared_only(key):
+            return self.shared_cache.get(key, None, version)
+
+        self._sync()
+        pickled = self._local_get(local_key)
+        if pickled is not None:
+            return pickle.loads(pickled)
+
+        value = self.shared_cache.get(key, None, version)
+        if value is not None:
+            # The remaining life of the entry is unknown, so LOCAL_TIMEOUT is
+            # used
+            self._local_set(local_key, value, None)
+
+        return value
+
+    def get(self, key, default=None, version=None):
+        start = time.time()
+        value = self._get(key, version)
+        record('cache', (time.time() - start) * 1000, hits=int(value is not None), misses=int(value is None))
+        return default if value is None else value
+
+    def get_many(self, keys, version=None):
+        start = time.time()
+        self._sync()
+
+        values = {}
+        missing = []
+        for key in keys:
+            local_key = self.make_key(key, version=version)
+            self.validate_key(local_key)
+            pickled = self._local_get(local_key) if not self._is_shared_only(key) else None
+            if pickled is not None:
+                values[key] = pickle.loads(pickled)
+            else:
+                missing.append(key)
+
+        requested = len(values) + len(missing)
+        if len(missing) > 0:
+            shared_values = self.shared_cache.get_many(missing, version=version)
+            for key, value in shared_values.items():
+                if not self._is_shared_only(key):
+                    self._local_set(self.make_key(key, version=version), value, None)
+            values.update(shared_values)
+
+        record('cache', (time.time() - start) * 1000, hits=len(values), misses=requested - len(values))
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.time()
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+
+        self.shared_cache.set(key, value, timeout, version)
+        if not self._is_shared_only(key):
+            self._local_set(local_key, value, timeout)
+            self.channel.publish((local_key,))
+        record('cache', (time.time() - start) * 1000, sets=1)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        start = time.time()
+        local_keys = []
+        for key, value in data.items():
+            local_key = self.make_key(key, version=version)
+            self.validate_key(local_key)
+            if not self._is_shared_only(key):
+                local_keys.append(local_key)
+                self._local_set(local_key, value, timeout)
+
+        result = self.shared_cache.set_many(data, timeout, version)
+        if len(local_keys) > 0:
+            self.channel.publish(local_keys)
+        record('cache', (time.time() - start) * 1000, sets=len(data))
+        return result
+
+    def delete(self, key, version=None):
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+
+        self.shared_cache.delete(key, version)
+        if not self._is_shared_only(key):
+            self._local_delete(local_key)
+            self.channel.publish((local_key,))
+
+    def delete_many(self, keys, version=None):
+        local_keys = []
+        for key in keys:
+            local_key = self.make_key(key, version=version)
+            self.validate_key(local_key)
+            if not self._is_shared_only(key):
+                local_keys.append(local_key)
+                self._local_delete(local_key)
+
+        self.shared_cache.delete_many(keys, version)
+        if len(local_keys) > 0:
+            self.channel.publish(local_keys)
+
+    def has_key(self, key, version=None):
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+
+        if not self._is_shared_only(key):
+            self._sync()
+            if self._local_get(local_key) is not None:
+                return True
+
+        return self.shared_cache.has_key(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        local_key = self.make_key(key, version=version)
+        self.validate_key(local_key)
+
+        # Counters are always updated in the shared cache, raising ValueError
+        # if the key does not exist
+        value = self.shared_cache.incr(key, delta, version)
+        if not self._is_shared_only(key):
+            self._local_set(local_key, value, None)
+            self.channel.publish((local_key,))
+        return value
+
+    def clear(self):
+        self.shared_cache.clear()
+        with self._lock:
+            self._local.clear()
+        self.channel.publish((CLEAR_ALL,))
+
+    def close(self, **kwargs):
+        if self._shared_cache is not None:
+            self._shared_cache.close(**kwargs)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Invalidation channels used by the two-tier cache backend.
+
+Channels broadcast the keys modified by a process, so the other processes
+can drop them from their local tier. ``poll`` returns the list of keys
+modified by other processes since the previous call or ``None`` if the
+local tier has to be discarded (e.g. because some messages were lost).
+"""
+
+from __future__ import unicode_literals
+
+import io
+import json
+import logging
+import os
+import threading
+import time
+from uuid import uuid4
+
+from django.core.cache import caches
+
+
+logger = logging.getLogger(__name__)
+
+CLEAR_ALL = '*'
+
+
+class BaseInvalidationChannel(object):
+
+    def __init__(self, shared_cache_alias, params):
+        self.shared_cache_alias = shared_cache_alias
+        # Messages sent by this process are ignored when polling
+        self.sender = uuid4().hex
+        self.poll_interval = float(params.get('POLL_INTERVAL', 0))
+        self._last_poll = 0
+        self._lock = threading.Lock()
+
+    @property
+    def shared_cache(self):
+        # Django cache instances are not shared between threads
+        return caches[self.shared_cache_alias]
+
+    def publish(self, keys):
+        raise NotImplementedError
+
+    def poll(self):
+        """
+        Returns the keys invalidated by other processes or ``None`` if all
+        the local entries should be discarded.
+        """
+
+        now = time.time()
+        if now - self._last_poll < self.poll_interval:
+            return []
+
+        with self._lock:
+            self._last_poll = now
+            messages = self._read_messages()
+
+        if messages is None:
+            return None
+
+        keys = []
+        for sender, message_keys in messages:
+            if sender == self.sender:
+                continue
+
+            if CLEAR_ALL in message_keys:
+                return None
+
+            keys.extend(message_keys)
+
+        return keys
+
+    def _read_messages(self):
+        raise NotImplementedError
+
+
+class SharedCacheChannel(BaseInvalidationChannel):
+    """
+    Stores the messages in the shared cache, using a sequence number for
+    tracking them. Processes poll the shared cache at most once every
+    ``POLL_INTERVAL`` seconds (1 second by default), so this is the maximum
+    time a process can use outdated values.
+    """
+
+    SEQUENCE_KEY = '_two_tier_cache/sequence'
+    MESSAGE_KEY = '_two_tier_cache/message/%s'
+
+    def __init__(self, shared_cache_alias, params):
+        params = dict(params)
+        params.setdefault('POLL_INTERVAL', 1)
+        super(SharedCacheChannel, self).__init__(shared_cache_alias, params)
+
+        self.max_backlog = int(params.get('MAX_BACKLOG', 1000))
+        self.message_timeout = int(params.get('MESSAGE_TIMEOUT', 300))
+        self._sequence = self._get_sequence()
+
+    def _get_sequence(self):
+        sequence = self.shared_cache.get(self.SEQUENCE_KEY)
+        if sequence is None:
+            self.shared_cache.add(self.SEQUENCE_KEY, 0, None)
+            sequence = self.shared_cache.get(self.SEQUENCE_KEY, 0)
+
+        return sequence
+
+    def publish(self, keys):
+        try:
+            sequence = self.shared_cache.incr(self.SEQUENCE_KEY)
+        except ValueError:
+            # The sequence has been evicted, other processes will discard their
+            # local entries when noticing it
+            self.shared_cache.add(self.SEQUENCE_KEY, 0, None)
+            sequence = self.shared_cache.incr(self.SEQUENCE_KEY)
+
+        self.shared_cache.set(self.MESSAGE_KEY % sequence, (self.sender, list(keys)), self.message_timeout)
+
+    def _read_messages(self):
+        sequence = self.shared_cache.get(self.SEQUENCE_KEY)
+        if sequence is None or sequence < self._sequence or sequence - self._sequence > self.max_backlog:
+            self._sequence = sequence if sequence is not None else 0
+            return None
+
+        if sequence == self._sequence:
+            return []
+
+        message_keys = [self.MESSAGE_KEY % i for i in range(self._sequence + 1, sequence + 1)]
+        messages = self.shared_cache.get_many(message_keys)
+        self._sequence = sequence
+
+        if len(messages) != len(message_keys):
+            # Some messages have expired
+            return None
+
+        return [messages[key] for key in message_keys]
+
+
+class FileChannel(BaseInvalidationChannel):
+    """
+    Appends the messages to the file located at ``LOCATION``. Useful for
+    deployments running all the workers in the same host. Processes check
+    for new messages on every cache operation (``POLL_INTERVAL`` is 0 by
+    default), this only requires a ``stat`` call when there are no changes.
+    The file is truncated when it grows over ``MAX_SIZE`` bytes (1 MiB by
+    default), making the other processes discard their local entries.
+    """
+
+    def __init__(self, shared_cache_alias, params):
+        super(FileChannel, self).__init__(shared_cache_alias, params)
+
+        self.location = params['LOCATION']
+        self.max_size = int(params.get('MAX_SIZE', 1024 * 1024))
+        directory = os.path.dirname(self.location)
+        if directory != '' and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._offset = self._get_size()
+
+    def _get_size(self):
+        try:
+            return os.stat(self.location).st_size
+        except OSError:
+            return 0
+
+    def publish(self, keys):
+        line = json.dumps([self.sender, list(keys)]) + '\n'
+        # Files opened in append mode are written atomically for small writes
+        with io.open(self.location, 'ab') as f:
+            f.write(line.encode('utf-8'))
+            if f.tell() > self.max_size:
+                f.truncate(0)
+
+    def _read_messages(self):
+        size = self._get_size()
+        if size == self._offset:
+            return []
+        elif size < self._offset:
+            # The file has been truncated/rotated
+            self._offset = size
+            return None
+
+        with io.open(self.location, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+
+        # Ignore partially written lines, they will be processed on the next poll
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+
+        messages = []
+        for line in data[:end].splitlines():
+            try:
+                sender, keys = json.loads(line.decode('utf-8'))
+            except ValueError:
+                logger.warning('Invalid cache invalidation message, discarding local entries: %r' % line)
+                return None
+            messages.append((sender, keys))
+
+        return messages
@@ -17,11 +17,22 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import gettext_lazy as _
 
 
+CONSTANT_CONTEXT_CACHE_KEY = 'constant_context'
+
+
+def get_user_context_cache_key(user_id):
+    return 'platform_context/%s' % user_id
+
+
 @python_2_unicode_compatible
 class Constant(models.Model):
 
@@ -34,3 +45,14 @@ class Constant(models.Model):
 
     def __str__(self):
         return self.concept.concept
+
+
+@receiver(post_save, sender=Constant)
+@receiver(post_delete, sender=Constant)
+def invalidate_constant_context(sender, instance, **kwargs):
+    cache.delete(CONSTANT_CONTEXT_CACHE_KEY)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_context(sender, instance, **kwargs):
+    cache.delete(get_user_context_cache_key(instance.id))
@@ -20,11 +20,18 @@
 import copy
 
 from django.core.cache import cache
+import six
 
+from wirecloud.platform.context.models import CONSTANT_CONTEXT_CACHE_KEY, get_user_context_cache_key
 from wirecloud.platform.models import Constant
 from wirecloud.platform.plugins import get_plugins
 
+
+CONTEXT_VOLATILITY_LEVELS = ('deployment', 'user', 'request')
+
 _wirecloud_platform_context_definitions = None
+_wirecloud_platform_context_plugins = None
+_wirecloud_platform_context_snapshot = None
 _wirecloud_workspace_context_definitions = None
 
 
@@ -44,12 +51,72 @@ def get_platform_context_definitions():
     return _wirecloud_platform_context_definitions
 
 
-def get_platform_context_current_values(user):
+def _get_plugin_volatility(plugin):
+    # Context values are considered to change on every request unless the
+    # plugin declares otherwise
+    levels = set(definition.get('volatility', 'request') for definition in six.itervalues(plugin.get_platform_context_definitions()))
+    for level in reversed(CONTEXT_VOLATILITY_LEVELS):
+        if level in levels:
+            return level
+
+    return 'deployment'
+
+
+def _get_platform_context_plugins():
+
+    global _wirecloud_platform_context_plugins
 
     plugins = get_plugins()
-    values = {}
+    if _wirecloud_platform_context_plugins is None or _wirecloud_platform_context_plugins[0] is not plugins:
+        plugins_by_volatility = {level: [] for level in CONTEXT_VOLATILITY_LEVELS}
+        for plugin in plugins:
+            plugins_by_volatility[_get_plugin_volatility(plugin)].append(plugin)
 
-    for plugin in plugins:
+        _wirecloud_platform_context_plugins = (plugins, plugins_by_volatility)
+
+    return _wirecloud_platform_context_plugins[1]
+
+
+def _get_platform_context_snapshot(user):
+
+    global _wirecloud_platform_context_snapshot
+
+    plugins = get_plugins()
+    if _wirecloud_platform_context_snapshot is None or _wirecloud_platform_context_snapshot[0] is not plugins:
+        values = {}
+        for plugin in _get_platform_context_plugins()['deployment']:
+            values.update(plugin.get_platform_context_current_values(user))
+
+        _wirecloud_platform_context_snapshot = (plugins, values)
+
+    return _wirecloud_platform_context_snapshot[1]
+
+
+def get_platform_context_current_values(user):
+    """
+    Returns the current values of the platform context for the given user.
+
+    Values provided by plugins declaring only ``deployment`` context keys are
+    computed once and shared by all the users, values of plugins declaring
+    ``user`` keys are cached per user. Only plugins providing ``request``
+    keys (the default) are queried on every call.
+    """
+
+    plugins = _get_platform_context_plugins()
+    values = dict(_get_platform_context_snapshot(user))
+
+    if len(plugins['user']) > 0:
+        cache_key = get_user_context_cache_key(user.id)
+        user_values = cache.get(cache_key)
+        if user_values is None:
+            user_values = {}
+            for plugin in plugins['user']:
+                user_values.update(plugin.get_platform_context_current_values(user))
+            cache.set(cache_key, user_values)
+
+        values.update(user_values)
+
+    for plugin in plugins['request']:
         values.update(plugin.get_platform_context_current_values(user))
 
     return values
@@ -103,11 +170,11 @@ def get_constant_context_values():
 
 
 def get_context_values(workspace, user):
-    cache_key = 'constant_context/' + str(user.id)
-    constant_context = cache.get(cache_key)
+    # Constants are the same for all the users
+    constant_context = cache.get(CONSTANT_CONTEXT_CACHE_KEY)
     if constant_context is None:
         constant_context = get_constant_context_values()
-        cache.set(cache_key, constant_context)
+        cache.set(CONSTANT_CONTEXT_CACHE_KEY, constant_context)
 
     platform_context = constant_context
     platform_context.update(get_platform_context_current_values(user))
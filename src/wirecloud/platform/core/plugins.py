@@ -20,8 +20,7 @@
 from __future__ import unicode_literals
 
 from copy import deepcopy
-from hashlib import md5, sha1
-import json
+from hashlib import md5
 import os
 
 from django.conf import settings
@@ -32,7 +31,7 @@ import wirecloud.platform
 from wirecloud.platform.core.catalogue_manager import WirecloudCatalogueManager
 from wirecloud.platform.localcatalogue.utils import install_resource_to_user
 from wirecloud.platform.models import CatalogueResource, IWidget, Workspace
-from wirecloud.platform.plugins import build_url_template, get_active_features_info, WirecloudPlugin
+from wirecloud.platform.plugins import build_url_template, get_active_features_hash, WirecloudPlugin
 from wirecloud.platform.themes import get_active_theme_name
 from wirecloud.platform.workspace.utils import create_workspace
 
@@ -248,7 +247,27 @@ LANDING_DASHBOARD_FILE = os.path.join(BASE_PATH, 'initial', 'WireCloud_landing-d
 
 
 def get_version_hash():
-    return sha1(json.dumps(get_active_features_info(), ensure_ascii=False, sort_keys=True).encode('utf8')).hexdigest()
+    return get_active_features_hash()
+
+
+class WirecloudCoreRequestContextPlugin(WirecloudPlugin):
+    # Values changing on every request are provided by this plugin, so the
+    # values provided by WirecloudCorePlugin can be cached per user (see
+    # wirecloud.platform.context.utils.get_platform_context_current_values)
+
+    def get_platform_context_definitions(self):
+        return {
+            'language': {
+                'label': _('Language'),
+                'description': _('Current language used in the platform'),
+                'volatility': 'request',
+            },
+        }
+
+    def get_platform_context_current_values(self, user):
+        return {
+            'language': get_language(),
+        }
 
 
 class WirecloudCorePlugin(WirecloudPlugin):
@@ -264,53 +283,60 @@ class WirecloudCorePlugin(WirecloudPlugin):
 
     def get_platform_context_definitions(self):
         return {
-            'language': {
-                'label': _('Language'),
-                'description': _('Current language used in the platform'),
-            },
             'username': {
                 'label': _('Username'),
                 'description': _('User name of the current logged user'),
+                'volatility': 'user',
             },
             'fullname': {
                 'label': _('Full name'),
                 'description': _('Full name of the logged user'),
+                'volatility': 'user',
             },
             'avatar': {
                 'label': _('Avatar'),
                 'description': _('URL of the avatar'),
+                'volatility': 'user',
             },
             'isanonymous': {
                 'label': _('Is Anonymous'),
                 'description': _('Boolean. Designates whether current user is logged in the system.'),
+                'volatility': 'user',
             },
             'isstaff': {
                 'label': _('Is Staff'),
                 'description': _('Boolean. Designates whether current user can access the admin site.'),
+                'volatility': 'user',
             },
             'issuperuser': {
                 'label': _('Is Superuser'),
                 'description': _('Boolean. Designates whether current user is a super user.'),
+                'volatility': 'user',
             },
             'mode': {
                 'label': _('Mode'),
                 'description': _('Rendering mode used by the platform (available modes: classic, smartphone and embedded)'),
+                'volatility': 'deployment',
             },
             'orientation': {
                 'label': _('Orientation'),
                 'description': _('Current screen orientation'),
+                'volatility': 'deployment',
             },
             'theme': {
                 'label': _('Theme'),
                 'description': _('Name of the theme used by the platform'),
+                'volatility': 'deployment',
             },
             'version': {
                 'label': _('Version'),
                 'description': _('Version of the platform'),
+                'volatility': 'deployment',
             },
             'version_hash': {
                 'label': _('Version Hash'),
                 'description': _('Hash for the current version of the platform. This hash changes when the platform is updated or when an addon is added or removed'),
+                'volatility': 'deployment',
             },
         }
 
@@ -325,7 +351,6 @@ class WirecloudCorePlugin(WirecloudPlugin):
             avatar = 'https://www.gravatar.com/avatar/00000000000000000000000000000000?s=25'
 
         return {
-            'language': get_language(),
             'orientation': 'landscape',
             'username': username,
             'fullname': fullname,
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import gettext as gettext_module
+import hashlib
+import importlib
+import json
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import BaseFinder
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.contrib.staticfiles.utils import matches_patterns
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.utils._os import upath
+from django.utils.encoding import force_bytes
+from django.utils import translation
+from django.utils.translation import to_locale
+from django.views.i18n import render_javascript_catalog
+from rjsmin import jsmin
+import six
+
+from wirecloud.platform.plugins import get_plugins
+from wirecloud.platform.themes import get_theme_registry
+
+
+JAVASCRIPT_CATALOG_DIR = 'cache/i18n'
+JAVASCRIPT_CATALOG_MANIFEST = JAVASCRIPT_CATALOG_DIR + '/manifest.json'
+
+_manifest = None
+
+
+def get_javascript_catalog(locale, domain, packages):
+    default_locale = to_locale(settings.LANGUAGE_CODE)
+    t = {}
+    paths = []
+    en_selected = locale.startswith('en')
+    en_catalog_missing = True
+    # paths of requested packages
+    for package in packages:
+        p = importlib.import_module(package)
+        path = os.path.join(os.path.dirname(upath(p.__file__)), 'locale')
+        paths.append(path)
+    # add the filesystem paths listed in the LOCALE_PATHS setting
+    paths.extend(reversed(settings.LOCALE_PATHS))
+    # first load all english languages files for defaults
+    for path in paths:
+        try:
+            catalog = gettext_module.translation(domain, path, ['en'])
+            t.update(catalog._catalog)
+        except IOError:
+            pass
+        else:
+            # 'en' is the selected language and at least one of the packages
+            # listed in `packages` has an 'en' catalog
+            if en_selected:
+                en_catalog_missing = False
+    # next load the settings.LANGUAGE_CODE translations if it isn't english
+    if default_locale != 'en':
+        for path in paths:
+            try:
+                catalog = gettext_module.translation(domain, path, [default_locale])
+            except IOError:
+                catalog = None
+            if catalog is not None:
+                t.update(catalog._catalog)
+    # last load the currently selected language, if it isn't identical to the default.
+    if locale != default_locale:
+        # If the currently selected language is English but it doesn't have a
+        # translation catalog (presumably due to being the language translated
+        # from) then a wrong language catalog might have been loaded in the
+        # previous step. It needs to be discarded.
+        if en_selected and en_catalog_missing:
+            t = {}
+        else:
+            locale_t = {}
+            for path in paths:
+                try:
+                    catalog = gettext_module.translation(domain, path, [locale])
+                except IOError:
+                    catalog = None
+                if catalog is not None:
+                    locale_t.update(catalog._catalog)
+            if locale_t:
+                t = locale_t
+    plural = None
+    if '' in t:
+        for l in t[''].split('\n'):
+            if l.startswith('Plural-Forms:'):
+                plural = l.split(':', 1)[1].strip()
+    if plural is not None:
+        # this should actually be a compiled function of a typical plural-form:
+        # Plural-Forms: nplurals=3; plural=n%10==1 && n%100!=11 ? 0 :
+        #               n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2;
+        plural = [el.strip() for el in plural.split(';') if el.strip().startswith('plural=')][0].split('=', 1)[1]
+
+    pdict = {}
+    maxcnts = {}
+    catalog = {}
+    for k, v in t.items():
+        if k == '':
+            continue
+        if isinstance(k, six.string_types):
+            catalog[k] = v
+        elif isinstance(k, tuple):
+            msgid = k[0]
+            cnt = k[1]
+            maxcnts[msgid] = max(cnt, maxcnts.get(msgid, 0))
+            pdict.setdefault(msgid, {})[cnt] = v
+        else:
+            raise TypeError(k)
+    for k, v in pdict.items():
+        catalog[k] = [v.get(i, '') for i in range(maxcnts[msgid] + 1)]
+
+    return catalog, plural
+
+
+def get_javascript_catalog_packages():
+
+    packages = ['wirecloud.commons', 'wirecloud.catalogue', 'wirecloud.platform']
+
+    for plugin in get_plugins():
+        packages.append(plugin.__module__.rsplit('.', 1)[0])
+
+    packages.extend(get_theme_registry().themes)
+
+    return packages
+
+
+def build_javascript_catalog(language):
+    """
+    Returns the minified source code of the JavaScript translation catalog
+    for the given language.
+    """
+
+    catalog, plural = get_javascript_catalog(to_locale(language), 'djangojs', get_javascript_catalog_packages())
+    # Formats included in the catalog depend on the active language
+    with translation.override(language):
+        response = render_javascript_catalog(catalog, plural)
+    return jsmin(response.content.decode('utf-8'))
+
+
+def build_javascript_catalogs():
+    """
+    Builds the JavaScript translation catalog of each of the available
+    languages. Returns a dict with the contents of each catalog indexed by
+    its path (relative to the static root), including a manifest mapping
+    each language to the path of its catalog. Catalog paths include a hash
+    of their contents so they can be served using immutable caching.
+    """
+
+    files = {}
+    manifest = {}
+    for language, name in settings.LANGUAGES:
+        code = build_javascript_catalog(language)
+        path = '%s/%s.%s.js' % (JAVASCRIPT_CATALOG_DIR, language, hashlib.sha1(force_bytes(code)).hexdigest()[:12])
+        files[path] = code
+        manifest[language] = path
+
+    files[JAVASCRIPT_CATALOG_MANIFEST] = json.dumps(manifest, sort_keys=True)
+    return files
+
+
+def get_javascript_catalog_path(language):
+    """
+    Returns the path of the precompiled catalog for the given language or
+    ``None`` if catalogs have not been collected (e.g. ``collectstatic``
+    has not been run yet).
+    """
+
+    global _manifest
+
+    if _manifest is None:
+        try:
+            with staticfiles_storage.open(JAVASCRIPT_CATALOG_MANIFEST) as f:
+                manifest = json.loads(f.read().decode('utf-8'))
+        except (IOError, OSError, ValueError):
+            manifest = {}
+
+        # Missing manifests are also remembered, the manifest will be read
+        # again once the server is restarted after running collectstatic
+        _manifest = manifest
+
+    return _manifest.get(language)
+
+
+class JavaScriptCatalogStorage(Storage):
+    """
+    Read only storage serving files from memory.
+    """
+
+    def __init__(self, files):
+        self.files = files
+
+    def _open(self, name, mode='rb'):
+        return ContentFile(force_bytes(self.files[name]), name=name)
+
+    def exists(self, name):
+        return name in self.files
+
+    def path(self, name):
+        # Only used by collectstatic for logging purposes
+        return '<javascript catalog> %s' % name
+
+    def size(self, name):
+        return len(force_bytes(self.files[name]))
+
+
+class JavaScriptCatalogFinder(BaseFinder):
+    """
+    Static files finder providing the precompiled JavaScript translation
+    catalogs, so they are generated by collectstatic. Catalogs are not
+    available through ``find`` as they are not stored in the file system,
+    WireCloud uses the ``javascript_translation_catalogue`` view if they
+    have not been collected.
+    """
+
+    storage = None
+    # Catalogs should only be generated when collecting static files
+    indexable = False
+
+    def find(self, path, all=False):
+        return []
+
+    def list(self, ignore_patterns):
+        if self.storage is None:
+            self.storage = JavaScriptCatalogStorage(build_javascript_catalogs())
+
+        for path in sorted(self.storage.files):
+            if not matches_patterns(path, ignore_patterns):
+                yield path, self.storage
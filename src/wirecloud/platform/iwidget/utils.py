@@ -191,9 +191,10 @@ def SaveIWidget(iwidget, user, tab, initial_variable_values=None, commit=True):
     return new_iwidget
 
 
-def UpdateIWidget(data, user, tab, updatecache=True):
+def UpdateIWidget(data, user, tab, updatecache=True, iwidget=None):
 
-    iwidget = IWidget.objects.get(tab=tab, pk=data.get('id'))
+    if iwidget is None:
+        iwidget = IWidget.objects.select_related('widget__resource').get(tab=tab, pk=data.get('id'))
 
     update_widget_value(iwidget, data, user)
     update_title_value(iwidget, data)
@@ -25,11 +25,12 @@ from django.shortcuts import get_object_or_404
 
 from wirecloud.catalogue.models import CatalogueResource
 from wirecloud.commons.baseviews import Resource
+from wirecloud.commons.utils.cache import get_not_modified_response, patch_cache_headers
 from wirecloud.commons.utils.transaction import commit_on_http_success
 from wirecloud.commons.utils.http import authentication_required, build_error_response, consumes, parse_json_request
 from wirecloud.platform.iwidget.utils import SaveIWidget, UpdateIWidget
 from wirecloud.platform.models import Widget, IWidget, Tab, Workspace
-from wirecloud.platform.workspace.utils import VariableValueCacheManager, get_iwidget_data
+from wirecloud.platform.workspace.utils import VariableValueCacheManager, get_iwidget_data, get_workspace_etag
 
 
 class IWidgetCollection(Resource):
@@ -41,11 +42,17 @@ class IWidgetCollection(Resource):
         if not tab.workspace.is_available_for(request.user):
             return build_error_response(request, 403, _("You don't have permission to access this workspace"))
 
+        etag = get_workspace_etag(tab.workspace, request.user, 'tab/%s/iwidgets' % tab.id)
+        not_modified_response = get_not_modified_response(request, etag, tab.workspace.last_modified)
+        if not_modified_response is not None:
+            return not_modified_response
+
         cache_manager = VariableValueCacheManager(tab.workspace, request.user)
         iwidgets = tab.iwidget_set.all()
         data = [get_iwidget_data(iwidget, tab.workspace, cache_manager) for iwidget in iwidgets]
 
-        return HttpResponse(json.dumps(data, sort_keys=True), content_type='application/json; charset=UTF-8')
+        response = HttpResponse(json.dumps(data, sort_keys=True), content_type='application/json; charset=UTF-8')
+        return patch_cache_headers(response, tab.workspace.last_modified, etag=etag)
 
     @authentication_required
     @consumes(('application/json',))
@@ -86,9 +93,12 @@ class IWidgetCollection(Resource):
             msg = _('You have not enough permission for updating the iwidgets of this workspace')
             return build_error_response(request, 403, msg)
 
+        # Load all the iwidgets of the tab using a single query
+        instances = {instance.id: instance for instance in tab.iwidget_set.select_related('widget__resource')}
+
         for iwidget in iwidgets:
             try:
-                UpdateIWidget(iwidget, request.user, tab, updatecache=False)
+                UpdateIWidget(iwidget, request.user, tab, updatecache=False, iwidget=instances.get(iwidget.get('id')))
             except IWidget.DoesNotExist:
                 return build_error_response(request, 422, _("Widget {id} does not exist").format(id=iwidget.get('id')))
             except TypeError as e:
@@ -111,9 +121,16 @@ class IWidgetEntry(Resource):
         workspace = get_object_or_404(Workspace, id=workspace_id)
 
         iwidget = get_object_or_404(IWidget, tab__workspace__users=request.user, tab__workspace=workspace, tab__pk=tab_id, pk=iwidget_id)
+
+        etag = get_workspace_etag(workspace, request.user, 'iwidget/%s' % iwidget.id)
+        not_modified_response = get_not_modified_response(request, etag, workspace.last_modified)
+        if not_modified_response is not None:
+            return not_modified_response
+
         iwidget_data = get_iwidget_data(iwidget, workspace, user=request.user)
 
-        return HttpResponse(json.dumps(iwidget_data, sort_keys=True), content_type='application/json; charset=UTF-8')
+        response = HttpResponse(json.dumps(iwidget_data, sort_keys=True), content_type='application/json; charset=UTF-8')
+        return patch_cache_headers(response, workspace.last_modified, etag=etag)
 
     @authentication_required
     @consumes(('application/json',))
@@ -28,13 +28,15 @@ import zipfile
 from django.db.models import Q
 from django.http import HttpResponse
 from django.shortcuts import get_list_or_404, get_object_or_404
-from django.utils.translation import ugettext as _
+from django.utils.translation import get_language, ugettext as _
 import six
 
 from wirecloud.catalogue.models import CatalogueResource
 import wirecloud.catalogue.utils as catalogue_utils
 from wirecloud.commons.baseviews import Resource
-from wirecloud.commons.utils.http import authentication_required, authentication_required_cond, build_downloadfile_response, build_error_response, get_content_type, normalize_boolean_param, consumes, parse_json_request, produces
+from wirecloud.commons.utils.cache import get_not_modified_response, get_version_etag
+from wirecloud.commons.utils.encoding import iterencode_dict
+from wirecloud.commons.utils.http import authentication_required, authentication_required_cond, build_downloadfile_response, build_error_response, build_json_collection_response, get_content_type, normalize_boolean_param, consumes, parse_json_request, produces
 from wirecloud.commons.utils.structures import CaseInsensitiveDict
 from wirecloud.commons.utils.template import TemplateParseException, UnsupportedFeature
 from wirecloud.commons.utils.transaction import commit_on_http_success
@@ -54,13 +56,23 @@ class ResourceCollection(Resource):
     def read(self, request):
 
         process_urls = request.GET.get('process_urls', 'true') == 'true'
-        resources = {}
+        resources = CatalogueResource.objects.none()
         if request.user.is_authenticated():
-            for resource in CatalogueResource.objects.filter(Q(public=True) | Q(users=request.user) | Q(groups__in=request.user.groups.all())):
-                options = resource.get_processed_info(request, process_urls=process_urls, url_pattern_name="wirecloud.showcase_media")
-                resources[resource.local_uri_part] = options
-
-        return HttpResponse(json.dumps(resources, sort_keys=True), content_type='application/json; chatset=UTF-8')
+            resources = CatalogueResource.objects.filter(Q(public=True) | Q(users=request.user) | Q(groups__in=request.user.groups.all())).distinct()
+
+        # The ETag is computed from the cache generation of the available
+        # resources, so conditional requests are answered without processing them
+        versions = sorted(resources.values_list('id', 'cache_generation'))
+        etag = get_version_etag(request.user.id, get_language(), request.build_absolute_uri('/'), process_urls, versions)
+        not_modified_response = get_not_modified_response(request, etag)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        data = (
+            (resource.local_uri_part, resource.get_processed_info(request, process_urls=process_urls, url_pattern_name="wirecloud.showcase_media"))
+            for resource in resources.order_by('vendor', 'short_name', 'version').iterator()
+        )
+        return build_json_collection_response(iterencode_dict(data), len(versions), etag=etag, content_type='application/json; chatset=UTF-8')
 
     @authentication_required
     @consumes(('application/json', 'multipart/form-data', 'application/octet-stream'))
@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division, unicode_literals
+
+from copy import deepcopy
+from io import BytesIO
+import json
+import platform
+import random
+import threading
+import time
+import zipfile
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.db.transaction import atomic
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from six.moves import BaseHTTPServer, input
+
+from wirecloud.catalogue.models import CatalogueResource
+from wirecloud.catalogue.utils import add_packaged_resource
+from wirecloud.platform import __version__
+from wirecloud.platform.iwidget.utils import SaveIWidget
+from wirecloud.platform.wiring.utils import get_wiring_skeleton
+from wirecloud.platform.workspace.views import createEmptyWorkspace
+
+
+BENCHMARK_VENDOR = 'Benchmark'
+BENCHMARK_USER_PREFIX = 'benchmark-'
+
+WIDGET_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
+<widget xmlns="http://wirecloud.conwet.fi.upm.es/ns/macdescription/1" vendor="%(vendor)s" name="%(name)s" version="1.0">
+    <details>
+        <title>%(title)s</title>
+        <email>benchmark@example.com</email>
+        <description>%(description)s</description>
+        <authors>benchmark</authors>
+    </details>
+    <preferences>
+        <preference name="text" type="text" label="Text" default="%(name)s"/>
+    </preferences>
+    <persistentvariables>
+        <variable name="state" type="text" label="State"/>
+    </persistentvariables>
+    <wiring>
+        <outputendpoint name="output" type="text" label="Output" friendcode="benchmark"/>
+        <inputendpoint name="input" type="text" label="Input" friendcode="benchmark"/>
+    </wiring>
+    <contents src="index.html"/>
+    <rendering height="24" width="6"/>
+</widget>
+'''
+
+OPERATOR_TEMPLATE = '''<?xml version="1.0" encoding="UTF-8"?>
+<operator xmlns="http://wirecloud.conwet.fi.upm.es/ns/macdescription/1" vendor="%(vendor)s" name="%(name)s" version="1.0">
+    <details>
+        <title>%(title)s</title>
+        <email>benchmark@example.com</email>
+        <description>%(description)s</description>
+        <authors>benchmark</authors>
+    </details>
+    <wiring>
+        <outputendpoint name="output" type="text" label="Output" friendcode="benchmark"/>
+        <inputendpoint name="input" type="text" label="Input" friendcode="benchmark"/>
+    </wiring>
+    <scripts>
+        <script src="js/main.js"/>
+    </scripts>
+</operator>
+'''
+
+WIDGET_CODE = '''<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="UTF-8"/>
+        <title>%(title)s</title>
+    </head>
+    <body>
+        <div id="content"></div>
+        <script type="text/javascript">
+            MashupPlatform.wiring.registerCallback("input", function (data) {
+                document.getElementById("content").textContent = data;
+                MashupPlatform.wiring.pushEvent("output", data);
+            });
+        </script>
+    </body>
+</html>
+'''
+
+OPERATOR_CODE = '''MashupPlatform.wiring.registerCallback("input", function (data) {
+    MashupPlatform.wiring.pushEvent("output", data);
+});
+'''
+
+WORDS = (
+    'map', 'chart', 'sensor', 'weather', 'traffic', 'energy', 'parking', 'city', 'air', 'quality',
+    'viewer', 'table', 'filter', 'context', 'broker', 'history', 'alert', 'device', 'gauge', 'calendar',
+)
+
+UPSTREAM_PAYLOAD_SIZE = 16 * 1024
+
+
+class UpstreamHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    payload = json.dumps({'data': 'x' * UPSTREAM_PAYLOAD_SIZE}).encode('utf-8')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def build_wgt(template, files):
+
+    contents = BytesIO()
+    with zipfile.ZipFile(contents, 'w') as wgt:
+        wgt.writestr('config.xml', template.encode('utf-8'))
+        for name, data in files.items():
+            wgt.writestr(name, data.encode('utf-8'))
+
+    contents.seek(0)
+    return contents
+
+
+def summarize(values):
+
+    values_sorted = sorted(values)
+    return {
+        'first': values[0],
+        'min': values_sorted[0],
+        'max': values_sorted[-1],
+        'mean': sum(values) / len(values),
+        'median': values_sorted[len(values_sorted) // 2],
+        'p95': values_sorted[min(len(values_sorted) - 1, int(len(values_sorted) * 0.95))],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Populates the database with a synthetic dataset and measures the latency and the number of database queries of the main WireCloud operations, printing the results using JSON. Synthetic data is removed at the end'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, dest='users', default=10, help='Number of users to create (default: 10)')
+        parser.add_argument('--workspaces', type=int, dest='workspaces', default=20, help='Number of workspaces to create, distributed between the users (default: 20)')
+        parser.add_argument('--widgets', type=int, dest='widgets', default=20, help='Number of widgets to add to each workspace (default: 20)')
+        parser.add_argument('--operators', type=int, dest='operators', default=10, help='Number of operators to add to each workspace. Each operator is connected to all the widgets of the workspace (default: 10)')
+        parser.add_argument('--resources', type=int, dest='resources', default=1000, help='Number of widgets to upload to the catalogue (default: 1000)')
+        parser.add_argument('--iterations', type=int, dest='iterations', default=50, help='Number of times each operation is measured (default: 50)')
+        parser.add_argument('--seed', type=int, dest='seed', default=0, help='Seed used for generating the synthetic data (default: 0)')
+        parser.add_argument('--output', dest='output', default=None, help='Write the results into the given file instead of using the standard output')
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            dest='keep',
+            default=False,
+            help='Do not remove the synthetic data after running the benchmarks',
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            default=True,
+            help='Do NOT prompt the user for input of any kind',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = int(options.get('verbosity', 1))
+
+        for option in ('users', 'workspaces', 'resources', 'iterations'):
+            if options[option] < 1:
+                raise CommandError('--%s must be a positive number' % option)
+
+        for option in ('widgets', 'operators'):
+            if options[option] < 0:
+                raise CommandError('--%s cannot be a negative number' % option)
+
+        if User.objects.filter(username__startswith=BENCHMARK_USER_PREFIX).exists() or CatalogueResource.objects.filter(vendor=BENCHMARK_VENDOR).exists():
+            raise CommandError('The database already contains benchmark data (users starting with "%s" or components from the "%s" vendor), probably left by a previous run using --keep. Remove it before running the benchmarks' % (BENCHMARK_USER_PREFIX, BENCHMARK_VENDOR))
+
+        if options['interactive']:
+            msg = 'This command will create (and later remove) synthetic data in the configured database and search indexes. Are you sure you want to continue? [y/N] '
+            if input(msg).strip().lower() not in ('y', 'yes'):
+                raise CommandError('Benchmark cancelled')
+
+        self.options = options
+        self.random = random.Random(options['seed'])
+        self.users = []
+        self.widgets = []
+        self.operators = []
+
+        upstream = BaseHTTPServer.HTTPServer(('127.0.0.1', 0), UpstreamHandler)
+        upstream_thread = threading.Thread(target=upstream.serve_forever)
+        upstream_thread.daemon = True
+        upstream_thread.start()
+        self.upstream = '127.0.0.1:%s' % upstream.server_address[1]
+
+        try:
+            with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+                dataset = self.populate()
+                results = self.run_benchmarks()
+        finally:
+            upstream.shutdown()
+            upstream.server_close()
+            if not options['keep']:
+                self.clean()
+
+        report = json.dumps({
+            'date': timezone.now().isoformat(),
+            'environment': {
+                'wirecloud': __version__,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+            },
+            'dataset': dataset,
+            'units': {'duration': 'ms', 'queries': 'queries'},
+            'results': results,
+        }, indent=4, sort_keys=True)
+
+        if options['output'] is not None:
+            with open(options['output'], 'wb') as f:
+                f.write(report.encode('utf-8'))
+            self.log('Results written into %s' % options['output'], 1)
+        else:
+            self.stdout.write(report)
+
+    def clean(self):
+
+        # Only the data created by this run is removed. Resources are removed
+        # one by one so they are also undeployed
+        for resource in self.widgets + self.operators:
+            resource.delete()
+
+        User.objects.filter(id__in=[user.id for user in self.users]).delete()
+
+    def random_description(self):
+        return ' '.join(self.random.choice(WORDS) for i in range(12))
+
+    def upload_resource(self, template, files, user, info):
+
+        info.update({
+            'vendor': BENCHMARK_VENDOR,
+            'description': self.random_description(),
+        })
+        resource = add_packaged_resource(build_wgt(template % info, files), user)
+        resource.public = True
+        resource.save()
+        return resource
+
+    def populate(self):
+
+        options = self.options
+
+        for i in range(options['users']):
+            self.users.append(User.objects.create_user('%suser%d' % (BENCHMARK_USER_PREFIX, i), password='benchmark'))
+        self.log('%d users created' % len(self.users))
+
+        for i in range(options['resources']):
+            name = 'widget-%d' % i
+            title = 'Benchmark widget %d' % i
+            files = {'index.html': WIDGET_CODE % {'title': title}}
+            with atomic():
+                self.widgets.append(self.upload_resource(WIDGET_TEMPLATE, files, self.users[0], {'name': name, 'title': title}))
+            if (i + 1) % 100 == 0:
+                self.log('%d widgets uploaded to the catalogue' % (i + 1))
+
+        for i in range(max(options['operators'], 1)):
+            name = 'operator-%d' % i
+            files = {'js/main.js': OPERATOR_CODE}
+            with atomic():
+                self.operators.append(self.upload_resource(OPERATOR_TEMPLATE, files, self.users[0], {'name': name, 'title': 'Benchmark operator %d' % i}))
+        self.log('%d operators uploaded to the catalogue' % len(self.operators))
+
+        self.workspaces = []
+        for i in range(options['workspaces']):
+            with atomic():
+                self.workspaces.append(self.create_workspace(self.users[i % len(self.users)], i))
+            self.log('Workspace %d/%d created' % (i + 1, options['workspaces']))
+
+        return {
+            'users': options['users'],
+            'workspaces': options['workspaces'],
+            'widgets_per_workspace': options['widgets'],
+            'operators_per_workspace': options['operators'],
+            'connections_per_workspace': options['widgets'] * options['operators'] * 2,
+            'catalogue_resources': len(self.widgets) + len(self.operators),
+            'iterations': options['iterations'],
+            'seed': options['seed'],
+        }
+
+    def create_workspace(self, user, index):
+
+        workspace = createEmptyWorkspace('Benchmark %d' % index, user, allow_renaming=True)
+        tab = workspace.tab_set.get()
+
+        iwidgets = []
+        for i in range(self.options['widgets']):
+            resource = self.random.choice(self.widgets)
+            iwidgets.append(SaveIWidget({'widget': resource.local_uri_part}, user, tab, initial_variable_values={}))
+
+        wiring = get_wiring_skeleton()
+        for i in range(self.options['operators']):
+            operator_id = '%d' % (i + 1)
+            wiring['operators'][operator_id] = {
+                'id': operator_id,
+                'name': self.operators[i].local_uri_part,
+                'preferences': {},
+                'properties': {},
+            }
+
+            for iwidget in iwidgets:
+                wiring['connections'].append({
+                    'source': {'type': 'widget', 'id': iwidget.id, 'endpoint': 'output'},
+                    'target': {'type': 'operator', 'id': operator_id, 'endpoint': 'input'},
+                })
+                wiring['connections'].append({
+                    'source': {'type': 'operator', 'id': operator_id, 'endpoint': 'output'},
+                    'target': {'type': 'widget', 'id': iwidget.id, 'endpoint': 'input'},
+                })
+
+        workspace.wiringStatus = wiring
+        workspace.save()
+
+        return workspace
+
+    def get_client(self, user):
+
+        if user.id not in self.clients:
+            client = Client()
+            client.force_login(user)
+            self.clients[user.id] = client
+
+        return self.clients[user.id]
+
+    def measure(self, name, operation):
+        """
+        Runs ``operation`` the configured number of times, recording the time
+        spent and the number of database queries made on each iteration.
+        """
+
+        durations = []
+        queries = []
+        for i in range(self.options['iterations']):
+            with CaptureQueriesContext(connection) as context:
+                start = time.time()
+                response = operation(i)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                durations.append((time.time() - start) * 1000)
+
+            if response.status_code >= 400:
+                raise CommandError('Unexpected response while running the %s benchmark: %s %s' % (name, response.status_code, response.content if not response.streaming else ''))
+
+            queries.append(len(context.captured_queries))
+
+        self.log('%s: %.3fms (mean), %d queries (first request)' % (name, sum(durations) / len(durations), queries[0]))
+
+        return {
+            'iterations': len(durations),
+            'duration': summarize(durations),
+            'queries': summarize(queries),
+        }
+
+    def run_benchmarks(self):
+
+        self.clients = {}
+        results = {}
+
+        def load_workspace(i):
+            workspace = self.workspaces[i % len(self.workspaces)]
+            url = reverse('wirecloud.workspace_entry', kwargs={'workspace_id': workspace.id})
+            return self.get_client(workspace.creator).get(url, HTTP_ACCEPT='application/json')
+        results['workspace-load'] = self.measure('workspace-load', load_workspace)
+
+        def update_wiring(i):
+            workspace = self.workspaces[i % len(self.workspaces)]
+            wiring = deepcopy(workspace.wiringStatus)
+            # Alternate between removing and restoring a connection
+            if i // len(self.workspaces) % 2 == 0 and len(wiring['connections']) > 0:
+                wiring['connections'].pop()
+            url = reverse('wirecloud.workspace_wiring', kwargs={'workspace_id': workspace.id})
+            return self.get_client(workspace.creator).put(url, json.dumps(wiring), content_type='application/json', HTTP_ACCEPT='application/json')
+        results['wiring-update'] = self.measure('wiring-update', update_wiring)
+
+        def search_catalogue(i):
+            query = ' '.join(self.random.choice(WORDS) for j in range(i % 3))
+            url = reverse('wirecloud_catalogue.resource_collection') + '?q=' + query
+            return self.get_client(self.users[i % len(self.users)]).get(url, HTTP_ACCEPT='application/json')
+        results['catalogue-search'] = self.measure('catalogue-search', search_catalogue)
+
+        def serve_widget_code(i):
+            resource = self.widgets[i % len(self.widgets)]
+            url = reverse('wirecloud.showcase_media', kwargs={'vendor': resource.vendor, 'name': resource.short_name, 'version': resource.version, 'file_path': 'index.html'})
+            return self.get_client(self.users[i % len(self.users)]).get(url + '?entrypoint=true')
+        results['widget-code'] = self.measure('widget-code', serve_widget_code)
+
+        def serve_operator_code(i):
+            resource = self.operators[i % len(self.operators)]
+            url = reverse('wirecloud.operator_code_entry', kwargs={'vendor': resource.vendor, 'name': resource.short_name, 'version': resource.version})
+            return self.get_client(self.users[i % len(self.users)]).get(url)
+        results['operator-code'] = self.measure('operator-code', serve_operator_code)
+
+        def proxy_request(i):
+            workspace = self.workspaces[i % len(self.workspaces)]
+            referer = 'http://testserver' + reverse('wirecloud.workspace_view', kwargs={'owner': workspace.creator.username, 'name': workspace.name})
+            url = reverse('wirecloud|proxy', kwargs={'protocol': 'http', 'domain': self.upstream, 'path': '/data'})
+            return self.get_client(workspace.creator).get(url, HTTP_REFERER=referer)
+        results['proxy'] = self.measure('proxy', proxy_request)
+
+        return results
+
+    def log(self, msg, level=2, **kwargs):
+        """
+        Small log helper
+        """
+        if self.verbosity >= level:
+            self.stdout.write(msg, **kwargs)
+            self.stdout.flush()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from wirecloud.platform.bundles import build_bundle_manifest, save_bundle_manifest
+
+
+class Command(BaseCommand):
+    help = 'Compresses the widget and operator API files, the widget styles and the platform scripts, storing the resulting URLs in the bundle manifest. Must be run after collectstatic'
+
+    requires_system_checks = False
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            dest='force',
+            default=False,
+            help='Compress the bundles even if compression is disabled (COMPRESS_ENABLED setting)',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = int(options.get('verbosity', 1))
+
+        if not settings.COMPRESS_ENABLED and not options['force']:
+            raise CommandError('Compression is disabled. Set the COMPRESS_ENABLED setting or use --force to override.')
+
+        with override_settings(COMPRESS_ENABLED=True):
+            manifest = build_bundle_manifest()
+
+        save_bundle_manifest(manifest)
+
+        for name in sorted(manifest['bundles']):
+            self.log('%s: %s' % (name, ', '.join(entry['url'] for entry in manifest['bundles'][name])), 2)
+
+        self.log('%s bundles compressed' % len(manifest['bundles']))
+
+    def log(self, msg, level=1, **kwargs):
+        """
+        Small log helper
+        """
+        if self.verbosity >= level:
+            self.stdout.write(msg, **kwargs)
+            self.stdout.flush()
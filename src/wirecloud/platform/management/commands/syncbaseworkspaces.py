@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from wirecloud.platform.workspace.utils import sync_base_workspaces
+
+
+class Command(BaseCommand):
+    help = 'Synchronises the base workspaces of the users. Useful when WIRECLOUD_DEFER_BASE_WORKSPACES_SYNC is enabled'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Users to synchronise (default: all the active users)')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            dest='force',
+            default=False,
+            help='Synchronise the base workspaces even if they have not changed since the last synchronisation',
+        )
+
+    def handle(self, *args, **options):
+        self.verbosity = int(options.get('verbosity', 1))
+
+        users = User.objects.filter(is_active=True)
+        if len(options['usernames']) > 0:
+            users = users.filter(username__in=options['usernames'])
+
+        for user in users.iterator():
+            sync_base_workspaces(user, force=options['force'])
+            self.log('Base workspaces of %s synchronised' % user.username, 2)
+
+    def log(self, msg, level=2, **kwargs):
+        """
+        Small log helper
+        """
+        if self.verbosity >= level:
+            self.stdout.write(msg, **kwargs)
+            self.stdout.flush()
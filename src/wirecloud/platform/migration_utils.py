@@ -19,6 +19,11 @@
 
 from __future__ import unicode_literals
 
+import base64
+from Crypto.Cipher import AES
+import json
+
+from django.conf import settings
 from django.db.migrations.exceptions import IrreversibleError
 
 import six
@@ -41,6 +46,15 @@ def workspace_and_tab_title_data_forwards(apps, schema_editor):
             tab.save()
 
 
+def workspace_longdescription_html_forwards(apps, schema_editor):
+    from wirecloud.platform.workspace.models import render_longdescription
+
+    workspaces = apps.get_model("platform", "workspace")
+    for workspace in workspaces.objects.exclude(longdescription=''):
+        workspace.longdescription_html = render_longdescription(workspace.longdescription)
+        workspace.save(update_fields=('longdescription_html',))
+
+
 def mutate_forwards_operator(preference, userID):
     preference["value"] = {"users": {"%s" % userID: preference.get("value", "")}}
     return preference
@@ -111,3 +125,100 @@ def multiuser_variables_structure_backwards(apps, schema_editor):
             for widget in tab.iwidget_set.all():
                 widget.variables = {k: mutate_backwards_widget(v, owner) for k, v in six.iteritems(widget.variables)}
                 widget.save()
+
+
+def _get_secure_variable_names(resource):
+    if resource is None:
+        return set()
+
+    description = resource.json_description
+    return set(vardef['name'] for vardef in description.get('preferences', []) + description.get('properties', []) if vardef.get('secure', False))
+
+
+def _update_secure_values(values, mutate):
+    for value in values:
+        if isinstance(value, dict) and 'users' in value:
+            value['users'] = {user_id: mutate(user_value) for user_id, user_value in six.iteritems(value['users'])}
+
+
+def _secure_variable_metadata(apps, mutate):
+
+    CatalogueResource = apps.get_model("catalogue", "CatalogueResource")
+    IWidget = apps.get_model("platform", "iwidget")
+    Workspace = apps.get_model("platform", "workspace")
+
+    for iwidget in IWidget.objects.select_related('widget__resource').all():
+        resource = iwidget.widget.resource if iwidget.widget is not None else None
+        secure_names = _get_secure_variable_names(resource)
+        if len(secure_names) > 0:
+            _update_secure_values((iwidget.variables.get(name) for name in secure_names), mutate)
+            iwidget.save()
+
+    for workspace in Workspace.objects.all():
+        operators = workspace.wiringStatus.get("operators", {})
+        for operator in six.itervalues(operators):
+            try:
+                vendor, short_name, version = operator["name"].split('/')
+                resource = CatalogueResource.objects.get(vendor=vendor, short_name=short_name, version=version)
+            except (ValueError, CatalogueResource.DoesNotExist):
+                continue
+
+            secure_names = _get_secure_variable_names(resource)
+            _update_secure_values((operator.get(section, {}).get(name, {}).get("value") for section in ("preferences", "properties") for name in secure_names), mutate)
+
+        if len(operators) > 0:
+            workspace.save()
+
+
+# Secure values are handled using copies of the functions provided by
+# wirecloud.platform.workspace.utils at the time of writing these migrations,
+# so they keep working if those functions change
+
+def _split_secure_value(value):
+    # Secure values are stored as "<plain value length>:<encrypted value>"
+    if not isinstance(value, six.string_types):
+        return None, value
+
+    length, sep, data = value.partition(':')
+    if sep == '' or not length.isdigit():
+        return None, value
+
+    return int(length), data
+
+
+def _encrypt_secure_value(cipher, value):
+    json_value = json.dumps(value, ensure_ascii=False).encode('utf8')
+    padded_value = json_value + (cipher.block_size - len(json_value) % cipher.block_size) * b' '
+    length = len(value) if isinstance(value, six.string_types) else len(json_value)
+    return '%d:%s' % (length, base64.b64encode(cipher.encrypt(padded_value)).decode('utf-8'))
+
+
+def _decrypt_secure_value(cipher, value):
+    try:
+        value = cipher.decrypt(base64.b64decode(_split_secure_value(value)[1]))
+        return json.loads(value.decode('utf8'))
+    except:
+        return ''
+
+
+def secure_variable_metadata_forwards(apps, schema_editor):
+
+    cipher = AES.new(settings.SECRET_KEY[:32])
+
+    def mutate(value):
+        length, data = _split_secure_value(value)
+        if length is not None or not isinstance(value, six.string_types):
+            return value
+
+        # Re-encrypt the value to store its length
+        return _encrypt_secure_value(cipher, _decrypt_secure_value(cipher, value))
+
+    _secure_variable_metadata(apps, mutate)
+
+
+def secure_variable_metadata_backwards(apps, schema_editor):
+
+    def mutate(value):
+        return _split_secure_value(value)[1]
+
+    _secure_variable_metadata(apps, mutate)
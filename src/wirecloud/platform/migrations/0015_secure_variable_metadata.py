@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+from wirecloud.platform.migration_utils import secure_variable_metadata_forwards, secure_variable_metadata_backwards
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalogue', '0002_alter_json_description'),
+        ('platform', '0014_workspace_and_tab_title_not_null'),
+    ]
+
+    operations = [
+        # Store the length of the plain value together with the encrypted
+        # value of secure variables
+        migrations.RunPython(secure_variable_metadata_forwards, secure_variable_metadata_backwards),
+    ]
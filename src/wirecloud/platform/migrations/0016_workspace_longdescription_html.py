@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from wirecloud.platform.migration_utils import workspace_longdescription_html_forwards
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform', '0015_secure_variable_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workspace',
+            name='longdescription_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Rendered long description'),
+        ),
+        # Render the long description of the existing workspaces
+        migrations.RunPython(workspace_longdescription_html_forwards, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+import wirecloud.commons.utils.cache
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform', '0016_workspace_longdescription_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='xhtml',
+            name='cache_generation',
+            field=models.BigIntegerField(default=wirecloud.commons.utils.cache.new_generation, editable=False, verbose_name='Cache generation'),
+        ),
+    ]
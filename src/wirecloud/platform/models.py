@@ -14,12 +14,11 @@ from wirecloud.platform.workspace.models import *  # noqa
 # setting
 
 from django.conf import settings
-from wirecloud.platform.themes import get_available_themes, get_theme_dir, get_theme_metadata
+from wirecloud.platform.themes import get_theme_registry
 
 if type(settings.LOCALE_PATHS) != list:
     settings.LOCALE_PATHS = list(settings.LOCALE_PATHS)
 
-for theme in get_available_themes():
-    theme_dir = get_theme_dir(get_theme_metadata(theme), 'locale')
+for theme_dir in get_theme_registry().locale_dirs:
     if theme_dir not in settings.LOCALE_PATHS:
         settings.LOCALE_PATHS.insert(0, theme_dir)
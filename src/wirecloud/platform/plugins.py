@@ -19,6 +19,7 @@
 
 from __future__ import unicode_literals
 
+from hashlib import sha1
 from importlib import import_module
 import inspect
 import logging
@@ -39,6 +40,10 @@ logger = logging.getLogger(__name__)
 _wirecloud_plugins = None
 _wirecloud_features = None
 _wirecloud_features_info = None
+_wirecloud_features_hash = None
+_wirecloud_plugin_urls = None
+_wirecloud_extra_javascripts = {}
+_wirecloud_platform_css = {}
 _wirecloud_proxy_processors = None
 _wirecloud_request_proxy_processors = []
 _wirecloud_response_proxy_processors = []
@@ -46,6 +51,7 @@ _wirecloud_constants = None
 _wirecloud_api_auth_backends = None
 _wirecloud_tab_preferences = None
 _wirecloud_workspace_preferences = None
+_wirecloud_bootstrap_fragments = {}
 
 
 def find_wirecloud_plugins():
@@ -101,8 +107,9 @@ def get_plugins():
 
             plugins.append(plugin)
 
-        from wirecloud.platform.core.plugins import WirecloudCorePlugin
+        from wirecloud.platform.core.plugins import WirecloudCorePlugin, WirecloudCoreRequestContextPlugin
         add_plugin('wirecloud.platform.WirecloudCorePlugin', WirecloudCorePlugin())
+        add_plugin('wirecloud.platform.WirecloudCoreRequestContextPlugin', WirecloudCoreRequestContextPlugin())
 
         for entry in modules:
             if isinstance(entry, string_types):
@@ -156,10 +163,25 @@ def get_active_features_info():
     return _wirecloud_features_info
 
 
+def get_active_features_hash():
+
+    global _wirecloud_features_hash
+
+    if _wirecloud_features_hash is None:
+        info = json.dumps(get_active_features_info(), ensure_ascii=False, sort_keys=True)
+        _wirecloud_features_hash = sha1(info.encode('utf8')).hexdigest()
+
+    return _wirecloud_features_hash
+
+
 def clear_cache():
     global _wirecloud_plugins
     global _wirecloud_features
     global _wirecloud_features_info
+    global _wirecloud_features_hash
+    global _wirecloud_plugin_urls
+    global _wirecloud_extra_javascripts
+    global _wirecloud_platform_css
     global _wirecloud_proxy_processors
     global _wirecloud_request_proxy_processors
     global _wirecloud_response_proxy_processors
@@ -167,10 +189,15 @@ def clear_cache():
     global _wirecloud_api_auth_backends
     global _wirecloud_tab_preferences
     global _wirecloud_workspace_preferences
+    global _wirecloud_bootstrap_fragments
 
     _wirecloud_plugins = None
     _wirecloud_features = None
     _wirecloud_features_info = None
+    _wirecloud_features_hash = None
+    _wirecloud_plugin_urls = None
+    _wirecloud_extra_javascripts = {}
+    _wirecloud_platform_css = {}
     _wirecloud_proxy_processors = None
     _wirecloud_request_proxy_processors = []
     _wirecloud_response_proxy_processors = []
@@ -178,17 +205,22 @@ def clear_cache():
     _wirecloud_api_auth_backends = None
     _wirecloud_tab_preferences = None
     _wirecloud_workspace_preferences = None
+    _wirecloud_bootstrap_fragments = {}
 
 
 def get_plugin_urls():
-    plugins = get_plugins()
+    global _wirecloud_plugin_urls
 
-    urls = ()
+    if _wirecloud_plugin_urls is None:
+        plugins = get_plugins()
+        urls = ()
 
-    for plugin in plugins:
-        urls += plugin.get_urls()
+        for plugin in plugins:
+            urls += tuple(plugin.get_urls())
 
-    return urls
+        _wirecloud_plugin_urls = urls
+
+    return _wirecloud_plugin_urls
 
 
 def get_wirecloud_ajax_endpoints(view):
@@ -201,12 +233,32 @@ def get_wirecloud_ajax_endpoints(view):
     return endpoints
 
 
+def get_bootstrap_fragment(key, render):
+    """
+    Returns the bootstrap fragment identified by ``key``, calling ``render``
+    for building it only the first time. Fragments depend on the data
+    provided by the plugins, so they are discarded by ``clear_cache``.
+    """
+
+    fragment = _wirecloud_bootstrap_fragments.get(key)
+    if fragment is None:
+        fragment = render()
+        _wirecloud_bootstrap_fragments[key] = fragment
+
+    return fragment
+
+
 def get_extra_javascripts(view):
-    plugins = get_plugins()
-    files = []
 
-    for plugin in plugins:
-        files += plugin.get_scripts(view)
+    files = _wirecloud_extra_javascripts.get(view)
+    if files is None:
+        plugins = get_plugins()
+        files = ()
+
+        for plugin in plugins:
+            files += tuple(plugin.get_scripts(view))
+
+        _wirecloud_extra_javascripts[view] = files
 
     return files
 
@@ -283,11 +335,16 @@ def get_operator_api_extensions(view, features):
 
 
 def get_platform_css(view):
-    plugins = get_plugins()
-    files = []
 
-    for plugin in plugins:
-        files += plugin.get_platform_css(view)
+    files = _wirecloud_platform_css.get(view)
+    if files is None:
+        plugins = get_plugins()
+        files = ()
+
+        for plugin in plugins:
+            files += tuple(plugin.get_platform_css(view))
+
+        _wirecloud_platform_css[view] = files
 
     return files
 
@@ -20,17 +20,24 @@
 import json
 
 from django import template
-from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
 from django.contrib.staticfiles.templatetags.staticfiles import do_static as django_do_static
+from django.core.urlresolvers import get_script_prefix, reverse
 from django.template import TemplateSyntaxError
+from django.template.loader import render_to_string
 from django.template.loader_tags import do_extends as django_do_extends, do_include as django_do_include
 from django.utils.html import conditional_escape
+from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
 
 from wirecloud.commons.utils.encoding import LazyEncoder
 from wirecloud.commons.utils.http import get_absolute_reverse_url
-from wirecloud.platform.plugins import get_constants, get_extra_javascripts, get_platform_css, get_wirecloud_ajax_endpoints
-from wirecloud.platform.themes import get_active_theme_name, get_available_themes
+from wirecloud.platform.bundles import get_bundle_files, PLATFORM_SCRIPTS_BUNDLE
+from wirecloud.platform.core.plugins import get_version_hash
+from wirecloud.platform.i18n import get_javascript_catalog_path
+from wirecloud.platform.plugins import get_bootstrap_fragment, get_constants, get_platform_css, get_wirecloud_ajax_endpoints
+from wirecloud.platform.themes import get_active_theme_name, get_theme_registry
 
 
 register = template.Library()
@@ -126,18 +133,34 @@ def theme_static(parser, token):
 
 @register.inclusion_tag('wirecloud/js_includes.html', takes_context=True)
 def extra_javascripts(context, view):
+    """
+    Includes the platform scripts for the given view. If compression is
+    enabled, a single bundle (generated by the compressbundles command) is
+    included instead of the individual files.
+    """
 
     theme = context.get('THEME', get_active_theme_name())
-    files = get_extra_javascripts(view)
 
-    header_js = 'theme/%s/js/wirecloud/ui/WirecloudHeader.js' % theme
-    found = finders.find(header_js)
-    if found:
-        for i, file in enumerate(files):
-            if file == 'js/wirecloud/ui/WirecloudHeader.js':
-                files[i] = header_js
+    return {'files': get_bundle_files(PLATFORM_SCRIPTS_BUNDLE % (theme, view))}
 
-    return {'files': files}
+
+@register.simple_tag
+def javascript_catalog_url(language):
+    """
+    Returns the URL of the JavaScript translation catalog for the given
+    language, using the precompiled catalog generated by collectstatic if
+    available.
+
+    Usage::
+
+        {% javascript_catalog_url LANGUAGE_CODE %}
+    """
+
+    path = get_javascript_catalog_path(language)
+    if path is not None:
+        return staticfiles_storage.url(path)
+
+    return reverse('wirecloud.javascript_translation_catalogue') + '?' + urlencode({'language': language, 'v': get_version_hash()})
 
 
 @register.inclusion_tag('wirecloud/css_includes.html', takes_context=True)
@@ -150,11 +173,9 @@ def platform_css(context, view):
     return {'files': files}
 
 
-@register.inclusion_tag('wirecloud/bootstrap.html', takes_context=True)
-def wirecloud_bootstrap(context, view):
+def get_bootstrap_context(theme, view):
 
-    current_theme = context.get('THEME', get_active_theme_name())
-    available_themes = [{"value": theme.name, "label": theme.label} for theme in get_available_themes(metadata=True)]
+    available_themes = get_theme_registry().info
 
     endpoints = get_wirecloud_ajax_endpoints(view)
     script = 'Wirecloud.URLs = {\n'
@@ -172,7 +193,7 @@ def wirecloud_bootstrap(context, view):
     for constant in constants_def:
         constants.append({'key': constant['key'], 'value': mark_safe(constant['value'])})
     constants.append({'key': 'CURRENT_MODE', 'value': mark_safe('"' + view + '"')})
-    constants.append({'key': 'CURRENT_THEME', 'value': mark_safe('"' + current_theme + '"')})
+    constants.append({'key': 'CURRENT_THEME', 'value': mark_safe('"' + theme + '"')})
     constants.append({'key': 'AVAILABLE_THEMES', 'value': mark_safe(json.dumps(available_themes, cls=LazyEncoder))})
 
     return {
@@ -181,6 +202,20 @@ def wirecloud_bootstrap(context, view):
     }
 
 
+@register.simple_tag(takes_context=True)
+def wirecloud_bootstrap(context, view):
+    """
+    Renders the script initializing the Wirecloud JavaScript namespace. The
+    rendered fragment only depends on the theme, the view, the language and
+    the script prefix, so it is rendered once and reused on later calls.
+    """
+
+    current_theme = context.get('THEME', get_active_theme_name())
+    key = (current_theme, view, get_language(), get_script_prefix())
+
+    return get_bootstrap_fragment(key, lambda: render_to_string('wirecloud/bootstrap.html', get_bootstrap_context(current_theme, view)))
+
+
 @register.tag('ifinternalurl')
 def do_ifinternalurl(parser, token):
     """
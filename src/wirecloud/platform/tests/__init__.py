@@ -19,14 +19,15 @@
 
 
 from wirecloud.platform.tests.base import *  # noqa
-from wirecloud.platform.tests.commands import PopuplateCommandTestCase  # noqa
-from wirecloud.platform.tests.plugins import WirecloudPluginTestCase  # noqa
-from wirecloud.platform.tests.rest_api import AdministrationAPI, ApplicationMashupAPI, ResourceManagementAPI, ExtraApplicationMashupAPI  # noqa
+from wirecloud.platform.tests.cache import CacheBackendsTestCase  # noqa
+from wirecloud.platform.tests.commands import PopuplateCommandTestCase, SyncBaseWorkspacesCommandTestCase, BenchmarkCommandTestCase  # noqa
+from wirecloud.platform.tests.plugins import PlatformContextTestCase, WirecloudPluginTestCase  # noqa
+from wirecloud.platform.tests.rest_api import AdministrationAPI, APIBudgetsTestCase, ApplicationMashupAPI, ResourceManagementAPI, ExtraApplicationMashupAPI  # noqa
 from wirecloud.platform.tests.selenium import *  # noqa
 from wirecloud.platform.tests.themes import ThemesTestCase  # noqa
 from wirecloud.platform.localcatalogue.tests import *  # noqa
 from wirecloud.platform.markets.tests import *  # noqa
 from wirecloud.platform.wiring.tests import *  # noqa
 from wirecloud.platform.widget.tests import CodeTransformationTestCase, WidgetModuleTestCase  # noqa
-from wirecloud.platform.workspace.tests import WorkspaceMigrationsTestCase, WorkspaceTestCase, WorkspaceCacheTestCase, ParameterizedWorkspaceParseTestCase, ParameterizedWorkspaceGenerationTestCase  # noqa
+from wirecloud.platform.workspace.tests import SecureValuesTestCase, WorkspaceMigrationsTestCase, WorkspaceTestCase, WorkspaceCacheTestCase, ParameterizedWorkspaceParseTestCase, ParameterizedWorkspaceGenerationTestCase  # noqa
 from wirecloud.proxy.tests import ProxyTests, ProxySecureDataTests  # noqa
@@ -26,12 +26,14 @@ from lxml import etree
 
 import django
 from django.contrib.auth.models import Group, User
+from django.core.exceptions import ImproperlyConfigured
 from django.core.urlresolvers import reverse
 from django.test import Client, TransactionTestCase
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
-from django.template import TemplateDoesNotExist
+from django.template import Context, Template, TemplateDoesNotExist
 from mock import Mock, patch
+from rjsmin import jsmin
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
@@ -41,8 +43,11 @@ from wirecloud.commons.utils.http import get_absolute_reverse_url
 from wirecloud.commons.utils.remote import FormTester
 from wirecloud.commons.utils.testcases import WirecloudTestCase, wirecloud_selenium_test_case, WirecloudSeleniumTestCase
 from wirecloud.commons.exceptions import HttpBadCredentials
+from wirecloud.platform import bundles
+from wirecloud.platform.i18n import JavaScriptCatalogFinder
 from wirecloud.platform.models import Workspace
 from wirecloud.platform.preferences.models import update_session_lang
+from wirecloud.platform.templatetags.wirecloudtags import javascript_catalog_url
 from wirecloud.platform.views import get_default_view, render_wirecloud
 from django.utils.translation import LANGUAGE_SESSION_KEY
 
@@ -386,6 +391,92 @@ class BasicViewsAPI(WirecloudTestCase, TransactionTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertGreater(len(self.client.cookies), 0)
 
+    @override_settings(LANGUAGES=(('es', 'Spanish'), ('en', 'English')))
+    def test_javascript_catalog_finder(self):
+
+        finder = JavaScriptCatalogFinder()
+        files = dict(finder.list([]))
+        self.assertIn('cache/i18n/manifest.json', files)
+
+        storage = files['cache/i18n/manifest.json']
+        with storage.open('cache/i18n/manifest.json') as f:
+            manifest = json.loads(f.read().decode('utf-8'))
+        self.assertEqual(set(manifest.keys()), {'es', 'en'})
+        self.assertNotEqual(manifest['es'], manifest['en'])
+
+        with storage.open(manifest['es']) as f:
+            catalog = f.read().decode('utf-8')
+
+        # Precompiled catalogs are minified versions of the catalogs
+        # provided by the javascript_translation_catalogue view
+        response = self.client.get(reverse('wirecloud.javascript_translation_catalogue') + '?language=es', HTTP_ACCEPT_LANGUAGE='es')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(catalog, jsmin(response.content.decode('utf-8')))
+
+        # Files are ignored using collectstatic patterns
+        self.assertEqual(list(finder.list(['*.js'])), [('cache/i18n/manifest.json', storage)])
+        self.assertEqual(finder.find(manifest['es']), [])
+
+    def test_javascript_catalog_url(self):
+
+        with patch('wirecloud.platform.i18n._manifest', new={'es': 'cache/i18n/es.0123456789ab.js'}):
+            self.assertEqual(javascript_catalog_url('es'), '/static/cache/i18n/es.0123456789ab.js')
+
+            # Catalogs are not available for this language, fallback to the
+            # dynamic view
+            with patch('wirecloud.platform.templatetags.wirecloudtags.get_version_hash', return_value='v1'):
+                url = javascript_catalog_url('pt')
+            self.assertTrue(url.startswith(reverse('wirecloud.javascript_translation_catalogue') + '?'))
+            self.assertIn('language=pt', url)
+            self.assertIn('v=v1', url)
+
+    def render_extra_javascripts(self, view):
+        return Template('{% load wirecloudtags %}{% extra_javascripts "' + view + '" %}').render(Context({'THEME': 'wirecloud.defaulttheme'}))
+
+    @override_settings(COMPRESS_ENABLED=False)
+    def test_extra_javascripts(self):
+
+        bundles.clear_cache()
+        code = self.render_extra_javascripts('classic')
+
+        self.assertIn('src="/static/js/wirecloud/core.js"', code)
+        self.assertEqual(code.count('<script'), len(bundles.get_platform_script_files('wirecloud.defaulttheme', 'classic')))
+
+    @override_settings(COMPRESS_ENABLED=True)
+    def test_extra_javascripts_bundle(self):
+
+        manifest = {
+            'version': 'v1',
+            'bundles': {
+                bundles.PLATFORM_SCRIPTS_BUNDLE % ('wirecloud.defaulttheme', 'classic'): [{'url': '/static/cache/js/platform.0123456789ab.js', 'hash': '0'}],
+            },
+        }
+        with patch('wirecloud.platform.bundles._bundle_manifest', new=manifest):
+            code = self.render_extra_javascripts('classic')
+
+            self.assertEqual(code.count('<script'), 1)
+            self.assertIn('src="/static/cache/js/platform.0123456789ab.js"', code)
+
+            # Bundle not included in the manifest
+            self.assertRaises(ImproperlyConfigured, self.render_extra_javascripts, 'embedded')
+
+    def test_bundle_scripts(self):
+
+        files = ('js/wirecloud/constants.js', 'js/wirecloud/core.js')
+        code, source_map = bundles.bundle_scripts(files)
+
+        self.assertIn('Wirecloud.constants', code)
+        self.assertEqual(source_map['sources'], ['/static/js/wirecloud/constants.js', '/static/js/wirecloud/core.js'])
+
+        # Every line is mapped to the start of its source file
+        mappings = source_map['mappings'].split(';')
+        self.assertEqual(len(mappings), code.count('\n'))
+        self.assertEqual(mappings[0], 'AAAA')
+        self.assertEqual(mappings.count('ACAA'), 1)
+        self.assertEqual(set(mappings), {'AAAA', 'ACAA'})
+
+        self.assertRaises(ImproperlyConfigured, bundles.bundle_scripts, ('js/missing.js',))
+
 
 @wirecloud_selenium_test_case
 class BasicViewsSeleniumTestCase(WirecloudSeleniumTestCase):
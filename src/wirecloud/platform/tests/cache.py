@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+from uuid import uuid4
+
+from django.core.cache import caches
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+
+from wirecloud.platform.cache.backends.locmem import LocMemCache
+from wirecloud.platform.cache.backends.twotier import TwoTierCache
+
+
+# Avoid nose to repeat these tests (they are run through wirecloud/platform/tests/__init__.py)
+__test__ = False
+
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-tests',
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CacheBackendsTestCase(TestCase):
+
+    tags = ('wirecloud-cache', 'wirecloud-noselenium')
+
+    def setUp(self):
+        super(CacheBackendsTestCase, self).setUp()
+        caches['shared'].clear()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        super(CacheBackendsTestCase, self).tearDown()
+
+    def build_workers(self, count=2, **options):
+        # Each worker simulates a different process, so they use a different
+        # local tier and channel
+        options.setdefault('CHANNEL_OPTIONS', {'POLL_INTERVAL': 0})
+        return [TwoTierCache(uuid4().hex, {'OPTIONS': options}) for i in range(count)]
+
+    def test_locmem_cache_zero_timeout(self):
+
+        cache = LocMemCache(uuid4().hex, {})
+        cache.set('key', 'value', 0)
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertTrue(cache.add('key2', 'value', 0))
+        self.assertEqual(cache.get('key2'), 'value')
+
+    def test_two_tier_cache_shared_values(self):
+
+        worker1, worker2 = self.build_workers()
+
+        worker1.set('key', 'value')
+        self.assertEqual(worker2.get('key'), 'value')
+        self.assertEqual(caches['shared'].get('key'), 'value')
+        self.assertIsNone(worker2.get('missing'))
+
+    def test_two_tier_cache_local_hits(self):
+
+        worker, = self.build_workers(count=1)
+        worker.set('key', {'a': 1})
+
+        shared_cache = caches['shared']
+        with patch.object(shared_cache, 'get', wraps=shared_cache.get) as shared_get_mock:
+            value = worker.get('key')
+
+        self.assertEqual(value, {'a': 1})
+        # Only the invalidation channel should access the shared cache
+        self.assertNotIn('key', [call[0][0] for call in shared_get_mock.call_args_list])
+
+        # Local values are not shared with the caller
+        value['a'] = 2
+        self.assertEqual(worker.get('key'), {'a': 1})
+
+    def test_two_tier_cache_invalidation(self):
+
+        worker1, worker2 = self.build_workers()
+
+        worker1.set('key', 'value')
+        self.assertEqual(worker2.get('key'), 'value')
+
+        worker1.set('key', 'new value')
+        self.assertEqual(worker2.get('key'), 'new value')
+
+        worker1.delete('key')
+        self.assertIsNone(worker2.get('key'))
+
+        worker1.set('counter', 1)
+        self.assertEqual(worker2.get('counter'), 1)
+        self.assertEqual(worker1.incr('counter'), 2)
+        self.assertEqual(worker2.get('counter'), 2)
+
+        worker1.set_many({'a': 1, 'b': 2})
+        self.assertEqual(worker2.get_many(['a', 'b']), {'a': 1, 'b': 2})
+        worker1.delete_many(['a'])
+        self.assertEqual(worker2.get_many(['a', 'b']), {'b': 2})
+
+        worker1.clear()
+        self.assertIsNone(worker2.get('b'))
+
+    def test_two_tier_cache_lost_messages(self):
+
+        worker1, worker2 = self.build_workers()
+
+        worker1.set('key', 'value')
+        self.assertEqual(worker2.get('key'), 'value')
+
+        # Simulate the eviction of the invalidation message
+        worker1.set('key', 'new value')
+        caches['shared'].delete('_two_tier_cache/message/%s' % caches['shared'].get('_two_tier_cache/sequence'))
+
+        self.assertEqual(worker2.get('key'), 'new value')
+
+    def test_two_tier_cache_lru(self):
+
+        worker, = self.build_workers(count=1, LOCAL_MAX_ENTRIES=2)
+
+        worker.set('a', 1)
+        worker.set('b', 2)
+        worker.get('a')
+        worker.set('c', 3)
+
+        self.assertEqual(list(worker._local.keys()), [worker.make_key('a'), worker.make_key('c')])
+        # Evicted values are still available through the shared tier
+        self.assertEqual(worker.get('b'), 2)
+
+    def test_two_tier_cache_shared_only_keys(self):
+
+        worker1, worker2 = self.build_workers()
+
+        with patch.object(worker1.channel, 'publish') as publish_mock:
+            # Keys used by get_or_rebuild for locking and statistics
+            self.assertTrue(worker1.add('_cache_lock/key', True))
+            self.assertFalse(worker2.add('_cache_lock/key', True))
+            worker1.delete('_cache_lock/key')
+            self.assertTrue(worker2.add('_cache_lock/key', True))
+
+            worker1.set('_cache_stats/hits', 1)
+            self.assertEqual(worker1.incr('_cache_stats/hits'), 2)
+            self.assertEqual(worker2.incr('_cache_stats/hits'), 3)
+            self.assertEqual(worker1.get_many(['_cache_stats/hits']), {'_cache_stats/hits': 3})
+
+        self.assertFalse(publish_mock.called)
+        self.assertEqual(len(worker1._local), 0)
+
+    def test_two_tier_cache_shared_only_prefixes_option(self):
+
+        worker, = self.build_workers(count=1, SHARED_ONLY_PREFIXES=('counters/',))
+
+        with patch.object(worker.channel, 'publish') as publish_mock:
+            worker.set('counters/a', 1)
+            worker.set('key', 'value')
+
+        publish_mock.assert_called_once_with((worker.make_key('key'),))
+        self.assertEqual(list(worker._local.keys()), [worker.make_key('key')])
+
+    def test_two_tier_cache_file_channel(self):
+
+        channel_options = {
+            'LOCATION': os.path.join(self.tmp_dir, 'invalidations.log'),
+        }
+        worker1, worker2 = self.build_workers(CHANNEL='wirecloud.platform.cache.channels.FileChannel', CHANNEL_OPTIONS=channel_options)
+
+        worker1.set('key', 'value')
+        self.assertEqual(worker2.get('key'), 'value')
+
+        worker1.set('key', 'new value')
+        self.assertEqual(worker2.get('key'), 'new value')
+
+        # Truncating the file discards all the local entries
+        open(channel_options['LOCATION'], 'w').close()
+        caches['shared'].set('key', 'other value')
+        self.assertEqual(worker2.get('key'), 'other value')
+
+    def test_two_tier_cache_file_channel_max_size(self):
+
+        channel_options = {
+            'LOCATION': os.path.join(self.tmp_dir, 'invalidations.log'),
+            'MAX_SIZE': 200,
+        }
+        worker1, worker2 = self.build_workers(CHANNEL='wirecloud.platform.cache.channels.FileChannel', CHANNEL_OPTIONS=channel_options)
+
+        worker1.set('key', 'value')
+        self.assertEqual(worker2.get('key'), 'value')
+
+        for i in range(10):
+            worker1.set('key%s' % i, 'value')
+            self.assertLessEqual(os.path.getsize(channel_options['LOCATION']), 200)
+
+        # worker2 notices the file has been truncated
+        caches['shared'].set('key', 'other value')
+        self.assertEqual(worker2.get('key'), 'other value')
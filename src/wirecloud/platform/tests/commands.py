@@ -18,13 +18,17 @@
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
 import io
+import json
 import sys
 
+from django.contrib.auth.models import User
 from django.core.management import call_command
 from django.core.management.base import CommandError
 from django.test import override_settings, TransactionTestCase
 from mock import patch
+import requests
 
+from wirecloud.catalogue.models import CatalogueResource
 from wirecloud.commons.utils.testcases import WirecloudTestCase
 from wirecloud.platform.plugins import clear_cache
 
@@ -139,3 +143,63 @@ class PopuplateCommandTestCase(WirecloudTestCase, TransactionTestCase):
 
         getdefaultlocale_mock.side_effect = TypeError
         self.check_populate_command_empty_db_quiet()
+
+
+class SyncBaseWorkspacesCommandTestCase(WirecloudTestCase, TransactionTestCase):
+
+    tags = ('wirecloud-commands', 'wirecloud-command-syncbaseworkspaces', 'wirecloud-noselenium')
+    populate = False
+    use_search_indexes = False
+
+    def test_syncbaseworkspaces_command(self):
+
+        User.objects.create_user('user_with_workspaces')
+        User.objects.create_user('other_user')
+
+        with patch('wirecloud.platform.management.commands.syncbaseworkspaces.sync_base_workspaces') as sync_mock:
+            call_command('syncbaseworkspaces', 'user_with_workspaces', force=True, stdout=io.StringIO() if sys.version_info > (3, 0) else io.BytesIO())
+
+        self.assertEqual(sync_mock.call_count, 1)
+        self.assertEqual(sync_mock.call_args[0][0].username, 'user_with_workspaces')
+        self.assertEqual(sync_mock.call_args[1], {'force': True})
+
+
+class BenchmarkCommandTestCase(WirecloudTestCase, TransactionTestCase):
+
+    tags = ('wirecloud-commands', 'wirecloud-command-benchmark', 'wirecloud-noselenium')
+    populate = False
+
+    def test_benchmark_command(self):
+
+        stdout = io.StringIO() if sys.version_info > (3, 0) else io.BytesIO()
+        # The proxy is benchmarked against a real server listening on the
+        # loopback interface
+        with patch.multiple('requests', request=requests.api.request, get=requests.api.get, post=requests.api.post):
+            call_command('benchmark', users=2, workspaces=2, widgets=2, operators=2, resources=3, iterations=2, interactive=False, stdout=stdout)
+
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(report['dataset']['connections_per_workspace'], 8)
+        self.assertEqual(set(report['results']), set(('workspace-load', 'wiring-update', 'catalogue-search', 'widget-code', 'operator-code', 'proxy')))
+        for result in report['results'].values():
+            self.assertEqual(result['iterations'], 2)
+            self.assertGreater(result['queries']['first'], 0)
+
+        # Synthetic data is removed at the end
+        self.assertFalse(User.objects.filter(username__startswith='benchmark-').exists())
+        self.assertFalse(CatalogueResource.objects.filter(vendor='Benchmark').exists())
+
+    def test_benchmark_command_existing_data(self):
+
+        User.objects.create_user('benchmark-other', password='admin')
+
+        self.assertRaises(CommandError, call_command, 'benchmark', interactive=False, stdout=io.StringIO() if sys.version_info > (3, 0) else io.BytesIO())
+
+        # Data not created by the command is never removed
+        self.assertTrue(User.objects.filter(username='benchmark-other').exists())
+
+    def test_benchmark_command_cancelled(self):
+
+        with patch('wirecloud.platform.management.commands.benchmark.input', return_value='n'):
+            self.assertRaises(CommandError, call_command, 'benchmark', stdout=io.StringIO() if sys.version_info > (3, 0) else io.BytesIO())
+
+        self.assertFalse(User.objects.filter(username__startswith='benchmark-').exists())
@@ -18,12 +18,19 @@
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
 from django.test import TestCase
-from mock import DEFAULT, patch
+from django.utils import translation
+from mock import DEFAULT, Mock, patch
 
-from wirecloud.platform.plugins import clear_cache, get_active_features, get_plugins, \
+from wirecloud.platform.context.utils import get_platform_context_current_values
+from wirecloud.platform.core.plugins import WirecloudCorePlugin
+from wirecloud.platform.plugins import clear_cache, get_active_features, get_constants, get_plugins, \
     get_extra_javascripts, get_widget_api_extensions, WirecloudPlugin, find_wirecloud_plugins
+from wirecloud.platform.templatetags.wirecloudtags import wirecloud_bootstrap
+from wirecloud.platform.wsgi import warm_up
 
 
 # Avoid nose to repeat these tests (they are run through wirecloud/platform/tests/__init__.py)
@@ -133,6 +140,53 @@ class WirecloudPluginTestCase(TestCase):
 
         self.assertRaises(ImproperlyConfigured, get_plugins)
 
+    def test_bootstrap_fragment_cache(self):
+
+        settings.WIRECLOUD_PLUGINS = ()
+        context = {'THEME': 'wirecloud.defaulttheme'}
+
+        with patch('wirecloud.platform.templatetags.wirecloudtags.get_constants', wraps=get_constants) as get_constants_mock:
+            fragment = wirecloud_bootstrap(context, 'classic')
+            self.assertEqual(wirecloud_bootstrap(context, 'classic'), fragment)
+            self.assertEqual(get_constants_mock.call_count, 1)
+
+            # Fragments are rendered per view
+            self.assertIn('CURRENT_MODE: "embedded"', wirecloud_bootstrap(context, 'embedded'))
+            self.assertEqual(get_constants_mock.call_count, 2)
+
+            # Fragments are discarded when the plugin configuration changes
+            settings.WIRECLOUD_PLUGINS = (
+                'wirecloud.platform.tests.plugins.WirecloudTestPlugin1',
+            )
+            clear_cache()
+            self.assertIn('CURRENT_MODE: "classic"', wirecloud_bootstrap(context, 'classic'))
+            self.assertEqual(get_constants_mock.call_count, 3)
+
+    def test_warm_up(self):
+
+        settings.WIRECLOUD_PLUGINS = (
+            'wirecloud.platform.tests.plugins.WirecloudTestPlugin1',
+        )
+
+        with self.settings(COMPRESS_ENABLED=False):
+            with patch.object(WirecloudTestPlugin1, 'get_scripts', autospec=True, side_effect=WirecloudTestPlugin1.get_scripts) as get_scripts_mock:
+                warm_up()
+                self.assertTrue(get_scripts_mock.called)
+
+                # Registries are not filled again
+                get_scripts_mock.reset_mock()
+                self.assertEqual(get_extra_javascripts('classic')[-2:], ('a.js', 'b.js'))
+                self.assertIs(get_extra_javascripts('classic'), get_extra_javascripts('classic'))
+                self.assertFalse(get_scripts_mock.called)
+
+    def test_warm_up_missing_bundle_manifest(self):
+
+        settings.WIRECLOUD_PLUGINS = ()
+
+        with self.settings(COMPRESS_ENABLED=True):
+            with patch('wirecloud.platform.bundles.get_bundle_manifest', side_effect=ImproperlyConfigured):
+                self.assertRaises(ImproperlyConfigured, warm_up)
+
     def test_find_wirecloud_plugins_app_with_extra_import_errors(self):
 
         with self.settings(INSTALLED_APPS=('wirecloud.platform.tests.module_with_errors',)):
@@ -156,3 +210,91 @@ class WirecloudPluginTestCase(TestCase):
                 mocks['import_module'].side_effect = NameError()
                 find_wirecloud_plugins()
                 self.assertTrue(mocks['logger'].error.called)
+
+
+class WirecloudContextTestPlugin(WirecloudPlugin):
+
+    def __init__(self, volatility):
+        self.volatility = volatility
+        self.calls = 0
+
+    def get_platform_context_definitions(self):
+        definition = {'label': self.volatility}
+        if self.volatility is not None:
+            definition['volatility'] = self.volatility
+
+        return {'%s_value' % self.volatility: definition}
+
+    def get_platform_context_current_values(self, user):
+        self.calls += 1
+        return {'%s_value' % self.volatility: '%s-%s' % (self.volatility, user.id)}
+
+
+class PlatformContextTestCase(TestCase):
+
+    tags = ('wirecloud-plugins', 'wirecloud-context', 'wirecloud-noselenium')
+
+    def setUp(self):
+        super(PlatformContextTestCase, self).setUp()
+        cache.clear()
+
+        self.plugins = {volatility: WirecloudContextTestPlugin(volatility) for volatility in ('deployment', 'user', 'request', None)}
+        self.get_plugins_mock = patch('wirecloud.platform.context.utils.get_plugins', return_value=tuple(self.plugins.values()))
+        self.get_plugins_mock.start()
+        self.addCleanup(self.get_plugins_mock.stop)
+
+    def test_get_platform_context_current_values(self):
+
+        user1 = Mock(id=1)
+        user2 = Mock(id=2)
+
+        values = get_platform_context_current_values(user1)
+        self.assertEqual(values, {
+            'deployment_value': 'deployment-1',
+            'user_value': 'user-1',
+            'request_value': 'request-1',
+            'None_value': 'None-1',
+        })
+
+        values = get_platform_context_current_values(user2)
+        self.assertEqual(values['deployment_value'], 'deployment-1')
+        self.assertEqual(values['user_value'], 'user-2')
+        self.assertEqual(values['request_value'], 'request-2')
+
+        get_platform_context_current_values(user1)
+
+        self.assertEqual(self.plugins['deployment'].calls, 1)
+        self.assertEqual(self.plugins['user'].calls, 2)
+        self.assertEqual(self.plugins['request'].calls, 3)
+        # Plugins not declaring the volatility of their values are queried
+        # on every call
+        self.assertEqual(self.plugins[None].calls, 3)
+
+    def test_get_platform_context_current_values_user_changes(self):
+
+        user = User.objects.create_user('context_user')
+
+        get_platform_context_current_values(user)
+        user.first_name = 'Context'
+        user.save()
+        get_platform_context_current_values(user)
+
+        self.assertEqual(self.plugins['user'].calls, 2)
+
+    def test_get_platform_context_current_values_core_plugin(self):
+
+        user = User.objects.create_user('context_user')
+
+        with patch('wirecloud.platform.context.utils.get_plugins', return_value=get_plugins()):
+            with patch.object(WirecloudCorePlugin, 'get_platform_context_current_values', autospec=True, side_effect=WirecloudCorePlugin.get_platform_context_current_values) as values_mock:
+                with translation.override('en'):
+                    values = get_platform_context_current_values(user)
+                with translation.override('es'):
+                    values_es = get_platform_context_current_values(user)
+
+        # The language is the only core value changing on every request
+        self.assertEqual(values_mock.call_count, 1)
+        self.assertEqual(values['username'], 'context_user')
+        self.assertEqual(values['language'], 'en')
+        self.assertEqual(values_es['username'], 'context_user')
+        self.assertEqual(values_es['language'], 'es')
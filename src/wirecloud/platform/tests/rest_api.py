@@ -20,13 +20,18 @@
 from __future__ import unicode_literals
 
 import filecmp
+import gzip
+from io import BytesIO
 import json
 from lxml import etree
 import os
+import re
 
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
 from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import override_settings
 from mock import Mock, patch
 import six
 
@@ -383,8 +388,8 @@ def check_get_request(self, url, *args, **kwargs):
 
     self.assertEqual(response.status_code, head_response.status_code)
     for header in response._headers:
-        # Ignore Date and Last-Modified headers
-        if header in ('date', 'last-modified'):
+        # Ignore Date, Last-Modified and Server-Timing headers
+        if header in ('date', 'last-modified', 'server-timing'):
             continue
         self.assertEqual(response[header], head_response[header])
     self.assertEqual(initial_etag, head_etag)
@@ -430,6 +435,100 @@ class ApplicationMashupAPI(WirecloudTestCase, TransactionTestCase):
         self.assertTrue(isinstance(response_data, list))
         self.assertTrue(isinstance(response_data[0], dict))
 
+    def test_workspace_collection_get_paginated(self):
+
+        url = reverse('wirecloud.workspace_collection')
+
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = check_get_request(self, url, HTTP_ACCEPT='application/json')
+        all_ids = [workspace['id'] for workspace in json.loads(response.content.decode('utf-8'))]
+        self.assertGreater(len(all_ids), 1)
+
+        ids = []
+        next_url = url + '?limit=1'
+        while next_url is not None:
+            response = check_get_request(self, next_url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            response_data = json.loads(response.content.decode('utf-8'))
+            self.assertEqual(len(response_data), 1)
+            ids.append(response_data[0]['id'])
+
+            next_url = None
+            if response.has_header('Link'):
+                match = re.match(r'<([^>]+)>; rel="next"', response['Link'])
+                self.assertIsNotNone(match)
+                next_url = match.group(1)
+
+        self.assertEqual(sorted(ids, key=int), sorted(all_ids, key=int))
+
+    def test_workspace_collection_get_streaming(self):
+
+        url = reverse('wirecloud.workspace_collection')
+
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        expected_data = json.loads(response.content.decode('utf-8'))
+
+        with override_settings(WIRECLOUD_JSON_STREAMING_THRESHOLD=0):
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            self.assertIn('ETag', response)
+
+            response_data = json.loads(b''.join(response.streaming_content).decode('utf-8'))
+            self.assertEqual(response_data, expected_data)
+
+            cached_response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(cached_response.status_code, 304)
+
+    def test_workspace_collection_get_invalid_pagination(self):
+
+        url = reverse('wirecloud.workspace_collection')
+
+        self.client.login(username='admin', password='admin')
+
+        for query in ('?limit=a', '?limit=0', '?limit=1&cursor=a'):
+            response = self.client.get(url + query, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 422)
+
+    def test_workspace_collection_get_filters(self):
+
+        url = reverse('wirecloud.workspace_collection')
+
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = check_get_request(self, url + '?owner=user_with_workspaces', HTTP_ACCEPT='application/json')
+        response_data = json.loads(response.content.decode('utf-8'))
+        self.assertGreater(len(response_data), 0)
+        self.assertTrue(all(workspace['owner'] == 'user_with_workspaces' for workspace in response_data))
+
+        response = check_get_request(self, url + '?public=true', HTTP_ACCEPT='application/json')
+        response_data = json.loads(response.content.decode('utf-8'))
+        self.assertTrue(all(workspace['public'] for workspace in response_data))
+
+        response = check_get_request(self, url + '?shared=false', HTTP_ACCEPT='application/json')
+        response_data = json.loads(response.content.decode('utf-8'))
+        self.assertTrue(all(not workspace['shared'] for workspace in response_data))
+        self.assertNotIn('SharedWorkspace', [workspace['name'] for workspace in response_data])
+
+        response = check_get_request(self, url + '?search=ExistingWorkspace', HTTP_ACCEPT='application/json')
+        response_data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual([workspace['name'] for workspace in response_data], ['ExistingWorkspace'])
+
+    def test_workspace_collection_get_fields(self):
+
+        url = reverse('wirecloud.workspace_collection')
+
+        self.client.login(username='admin', password='admin')
+
+        response = check_get_request(self, url + '?fields=id,name', HTTP_ACCEPT='application/json')
+        response_data = json.loads(response.content.decode('utf-8'))
+        self.assertGreater(len(response_data), 0)
+        for workspace in response_data:
+            self.assertEqual(set(workspace.keys()), {'id', 'name'})
+
     def test_workspace_collection_post_requires_authentication(self):
 
         url = reverse('wirecloud.workspace_collection')
@@ -913,6 +1012,47 @@ class ApplicationMashupAPI(WirecloudTestCase, TransactionTestCase):
         self.assertTrue('preferences' in response_data)
         self.assertTrue(isinstance(response_data['preferences'], dict))
 
+    def test_workspace_entry_get_not_modified(self):
+
+        url = reverse('wirecloud.workspace_entry', kwargs={'workspace_id': 1})
+
+        # Authenticate
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        # Workspace data should not be built for revalidating it
+        with patch('wirecloud.platform.workspace.views.get_global_workspace_data') as get_global_workspace_data_mock:
+            cached_response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(cached_response.status_code, 304)
+        self.assertEqual(cached_response['ETag'], response['ETag'])
+        self.assertFalse(get_global_workspace_data_mock.called)
+
+    def test_workspace_entry_get_shared_base_data(self):
+
+        url = reverse('wirecloud.workspace_entry', kwargs={'workspace_id': 1})
+
+        # Authenticate
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        expected_data = json.loads(response.content.decode('utf-8'))
+
+        # The base data of the workspace is reused, only the user data is
+        # merged again. Final responses are neither cached nor precompressed
+        # as they depend on the user
+        with patch('wirecloud.platform.workspace.utils._get_workspace_base_data') as base_data_mock:
+            with patch('wirecloud.commons.utils.cache.compress_payload') as compress_mock:
+                response = self.client.get(url, HTTP_ACCEPT='application/json')
+
+        self.assertFalse(base_data_mock.called)
+        self.assertFalse(compress_mock.called)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), expected_data)
+
     def test_workspace_entry_get_not_found(self):
         url = reverse('wirecloud.workspace_entry', kwargs={'workspace_id': 404})
         check_not_found_response(self, 'get', url)
@@ -1546,6 +1686,28 @@ class ApplicationMashupAPI(WirecloudTestCase, TransactionTestCase):
         self.assertTrue('iwidgets' in response_data)
         self.assertTrue(isinstance(response_data['iwidgets'], list))
 
+    def test_tab_entry_get_not_modified(self):
+
+        url = reverse('wirecloud.tab_entry', kwargs={'workspace_id': 1, 'tab_id': 1})
+
+        # Authenticate
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        # Tab data should not be built for revalidating it
+        with patch('wirecloud.platform.workspace.views.get_tab_data') as get_tab_data_mock:
+            cached_response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(cached_response.status_code, 304)
+        self.assertFalse(get_tab_data_mock.called)
+
+        # ETags are not shared between resources
+        url = reverse('wirecloud.workspace_entry', kwargs={'workspace_id': 1})
+        response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
     def test_tab_entry_get_workspace_not_found(self):
         url = reverse('wirecloud.tab_entry', kwargs={'workspace_id': 404, 'tab_id': 1})
         check_not_found_response(self, 'get', url)
@@ -2034,6 +2196,28 @@ class ApplicationMashupAPI(WirecloudTestCase, TransactionTestCase):
         self.assertEqual(response.status_code, 200)
         self.assertIn("cached hello world!", response.content.decode('utf-8'))
 
+    def test_widget_code_entry_get_cached_precompressed(self):
+
+        widget_id = {'vendor': 'Wirecloud', 'name': 'Test', 'version': '1.0', 'file_path': '/test.html'}
+        url = reverse('wirecloud.showcase_media', kwargs=widget_id) + '?entrypoint=true'
+
+        CACHED_CODE = "<html><head></head><body>%s</body></html>" % ("cached hello world! " * 50)
+        xhtml = CatalogueResource.objects.get(vendor='Wirecloud', short_name='Test', version='1.0').widget.xhtml
+        xhtml.cacheable = True
+        xhtml.code = CACHED_CODE
+        xhtml.save()
+
+        # Authenticate
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml')
+        self.assertEqual(response.status_code, 200)
+
+        compressed_response = self.client.get(url, HTTP_ACCEPT='application/xhtml+xml', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(compressed_response.status_code, 200)
+        self.assertEqual(compressed_response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(compressed_response.content)).read(), response.content)
+
     def test_widget_code_entry_get_html_in_folder(self):
 
         widget_id = {'vendor': 'Wirecloud', 'name': 'Test', 'version': '1.0', 'file_path': 'Wirecloud/Test/1.0/html/index.html'}
@@ -2887,6 +3071,42 @@ class ResourceManagementAPI(WirecloudTestCase, TransactionTestCase):
             elif resource['type'] == 'widget':
                 self.assertTrue(resource['contents']['src'].startswith('http'))
 
+    def test_resource_collection_get_streaming(self):
+
+        url = reverse('wirecloud.resource_collection')
+
+        self.client.login(username='admin', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        expected_data = json.loads(response.content.decode('utf-8'))
+
+        with override_settings(WIRECLOUD_JSON_STREAMING_THRESHOLD=0):
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            self.assertIn('ETag', response)
+
+            response_data = json.loads(b''.join(response.streaming_content).decode('utf-8'))
+            self.assertEqual(response_data, expected_data)
+
+            cached_response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(cached_response.status_code, 304)
+
+    def test_resource_collection_get_etag_changes(self):
+
+        url = reverse('wirecloud.resource_collection')
+
+        self.client.login(username='admin', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        etag = response['ETag']
+
+        CatalogueResource.objects.get(vendor='Wirecloud', short_name='Test', version='1.0').save()
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_resource_collection_get_multiple_groups(self):
 
         user_with_workspaces = User.objects.get(username='user_with_workspaces')
@@ -3483,6 +3703,23 @@ class ExtraApplicationMashupAPI(WirecloudTestCase, TransactionTestCase):
         response_data = json.loads(response.content.decode('utf-8'))
         self.assertTrue(isinstance(response_data, list))
 
+    def test_iwidget_collection_get_not_modified(self):
+
+        url = reverse('wirecloud.iwidget_collection', kwargs={'workspace_id': 2, 'tab_id': 101})
+
+        # Authenticate
+        self.client.login(username='user_with_workspaces', password='admin')
+
+        response = self.client.get(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        # iwidget data should not be built for revalidating it
+        with patch('wirecloud.platform.iwidget.views.get_iwidget_data') as get_iwidget_data_mock:
+            cached_response = self.client.get(url, HTTP_ACCEPT='application/json', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(cached_response.status_code, 304)
+        self.assertFalse(get_iwidget_data_mock.called)
+
     def test_iwidget_collection_get_workspace_not_found(self):
 
         url = reverse('wirecloud.iwidget_collection', kwargs={'workspace_id': 404, 'tab_id': 101})
@@ -4690,3 +4927,130 @@ class AdministrationAPI(WirecloudTestCase, TestCase):
             auth.get_backends.return_value = (backend1, backend2)
             response = self.client.post(self.su_url, '{"username": "user_with_workspaces"}', content_type='application/json; charset=UTF-8', HTTP_ACCEPT='application/json')
             self.assertEqual(response.status_code, 404)
+
+
+class APIBudgetsTestCase(WirecloudTestCase, TransactionTestCase):
+
+    fixtures = ('selenium_test_data', 'user_with_workspaces')
+    tags = ('wirecloud-rest-api', 'wirecloud-budgets', 'wirecloud-noselenium')
+    populate = False
+    use_search_indexes = False
+
+    def setUp(self):
+        super(APIBudgetsTestCase, self).setUp()
+
+        self.client = Client()
+        self.client.login(username='user_with_workspaces', password='admin')
+
+    def set_iwidget_count(self, tab_id, count):
+
+        iwidgets = list(IWidget.objects.filter(tab__pk=tab_id).order_by('pk'))
+        for iwidget in iwidgets[count:]:
+            iwidget.delete()
+
+        iwidget = iwidgets[0]
+        for i in range(len(iwidgets), count):
+            iwidget.pk = None
+            iwidget.save()
+
+    def test_workspace_entry_get_budget(self):
+
+        url = reverse('wirecloud.workspace_entry', kwargs={'workspace_id': 2})
+
+        def get_workspace():
+            # Measure the worst case: workspace data is not cached
+            cache.clear()
+            response = self.client.get(url, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+
+        with self.assertWithinBudget('wirecloud.workspace_entry', 'GET'):
+            get_workspace()
+
+        self.assertQueryCountScales(lambda size: self.set_iwidget_count(101, size), get_workspace)
+
+    def test_workspace_wiring_entry_put_budget(self):
+
+        url = reverse('wirecloud.workspace_wiring', kwargs={'workspace_id': 2})
+
+        def add_operators(size):
+            workspace = Workspace.objects.get(pk=2)
+            for i in range(len(workspace.wiringStatus['operators']), size):
+                workspace.wiringStatus['operators']['%s' % i] = {'id': '%s' % i, 'name': 'Wirecloud/TestOperator/1.0', 'preferences': {}, 'properties': {}}
+            workspace.save()
+
+        def update_wiring():
+            wiring_status = Workspace.objects.get(pk=2).wiringStatus
+            response = self.client.put(url, json.dumps(wiring_status), content_type='application/json; charset=UTF-8', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 204)
+
+        add_operators(1)
+        with self.assertWithinBudget('wirecloud.workspace_wiring', 'PUT'):
+            update_wiring()
+
+        self.assertQueryCountScales(add_operators, update_wiring)
+
+    def test_iwidget_entry_post_budget(self):
+
+        url = reverse('wirecloud.iwidget_entry', kwargs={'workspace_id': 2, 'tab_id': 101, 'iwidget_id': 2})
+        data = {'title': 'New title', 'left': 10, 'top': 10}
+
+        with self.assertWithinBudget('wirecloud.iwidget_entry', 'POST'):
+            response = self.client.post(url, json.dumps(data), content_type='application/json; charset=UTF-8', HTTP_ACCEPT='application/json')
+
+        self.assertEqual(response.status_code, 204)
+
+    def test_iwidget_collection_put_budget(self):
+
+        url = reverse('wirecloud.iwidget_collection', kwargs={'workspace_id': 2, 'tab_id': 101})
+
+        def place_iwidgets():
+            data = [{'id': iwidget_id, 'left': 1, 'top': 1} for iwidget_id in IWidget.objects.filter(tab__pk=101).values_list('pk', flat=True)]
+            response = self.client.put(url, json.dumps(data), content_type='application/json; charset=UTF-8', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 204)
+
+        with self.assertWithinBudget('wirecloud.iwidget_collection', 'PUT'):
+            place_iwidgets()
+
+        # Each iwidget has to be updated
+        self.assertQueryCountScales(lambda size: self.set_iwidget_count(101, size), place_iwidgets, per_item=1)
+
+    def test_tab_order_post_budget(self):
+
+        url = reverse('wirecloud.tab_order', kwargs={'workspace_id': 3})
+        workspace = Workspace.objects.get(pk=3)
+
+        def create_tabs(size):
+            for i in range(workspace.tab_set.count(), size):
+                Tab.objects.create(name='tab-%s' % i, title='Tab %s' % i, workspace=workspace, position=i)
+
+        def reverse_tabs():
+            order = list(workspace.tab_set.order_by('-position').values_list('pk', flat=True))
+            response = self.client.post(url, json.dumps(order), content_type='application/json; charset=UTF-8', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 204)
+
+        with self.assertWithinBudget('wirecloud.tab_order', 'POST'):
+            reverse_tabs()
+
+        self.assertQueryCountScales(create_tabs, reverse_tabs, sizes=(2, 50))
+
+    def test_platform_preference_collection_post_budget(self):
+
+        url = reverse('wirecloud.platform_preferences')
+        preferences = {}
+
+        def add_preferences(size):
+            for i in range(len(preferences), size):
+                preferences['pref%s' % i] = {'value': 'value'}
+
+        def update_preferences():
+            for name in preferences:
+                preferences[name]['value'] += '1'
+            response = self.client.post(url, json.dumps(preferences), content_type='application/json; charset=UTF-8', HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 204)
+
+        add_preferences(1)
+        with self.assertWithinBudget('wirecloud.platform_preferences', 'POST'):
+            update_preferences()
+
+        # Each preference has to be updated
+        self.assertQueryCountScales(add_preferences, update_preferences, per_item=1)
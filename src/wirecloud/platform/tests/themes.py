@@ -28,7 +28,7 @@ from django.test.utils import override_settings
 from mock import MagicMock, Mock, patch
 import six
 
-from wirecloud.platform.themes import ActiveThemeFinder, CORE_THEMES, DEFAULT_THEME, get_active_theme_name, get_available_themes as real_get_available_themes, get_theme_chain, get_theme_metadata, TemplateLoader
+from wirecloud.platform.themes import ActiveThemeFinder, CORE_THEMES, DEFAULT_THEME, get_active_theme_name, get_available_themes as real_get_available_themes, get_theme_chain, get_theme_metadata, get_theme_registry, TemplateLoader
 
 
 class Theme(object):
@@ -173,6 +173,30 @@ class ThemesTestCase(unittest.TestCase):
     def test_get_theme_chain_basic_import_error(self):
         self.assertRaises(ValueError, get_theme_chain)
 
+    @override_settings(THEME_ACTIVE="custommodtheme")
+    def test_get_theme_registry(self):
+        registry = get_theme_registry()
+
+        self.assertEqual(list(registry.themes), [DEFAULT_THEME, "customtheme", "custommodtheme", "customroottheme"])
+        self.assertIn("customtheme", registry)
+        self.assertNotIn("invalidtheme", registry)
+        self.assertEqual(registry.active_theme, "custommodtheme")
+        self.assertEqual(registry.chains["custommodtheme"], (CUSTOMMOD_THEME_MODULE, CUSTOM_THEME_MODULE, DEFAULT_THEME_MODULE))
+        self.assertEqual(registry.template_dirs["customroottheme"], ('/fs/customroottheme/templates',))
+        self.assertEqual(registry.static_dirs["customtheme"], ('/fs/customtheme/static', '/fs/wirecloud/defaulttheme/static'))
+        self.assertIn({"value": "custommodtheme", "label": "My Custom Theme"}, registry.info)
+
+        # Themes are only discovered once
+        self.assertIs(get_theme_registry(), registry)
+
+    def test_get_theme_registry_active_theme_changes(self):
+        with override_settings(THEME_ACTIVE="customtheme"):
+            registry = get_theme_registry()
+            self.assertEqual(registry.active_theme, "customtheme")
+
+        with override_settings(THEME_ACTIVE="customroottheme"):
+            self.assertEqual(get_theme_registry().active_theme, "customroottheme")
+
     @override_settings(THEME_ACTIVE="customtheme")
     def test_get_template_sources_basic(self):
         loader = TemplateLoader(Mock())
@@ -17,6 +17,7 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
 
+from collections import OrderedDict
 from importlib import import_module
 import errno
 import io
@@ -28,6 +29,8 @@ from django.contrib.staticfiles.finders import BaseFinder
 from django.contrib.staticfiles import utils
 from django.core.exceptions import SuspiciousFileOperation
 from django.core.files.storage import FileSystemStorage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.template import TemplateDoesNotExist
 from django.template.base import Origin
 from django.utils._os import safe_join
@@ -38,6 +41,8 @@ from django.template.loaders.base import Loader
 CORE_THEMES = ('wirecloud.defaulttheme', 'wirecloud.fiwaretheme', 'wirecloud.fiwarelabtheme', 'wirecloud.fiwarelabdarktheme')
 DEFAULT_THEME = 'wirecloud.defaulttheme'
 
+_theme_registry = None
+
 
 def get_active_theme_name():
     return getattr(settings, "THEME_ACTIVE", DEFAULT_THEME)
@@ -96,6 +101,69 @@ def get_theme_chain(theme_name=None):
     return theme_chain
 
 
+class ThemeRegistry(object):
+    """
+    Registry of the available themes. Themes are discovered only once (when
+    creating the registry), precomputing their inheritance chains and the
+    directories to use for looking up templates and static files. Registry
+    contents should be considered read only.
+    """
+
+    def __init__(self):
+
+        self.active_theme = get_active_theme_name()
+
+        metadata = {}
+
+        def load(theme_name):
+            if theme_name not in metadata:
+                metadata[theme_name] = get_theme_metadata(theme_name)
+            return metadata[theme_name]
+
+        self.themes = OrderedDict((theme_name, load(theme_name)) for theme_name in get_available_themes())
+
+        self.chains = {}
+        for theme_name in self.themes:
+            theme_chain = []
+            parent = theme_name
+            while parent is not None:
+                theme = load(parent)
+                theme_chain.append(theme)
+                parent = theme.parent
+            self.chains[theme_name] = tuple(theme_chain)
+
+        self.template_dirs = {theme_name: tuple(get_theme_dir(theme, 'templates') for theme in chain) for theme_name, chain in self.chains.items()}
+        self.static_dirs = {theme_name: tuple(get_theme_dir(theme, 'static') for theme in chain) for theme_name, chain in self.chains.items()}
+        self.locale_dirs = tuple(get_theme_dir(theme, 'locale') for theme in self.themes.values())
+        self.info = tuple({"value": theme.name, "label": theme.label} for theme in self.themes.values())
+
+    def __contains__(self, theme_name):
+        return theme_name in self.themes
+
+
+def get_theme_registry():
+
+    global _theme_registry
+
+    if _theme_registry is None:
+        _theme_registry = ThemeRegistry()
+
+    return _theme_registry
+
+
+def clear_cache():
+
+    global _theme_registry
+
+    _theme_registry = None
+
+
+@receiver(setting_changed)
+def update_theme_registry(sender, setting, **kwargs):
+    if setting == 'THEME_ACTIVE':
+        clear_cache()
+
+
 class TemplateLoader(Loader):
 
     is_usable = True
@@ -103,13 +171,10 @@ class TemplateLoader(Loader):
     def __init__(self, *args, **kwargs):
         super(TemplateLoader, self).__init__(*args, **kwargs)
 
-        self.active_theme_chain = get_theme_chain()
-        self.active_template_dirs = [get_theme_dir(theme, 'templates') for theme in self.active_theme_chain]
-        self.themes = {}
-
-        for theme in get_available_themes():
-            theme_chain = get_theme_chain(theme)
-            self.themes[theme] = [get_theme_dir(theme_module, 'templates') for theme_module in theme_chain]
+        registry = get_theme_registry()
+        self.active_theme_chain = registry.chains[registry.active_theme]
+        self.active_template_dirs = registry.template_dirs[registry.active_theme]
+        self.themes = registry.template_dirs
 
     def get_contents(self, origin):
 
@@ -164,12 +229,12 @@ class ActiveThemeFinder(BaseFinder):
     def __init__(self, apps=None, *args, **kwargs):
         self.themes = {}
 
-        for theme in get_available_themes():
+        registry = get_theme_registry()
+        for theme in registry.themes:
             prefix = 'theme%s%s' % (os.sep, theme)
             self.themes[theme] = []
-            theme_chain = get_theme_chain(theme)
-            for theme_module in theme_chain:
-                storage = FileSystemStorage(get_theme_dir(theme_module, 'static'))
+            for static_dir in registry.static_dirs[theme]:
+                storage = FileSystemStorage(static_dir)
                 storage.prefix = prefix
                 self.themes[theme].append(storage)
 
@@ -20,9 +20,7 @@
 from __future__ import unicode_literals
 
 import os
-import random
 
-from django.core.cache import cache
 from django.db import models
 from django.db.models.signals import pre_delete, post_save
 from django.dispatch import receiver
@@ -30,6 +28,7 @@ from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext as _
 
 from wirecloud.catalogue.models import CatalogueResource
+from wirecloud.commons.utils.cache import new_generation
 from wirecloud.commons.utils.wgt import WgtFile
 
 
@@ -43,25 +42,15 @@ class XHTML(models.Model):
     content_type = models.CharField(_('Content type'), max_length=50, blank=True, null=True)
     use_platform_style = models.BooleanField(_('Uses platform style'), default=False)
     cacheable = models.BooleanField(_('Cacheable'), default=True, blank=True)
+    cache_generation = models.BigIntegerField(_('Cache generation'), default=new_generation, editable=False)
 
     def __str__(self):
         return self.uri
 
     def get_cache_key(self, domain, mode, theme):
-        version = cache.get('_widget_xhtml_version/%s' % self.id)
-        if version is None:
-            version = random.randrange(1, 100000)
-            cache.set('_widget_xhtml_version/%s' % self.id, version)
-
-        return '_widget_xhtml/%s/%s/%s?mode=%s&theme=%s' % (version, domain, self.id, mode, theme)
-
-    def delete(self, *args, **kwargs):
-        old_id = self.id
-        super(XHTML, self).delete(*args, **kwargs)
-        try:
-            cache.incr('_widget_xhtml_version/%s' % old_id)
-        except ValueError:
-            pass
+        # Widget code is never updated (XHTML instances are replaced instead),
+        # the generation only ensures keys are not reused if ids are recycled
+        return '_widget_xhtml/%s/%s/%s?mode=%s&theme=%s' % (self.cache_generation, domain, self.id, mode, theme)
 
     class Meta:
         app_label = 'platform'
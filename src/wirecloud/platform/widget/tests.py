@@ -19,14 +19,16 @@
 
 from __future__ import unicode_literals
 
+import json
 import os.path
 import re
 
+from django.core.exceptions import ImproperlyConfigured
 from django.http import Http404
 from django.test import TestCase, override_settings
 from mock import MagicMock, Mock, patch
 
-from wirecloud.platform import plugins
+from wirecloud.platform import bundles, plugins
 from wirecloud.platform.widget.utils import fix_widget_code
 from wirecloud.platform.widget.views import serve_showcase_media
 
@@ -60,6 +62,7 @@ class CodeTransformationTestCase(TestCase):
         # Clear cache
         from django.core.cache import cache
         cache.clear()
+        bundles.clear_cache()
 
         super(CodeTransformationTestCase, self).setUp()
 
@@ -135,11 +138,29 @@ class CodeTransformationTestCase(TestCase):
     @override_settings(COMPRESS_ENABLED=True)
     def test_basic_xhtml_compressed(self):
         initial_code = self.read_file('test-data/xhtml2-initial.html')
-        final_code = self.XML_NORMALIZATION_RE.sub(b'><', fix_widget_code(initial_code, 'application/xhtml+xml', None, 'utf-8', False, {}, 'classic', 'wirecloud_defaulttheme')) + b'\n'
+        with patch('wirecloud.platform.bundles._bundle_manifest', new=bundles.build_bundle_manifest()):
+            final_code = self.XML_NORMALIZATION_RE.sub(b'><', fix_widget_code(initial_code, 'application/xhtml+xml', None, 'utf-8', False, {}, 'classic', 'wirecloud_defaulttheme')) + b'\n'
         final_code = self.COMPRESS_HASH_RE.sub(b'/widgetapi.js', final_code)
         expected_code = self.read_file('test-data/xhtml2-compressed-expected.html')
         self.assertEqual(final_code, expected_code)
 
+    @override_settings(COMPRESS_ENABLED=True)
+    def test_basic_xhtml_compressed_missing_manifest(self):
+        initial_code = self.read_file('test-data/xhtml2-initial.html')
+        with patch('wirecloud.platform.bundles.staticfiles_storage') as storage_mock:
+            storage_mock.open.side_effect = IOError
+            self.assertRaises(ImproperlyConfigured, fix_widget_code, initial_code, 'application/xhtml+xml', None, 'utf-8', False, {}, 'classic', 'wirecloud_defaulttheme')
+
+    @override_settings(COMPRESS_ENABLED=True)
+    def test_basic_xhtml_compressed_outdated_manifest(self):
+        initial_code = self.read_file('test-data/xhtml2-initial.html')
+        manifest = bundles.build_bundle_manifest()
+        with patch('wirecloud.platform.bundles.staticfiles_storage') as storage_mock:
+            manifest['version'] = 'v0'
+            storage_mock.open.return_value = MagicMock()
+            storage_mock.open.return_value.__enter__().read.return_value = json.dumps(manifest).encode('utf-8')
+            self.assertRaises(ImproperlyConfigured, fix_widget_code, initial_code, 'application/xhtml+xml', None, 'utf-8', False, {}, 'classic', 'wirecloud_defaulttheme')
+
     def test_basic_xhtml_iso8859_15(self):
         initial_code = self.read_file('test-data/xhtml2-iso8859-15-initial.html')
         final_code = self.XML_NORMALIZATION_RE.sub(b'><', fix_widget_code(initial_code, 'application/xhtml+xml', None, 'iso-8859-15', False, {}, 'classic', 'wirecloud_defaulttheme')) + b'\n'
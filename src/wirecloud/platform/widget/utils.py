@@ -21,18 +21,18 @@ from __future__ import unicode_literals
 
 from io import BytesIO
 
-from django.core.cache import cache
 from django.conf import settings
 from django.db.models import Q
-from django.template import Context, Template
 from lxml import etree
 
 from wirecloud.catalogue.models import CatalogueResource
-from wirecloud.commons.utils.http import ERROR_FORMATTERS, get_absolute_static_url, get_current_domain
+from wirecloud.commons.utils.http import ERROR_FORMATTERS, get_absolute_static_url
 from wirecloud.commons.utils.template import UnsupportedFeature
 from wirecloud.commons.utils.wgt import WgtDeployer, WgtFile
+from wirecloud.platform.bundles import get_bundle_files, WIDGET_API_BUNDLE, WIDGET_STYLE_BUNDLE
 from wirecloud.platform.models import Widget, XHTML
 from wirecloud.platform.plugins import get_active_features, get_widget_api_extensions
+from wirecloud.platform.themes import get_active_theme_name, get_theme_registry
 
 
 wgt_deployer = WgtDeployer(settings.GADGETS_DEPLOYMENT_DIR)
@@ -111,55 +111,21 @@ def xpath(tree, query, xmlns):
         return tree.xpath(query, namespaces={'xhtml': xmlns})
 
 
-_widget_platform_style = {}
-
-
 def get_widget_platform_style(theme):
-    global _widget_platform_style
-
-    if theme not in _widget_platform_style or settings.DEBUG is True:
-        from wirecloud.platform.core.plugins import BASE_CSS, STYLED_ELEMENTS_CSS
-        code = '{% load compress %}{% load static from staticfiles %}{% compress css %}\n'
-
-        for cssfile in ('css/gadget.scss',) + BASE_CSS + STYLED_ELEMENTS_CSS:
-            css_type = 'text/x-scss' if cssfile.endswith('.scss') else 'text/css'
-            code += '    <link rel="stylesheet" href="{{% static "theme/{}/{}" %}}" context="widget" type="{}" />\n'.format(theme, cssfile, css_type)
 
-        code += '{% endcompress %}'
+    if theme not in get_theme_registry():
+        theme = get_active_theme_name()
 
-        result = Template(code).render(Context())
-        doc = etree.parse(BytesIO(('<files>' + result + '</files>').encode('utf-8')), etree.XMLParser())
-
-        files = [link.get('href') for link in doc.getroot()]
-        files.reverse()
-        _widget_platform_style[theme] = tuple(files)
-
-    return _widget_platform_style[theme]
+    files = list(get_bundle_files(WIDGET_STYLE_BUNDLE % theme))
+    files.reverse()
+    return tuple(files)
 
 
 def get_widget_api_files(request):
 
-    from wirecloud.platform.core.plugins import get_version_hash
-
-    key = 'widget_api_files/%s?v=%s' % (get_current_domain(request), get_version_hash())
-    widget_api_files = cache.get(key)
-
-    if widget_api_files is None or settings.DEBUG is True:
-        code = '''{% load compress %}{% load static from staticfiles %}{% compress js %}
-        <script type="text/javascript" src="{% static "js/WirecloudAPI/WirecloudAPIBootstrap.js" %}"></script>
-        <script type="text/javascript" src="{% static "js/WirecloudAPI/WirecloudWidgetAPI.js" %}"></script>
-        <script type="text/javascript" src="{% static "js/WirecloudAPI/WirecloudAPICommon.js" %}"></script>
-        {% endcompress %}'''
-
-        result = Template(code).render(Context())
-        doc = etree.parse(BytesIO(('<files>' + result + '</files>').encode('utf-8')), etree.XMLParser())
-
-        files = [script.get('src') for script in doc.getroot()]
-        files.reverse()
-        widget_api_files = tuple([get_absolute_static_url(file, request=request, versioned=True) for file in files])
-        cache.set(key, widget_api_files)
-
-    return list(widget_api_files)
+    files = [get_absolute_static_url(file, request=request, versioned=True) for file in get_bundle_files(WIDGET_API_BUNDLE)]
+    files.reverse()
+    return files
 
 
 def fix_widget_code(widget_code, content_type, request, encoding, use_platform_style, requirements, mode, theme):
@@ -26,14 +26,14 @@ from six.moves.urllib.request import url2pathname
 
 from django.core.cache import cache
 from django.core.urlresolvers import reverse
-from django.http import HttpResponse, Http404
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_GET
 from django.views.generic import TemplateView
 
 from wirecloud.catalogue.models import CatalogueResource
-from wirecloud.commons.utils.cache import patch_cache_headers
+from wirecloud.commons.utils.cache import build_precompressed_response, compress_payload, patch_cache_headers
 from wirecloud.commons.utils.downloader import download_local_file
 from wirecloud.commons.utils.http import build_response, build_downloadfile_response, get_current_domain
 from wirecloud.platform.themes import get_active_theme_name
@@ -58,7 +58,7 @@ def process_widget_code(request, resource):
         cache_key = resource.widget.xhtml.get_cache_key(get_current_domain(request), mode, theme)
         cache_entry = cache.get(cache_key)
         if cache_entry is not None:
-            response = HttpResponse(cache_entry['code'], content_type=cache_entry['content_type'])
+            response = build_precompressed_response(request, cache_entry['code'], cache_entry.get('encodings', {}), content_type=cache_entry['content_type'])
             patch_cache_headers(response, cache_entry['timestamp'], cache_entry['timeout'])
             return response
 
@@ -100,10 +100,13 @@ def process_widget_code(request, resource):
         msg = _('Error processing widget code')
         return build_response(request, 502, {'error_msg': msg, 'details': "%s" % e}, WIDGET_ERROR_FORMATTERS)
 
+    encodings = {}
     if xhtml.cacheable:
         cache_timeout = 31536000  # 1 year
+        encodings = compress_payload(code)
         cache_entry = {
             'code': code,
+            'encodings': encodings,
             'content_type': '%s; charset=%s' % (content_type, charset),
             'timestamp': xhtml.code_timestamp,
             'timeout': cache_timeout,
@@ -112,7 +115,7 @@ def process_widget_code(request, resource):
     else:
         cache_timeout = 0
 
-    response = HttpResponse(code, content_type='%s; charset=%s' % (content_type, charset))
+    response = build_precompressed_response(request, code, encodings, content_type='%s; charset=%s' % (content_type, charset))
     patch_cache_headers(response, xhtml.code_timestamp, cache_timeout)
     return response
 
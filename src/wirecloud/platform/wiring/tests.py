@@ -36,7 +36,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 
 from wirecloud.commons.utils.remote import FormModalTester
 from wirecloud.commons.utils.testcases import uses_extra_resources, uses_extra_workspace, WirecloudTestCase, WirecloudSeleniumTestCase, wirecloud_selenium_test_case
-from wirecloud.platform import plugins
+from wirecloud.platform import bundles, plugins
 from wirecloud.platform.models import CatalogueResource, IWidget, Workspace
 from wirecloud.platform.workspace.utils import encrypt_value
 
@@ -2111,7 +2111,8 @@ class OperatorCodeEntryTestCase(WirecloudTestCase, TestCase):
 
     @override_settings(COMPRESS_ENABLED=True)
     def test_operator_code_entry_get_compressed(self):
-        self.check_operator_code_entry_get()
+        with patch('wirecloud.platform.bundles._bundle_manifest', new=bundles.build_bundle_manifest()):
+            self.check_operator_code_entry_get()
 
 
 @wirecloud_selenium_test_case
@@ -29,6 +29,7 @@ import six
 from copy import deepcopy
 
 from wirecloud.catalogue.models import CatalogueResource
+from wirecloud.catalogue.utils import get_resources
 from wirecloud.commons.baseviews import Resource
 from wirecloud.commons.utils.cache import CacheableData
 from wirecloud.commons.utils.http import authentication_required, build_error_response, get_absolute_reverse_url, get_current_domain, consumes, parse_json_request
@@ -38,6 +39,16 @@ from wirecloud.platform.workspace.utils import encrypt_value, VariableValueCache
 from wirecloud.platform.wiring.utils import generate_xhtml_operator_code, get_operator_cache_key
 
 
+def get_operator_resources(wiring_status):
+    """
+    Returns the catalogue resources used by the operators of the given wiring
+    status, indexed by (vendor, name, version), using a single query.
+    """
+
+    operator_uris = (tuple(operator['name'].split('/')) for operator in six.itervalues(wiring_status['operators']))
+    return get_resources(uri for uri in operator_uris if len(uri) == 3)
+
+
 class WiringEntry(Resource):
 
     # Build multiuser structure with the new value, keeping the other users values
@@ -72,12 +83,16 @@ class WiringEntry(Resource):
         if not self.checkSameWiring(new_wiring_status, old_wiring_status):
             return build_error_response(request, 403, _('You are not allowed to update this workspace'))
 
+        operator_resources = get_operator_resources(new_wiring_status)
         for operator_id, operator in six.iteritems(new_wiring_status['operators']):
             old_operator = old_wiring_status['operators'][operator_id]
 
             vendor, name, version = operator["name"].split("/")
             try:
-                resource = CatalogueResource.objects.get(vendor=vendor, short_name=name, version=version).get_processed_info(process_variables=True)
+                if (vendor, name, version) not in operator_resources:
+                    raise CatalogueResource.DoesNotExist
+
+                resource = operator_resources[(vendor, name, version)].get_processed_info(process_variables=True)
                 operator_preferences = resource["variables"]["preferences"]
                 operator_properties = resource["variables"]["properties"]
             except CatalogueResource.DoesNotExist:
@@ -161,6 +176,7 @@ class WiringEntry(Resource):
                 return build_error_response(request, 403, _('You are not allowed to remove or update read only connections'))
 
         # Check operator preferences and properties
+        operator_resources = get_operator_resources(new_wiring_status)
         for operator_id, operator in six.iteritems(new_wiring_status['operators']):
             old_operator = None
             if operator_id in old_wiring_status['operators']:
@@ -183,7 +199,10 @@ class WiringEntry(Resource):
 
             try:
                 vendor, name, version = operator["name"].split("/")
-                resource = CatalogueResource.objects.get(vendor=vendor, short_name=name, version=version).get_processed_info(process_variables=True)
+                if (vendor, name, version) not in operator_resources:
+                    raise CatalogueResource.DoesNotExist
+
+                resource = operator_resources[(vendor, name, version)].get_processed_info(process_variables=True)
                 operator_preferences = resource["variables"]["preferences"]
                 operator_properties = resource["variables"]["properties"]
             except CatalogueResource.DoesNotExist:
@@ -387,11 +406,11 @@ class OperatorEntry(Resource):
 
             xhtml = generate_xhtml_operator_code(js_files, base_url, request, process_requirements(options['requirements']), mode)
             cache_timeout = 31536000  # 1 year
-            cached_response = CacheableData(xhtml, timeout=cache_timeout, content_type='application/xhtml+xml; charset=UTF-8')
+            cached_response = CacheableData(xhtml, timeout=cache_timeout, content_type='application/xhtml+xml; charset=UTF-8', precompress=True)
 
             cache.set(key, cached_response, cache_timeout)
 
-        return cached_response.get_response()
+        return cached_response.get_response(request=request)
 
 
 class OperatorVariablesEntry(Resource):
@@ -26,14 +26,27 @@ from django.db import models
 from django.db.models.signals import post_delete
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext as _
+import markdown
 
 from wirecloud.commons.fields import JSONField
+from wirecloud.commons.utils.html import clean_html
+from wirecloud.commons.utils.timing import timer
 
 
 def now_timestamp():
     return time.time() * 1000
 
 
+def render_longdescription(longdescription):
+    if longdescription == '':
+        return ''
+
+    with timer('markdown'):
+        longdescription = markdown.markdown(longdescription, output_format='xhtml5')
+
+    return clean_html(longdescription)
+
+
 @python_2_unicode_compatible
 class Workspace(models.Model):
 
@@ -51,10 +64,12 @@ class Workspace(models.Model):
     groups = models.ManyToManyField(Group, verbose_name=_('Groups'), blank=True)
     description = models.TextField(_('Description'), max_length=140, blank=True)
     longdescription = models.TextField(_('Long description'), blank=True)
+    longdescription_html = models.TextField(_('Rendered long description'), blank=True, editable=False)
     forcedValues = JSONField(blank=True)
     wiringStatus = JSONField(blank=True)
 
     __original_public = False
+    __original_longdescription = None
 
     class Meta:
         app_label = 'platform'
@@ -64,6 +79,7 @@ class Workspace(models.Model):
     def __init__(self, *args, **kwargs):
         super(Workspace, self).__init__(*args, **kwargs)
         self.__original_public = self.public
+        self.__original_longdescription = self.longdescription
 
     def __str__(self):
         return "%s/%s" % (self.creator.username, self.name)
@@ -75,6 +91,12 @@ class Workspace(models.Model):
             update_workspace_preferences(self, {'public': {'value': self.public}}, invalidate_cache=False)
             self.__original_public = self.public
 
+        if self.longdescription != self.__original_longdescription or (self.longdescription != '' and self.longdescription_html == ''):
+            self.longdescription_html = render_longdescription(self.longdescription)
+            self.__original_longdescription = self.longdescription
+            if 'update_fields' in kwargs and 'longdescription_html' not in kwargs['update_fields']:
+                kwargs['update_fields'] = tuple(kwargs['update_fields']) + ('longdescription_html',)
+
         self.last_modified = int(time.time() * 1000)
         if 'update_fields' in kwargs and 'last_modified' not in kwargs['update_fields']:
             kwargs['update_fields'] = tuple(kwargs['update_fields']) + ('last_modified',)
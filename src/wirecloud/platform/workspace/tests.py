@@ -28,7 +28,7 @@ import json
 from django.contrib.auth.models import AnonymousUser, User
 from django.db.migrations.exceptions import IrreversibleError
 from django.test import TransactionTestCase
-from mock import Mock, create_autospec
+from mock import Mock, create_autospec, patch
 import six
 from unittest import TestCase
 
@@ -39,9 +39,10 @@ from wirecloud.platform.models import IWidget, Tab, UserWorkspace, Workspace
 from wirecloud.platform.preferences.views import update_workspace_preferences
 from wirecloud.platform.workspace.mashupTemplateGenerator import build_json_template_from_workspace, build_xml_template_from_workspace, build_rdf_template_from_workspace
 from wirecloud.platform.workspace.mashupTemplateParser import buildWorkspaceFromTemplate, fillWorkspaceUsingTemplate
-from wirecloud.platform.workspace.utils import get_global_workspace_data, encrypt_value
+from wirecloud.platform.workspace import utils as workspace_utils
+from wirecloud.platform.workspace.utils import decrypt_value, get_global_workspace_data, encrypt_value, is_secure_value_empty, VariableValueCacheManager
 from wirecloud.platform.workspace.views import createEmptyWorkspace
-from wirecloud.platform.migration_utils import multiuser_variables_structure_forwards, multiuser_variables_structure_backwards
+from wirecloud.platform.migration_utils import multiuser_variables_structure_forwards, multiuser_variables_structure_backwards, secure_variable_metadata_backwards, secure_variable_metadata_forwards
 
 
 # Avoid nose to repeat these tests (they are run through wirecloud/tests/__init__.py)
@@ -174,6 +175,87 @@ class WorkspaceMigrationsTestCase(TestCase):
             }
         )
 
+    def _secure_variable_metadata_mocks(self, iwidget_value, operator_value):
+
+        resource = Mock(json_description={
+            "preferences": [{"name": "password", "secure": True}, {"name": "username"}],
+            "properties": [],
+        })
+        iwidget = Mock(variables={"password": {"users": {"2": iwidget_value}}, "username": {"users": {"2": "admin"}}})
+        iwidget.widget.resource = resource
+        workspace = Mock(wiringStatus={"operators": {
+            "1": {"name": "Wirecloud/TestOperatorSecure/1.0", "preferences": {"password": {"value": {"users": {"2": operator_value}}}}},
+        }})
+
+        apps_mock = Mock()
+        apps_mock.get_model("platform", "iwidget").objects.select_related('widget__resource').all.return_value = [iwidget]
+        apps_mock.get_model("platform", "workspace").objects.all.return_value = [workspace]
+        apps_mock.get_model("catalogue", "CatalogueResource").objects.get.return_value = resource
+
+        return apps_mock, iwidget, workspace
+
+    def test_secure_variable_metadata_forward(self):
+
+        legacy_value = encrypt_value("test_password").split(':', 1)[1]
+        apps_mock, iwidget, workspace = self._secure_variable_metadata_mocks(legacy_value, legacy_value)
+
+        secure_variable_metadata_forwards(apps_mock, None)
+
+        iwidget.save.assert_called_with()
+        workspace.save.assert_called_with()
+        self.assertEqual(iwidget.variables, {"password": {"users": {"2": encrypt_value("test_password")}}, "username": {"users": {"2": "admin"}}})
+        self.assertEqual(workspace.wiringStatus["operators"]["1"]["preferences"]["password"]["value"], {"users": {"2": encrypt_value("test_password")}})
+
+    def test_secure_variable_metadata_backward(self):
+
+        value = encrypt_value("test_password")
+        apps_mock, iwidget, workspace = self._secure_variable_metadata_mocks(value, value)
+
+        secure_variable_metadata_backwards(apps_mock, None)
+
+        legacy_value = value.split(':', 1)[1]
+        self.assertEqual(iwidget.variables["password"], {"users": {"2": legacy_value}})
+        self.assertEqual(workspace.wiringStatus["operators"]["1"]["preferences"]["password"]["value"], {"users": {"2": legacy_value}})
+        self.assertEqual(decrypt_value(legacy_value), "test_password")
+
+
+class SecureValuesTestCase(TestCase):
+
+    tags = ('wirecloud-workspace', 'wirecloud-noselenium')
+
+    def test_encrypt_value(self):
+
+        value = encrypt_value("test_password")
+        self.assertTrue(value.startswith("13:"))
+        self.assertEqual(decrypt_value(value), "test_password")
+
+    def test_is_secure_value_empty_does_not_decrypt(self):
+
+        empty_value = encrypt_value("")
+        value = encrypt_value("test_password")
+
+        with patch('wirecloud.platform.workspace.utils.decrypt_value') as decrypt_mock:
+            self.assertTrue(is_secure_value_empty(empty_value))
+            self.assertFalse(is_secure_value_empty(value))
+            self.assertTrue(is_secure_value_empty(None))
+
+        self.assertFalse(decrypt_mock.called)
+
+    def test_get_variable_data_secure_values(self):
+
+        cache_manager = VariableValueCacheManager(Mock(), Mock())
+        entry = {'secure': True, 'readonly': False, 'hidden': True, 'value': encrypt_value("")}
+
+        with patch.object(cache_manager, '_get_entry', return_value=entry):
+            self.assertEqual(cache_manager.get_variable_data("iwidget", "1", "password")['value'], "")
+            entry['value'] = encrypt_value("test_password")
+            self.assertEqual(cache_manager.get_variable_data("iwidget", "1", "password")['value'], "********")
+
+    def test_is_secure_value_empty_legacy_values(self):
+
+        self.assertTrue(is_secure_value_empty(encrypt_value("").split(':', 1)[1]))
+        self.assertFalse(is_secure_value_empty(encrypt_value("test_password").split(':', 1)[1]))
+
 
 def check_secure_preferences(self, workspace, user):
     workspace.wiringStatus = {
@@ -241,6 +323,40 @@ class WorkspaceTestCase(WirecloudTestCase, TransactionTestCase):
         properties = tab['iwidgets'][0]['properties']
         self.assertEqual(properties['prop']['value'], 'test_data')
 
+    def test_sync_base_workspaces_without_managers(self):
+
+        with patch('wirecloud.platform.workspace.utils.UserWorkspace') as user_workspace_mock:
+            self.assertFalse(workspace_utils.sync_base_workspaces(self.user))
+
+        self.assertFalse(user_workspace_mock.objects.filter.called)
+
+    def test_sync_base_workspaces_once_per_version(self):
+
+        manager = Mock()
+        manager.get_id.return_value = 'test_manager'
+        manager.get_base_workspaces_version.return_value = 1
+        manager.update_base_workspaces.return_value = ((), ())
+
+        with patch('wirecloud.platform.workspace.utils.get_workspace_managers', return_value=(manager,)):
+            workspace_utils.sync_base_workspaces(self.user)
+            workspace_utils.sync_base_workspaces(self.user)
+            self.assertEqual(manager.update_base_workspaces.call_count, 1)
+
+            manager.get_base_workspaces_version.return_value = 2
+            workspace_utils.sync_base_workspaces(self.user)
+            self.assertEqual(manager.update_base_workspaces.call_count, 2)
+
+            workspace_utils.sync_base_workspaces(self.user, force=True)
+            self.assertEqual(manager.update_base_workspaces.call_count, 3)
+
+    def test_get_workspace_list_deferred_sync(self):
+
+        with self.settings(WIRECLOUD_DEFER_BASE_WORKSPACES_SYNC=True):
+            with patch('wirecloud.platform.workspace.utils.sync_base_workspaces') as sync_mock:
+                workspace_utils.get_workspace_list(self.user)
+
+        self.assertFalse(sync_mock.called)
+
     def test_get_global_workspace_data_harvest_operator_properties(self):
         workspace = Workspace.objects.get(id=1)
         workspace.wiringStatus = {
@@ -382,6 +498,44 @@ class WorkspaceCacheTestCase(WirecloudTestCase, TransactionTestCase):
         iwidget_list = data['tabs'][0]['iwidgets']
         self.assertEqual(len(iwidget_list), 1)
 
+    def test_workspace_base_data_is_shared_between_users(self):
+
+        other_user = User.objects.get(username='test2')
+
+        with patch('wirecloud.platform.workspace.utils._get_workspace_base_data', wraps=workspace_utils._get_workspace_base_data) as base_data_mock:
+            data = json.loads(get_global_workspace_data(self.workspace, other_user).get_data())
+
+        self.assertEqual(base_data_mock.call_count, 0)
+        self.assertFalse(data['removable'])
+        initial_data = json.loads(self.initial_info.get_data())
+        self.assertTrue(initial_data['removable'])
+        self.assertEqual(data['tabs'], initial_data['tabs'])
+
+    def test_variable_values_are_cached_per_component(self):
+
+        iwidget = self.workspace.tab_set.get(pk=1).iwidget_set.get(pk=1)
+        iwidget.set_variable_value('username', 'new_username', self.user)
+        iwidget.save()
+
+        with patch('wirecloud.platform.workspace.utils._populate_iwidget_variables', wraps=workspace_utils._populate_iwidget_variables) as populate_mock:
+            cache_manager = VariableValueCacheManager(self.workspace, self.user)
+            self.assertEqual(cache_manager.get_variable_data("iwidget", 1, 'username')['value'], 'new_username')
+            self.assertEqual(cache_manager.get_variable_data("iwidget", 2, 'username')['value'], 'test_username')
+
+        # Only the modified iwidget should be processed again
+        self.assertEqual(populate_mock.call_count, 1)
+        self.assertEqual(populate_mock.call_args[0][0].id, 1)
+
+    def test_variable_values_are_shared_between_users(self):
+
+        other_user = User.objects.get(username='test2')
+
+        with patch('wirecloud.platform.workspace.utils._populate_iwidget_variables', wraps=workspace_utils._populate_iwidget_variables) as populate_mock:
+            cache_manager = VariableValueCacheManager(self.workspace, other_user)
+            self.assertEqual(cache_manager.get_variable_data("iwidget", 1, 'username')['value'], 'test_username')
+
+        self.assertEqual(populate_mock.call_count, 0)
+
 
 class ParameterizedWorkspaceGenerationTestCase(WirecloudTestCase, TransactionTestCase):
 
@@ -20,36 +20,42 @@
 from __future__ import unicode_literals
 
 import base64
+import hashlib
 from io import BytesIO
 from copy import deepcopy
+from functools import partial
 from Crypto.Cipher import AES
 import json
 import os
 import re
+import time
+from uuid import uuid4
 
 from django.conf import settings
 from django.core.cache import cache
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.shortcuts import get_object_or_404
+from django.utils import translation
 from django.utils.translation import ugettext as _
-import markdown
 import six
 
 from wirecloud.catalogue import utils as catalogue
 from wirecloud.catalogue.models import CatalogueResource
-from wirecloud.commons.utils.cache import CacheableData
+from wirecloud.commons.utils.cache import CacheableData, get_or_rebuild, get_version_etag
 from wirecloud.commons.utils.db import save_alternative
 from wirecloud.commons.utils.downloader import download_http_content
 from wirecloud.commons.utils.encoding import LazyEncoder
-from wirecloud.commons.utils.html import clean_html
 from wirecloud.commons.utils.template.parsers import TemplateParser
+from wirecloud.commons.utils.timing import timed, timer
 from wirecloud.commons.utils.urlify import URLify
 from wirecloud.commons.utils.wgt import WgtFile
 from wirecloud.platform.context.utils import get_context_values
 from wirecloud.platform.iwidget.utils import parse_value_from_text
 from wirecloud.platform.localcatalogue.utils import install_resource_to_user
+from wirecloud.platform.themes import get_active_theme_name
 from wirecloud.platform.preferences.views import get_workspace_preference_values, get_tab_preference_values, update_workspace_preferences
 from wirecloud.platform.models import IWidget, Tab, UserWorkspace, Workspace
+from wirecloud.platform.workspace.models import render_longdescription
 from wirecloud.platform.workspace.managers import get_workspace_managers
 
 
@@ -94,26 +100,110 @@ def setVisibleTab(user, workspace_id, tab):
     tab.save()
 
 
+_cipher = None
+
+
+def _get_cipher():
+    # AES objects are only created when the secret key changes, the ECB mode
+    # used by these objects does not keep state between calls
+    global _cipher
+
+    key = settings.SECRET_KEY[:32]
+    if _cipher is None or _cipher[0] != key:
+        _cipher = (key, AES.new(key))
+
+    return _cipher[1]
+
+
+def _split_secure_value(value):
+    # Secure values are stored as "<plain value length>:<encrypted value>".
+    # Values stored by previous versions don't include the length
+    if not isinstance(value, six.string_types):
+        return None, value
+
+    length, sep, data = value.partition(':')
+    if sep == '' or not length.isdigit():
+        return None, value
+
+    return int(length), data
+
+
 def encrypt_value(value):
-    cipher = AES.new(settings.SECRET_KEY[:32])
+    cipher = _get_cipher()
     json_value = json.dumps(value, ensure_ascii=False).encode('utf8')
     padded_value = json_value + (cipher.block_size - len(json_value) % cipher.block_size) * b' '
-    return base64.b64encode(cipher.encrypt(padded_value)).decode('utf-8')
+    length = len(value) if isinstance(value, six.string_types) else len(json_value)
+    return '%d:%s' % (length, base64.b64encode(cipher.encrypt(padded_value)).decode('utf-8'))
+
+
+def _decrypt_value(value):
+    length, value = _split_secure_value(value)
+    value = _get_cipher().decrypt(base64.b64decode(value))
+    return json.loads(value.decode('utf8'))
 
 
 def decrypt_value(value):
-    cipher = AES.new(settings.SECRET_KEY[:32])
     try:
-        value = cipher.decrypt(base64.b64decode(value))
-        return json.loads(value.decode('utf8'))
+        return _decrypt_value(value)
     except:
         return ''
 
 
-def sync_base_workspaces(user):
+def get_secure_value_length(value):
+    """
+    Returns the length of the plain value of a secure value. The value is
+    only decrypted if it was stored without length information.
+    """
+
+    if value is None or value == '':
+        return 0
+
+    length, data = _split_secure_value(value)
+    if length is None:
+        try:
+            value = _decrypt_value(value)
+        except:
+            # Values that cannot be decrypted are not empty
+            return len(data) if isinstance(data, six.string_types) else 1
+
+        length = len(value) if isinstance(value, six.string_types) else len(json.dumps(value))
+
+    return length
+
+
+def is_secure_value_empty(value):
+    return get_secure_value_length(value) == 0
+
+
+def _get_base_workspaces_versions(managers, user):
+    # Workspace managers can provide a version stamp for the base workspaces
+    # of a user (e.g. the last modification date of their base templates).
+    # Managers not providing it are synchronised at most once per interval
+    interval = getattr(settings, 'WIRECLOUD_BASE_WORKSPACES_SYNC_INTERVAL', 300)
+    versions = {}
+    for manager in managers:
+        get_version = getattr(manager, 'get_base_workspaces_version', None)
+        if get_version is not None:
+            versions[manager.get_id()] = get_version(user)
+        else:
+            versions[manager.get_id()] = 'interval:%d' % (time.time() // interval)
+
+    return versions
+
+
+def sync_base_workspaces(user, force=False):
 
     reload_showcase = False
     managers = get_workspace_managers()
+    if len(managers) == 0:
+        return reload_showcase
+
+    cache_key = '_base_workspaces_sync/%s' % user.id
+    versions = _get_base_workspaces_versions(managers, user)
+    synced_versions = {} if force else (cache.get(cache_key) or {})
+    managers = [manager for manager in managers if synced_versions.get(manager.get_id()) != versions[manager.get_id()]]
+    if len(managers) == 0:
+        return reload_showcase
 
     workspaces_by_manager = {}
     workspaces_by_ref = {}
@@ -121,11 +211,10 @@ def sync_base_workspaces(user):
         workspaces_by_manager[manager.get_id()] = []
         workspaces_by_ref[manager.get_id()] = {}
 
-    workspaces = UserWorkspace.objects.filter(user=user)
+    workspaces = UserWorkspace.objects.filter(user=user, manager__in=list(workspaces_by_manager.keys()))
     for workspace in workspaces:
-        if workspace.manager != '':
-            workspaces_by_manager[workspace.manager].append(workspace.reason_ref)
-            workspaces_by_ref[workspace.manager][workspace.reason_ref] = workspace
+        workspaces_by_manager[workspace.manager].append(workspace.reason_ref)
+        workspaces_by_ref[workspace.manager][workspace.reason_ref] = workspace
 
     for manager in managers:
         current_workspaces = workspaces_by_manager[manager.get_id()]
@@ -154,6 +243,9 @@ def sync_base_workspaces(user):
             user_workspace.save()
             reload_showcase = True
 
+    synced_versions.update(versions)
+    cache.set(cache_key, synced_versions)
+
     return reload_showcase
 
 
@@ -162,7 +254,10 @@ def get_workspace_list(user):
     if not user.is_authenticated():
         return Workspace.objects.filter(public=True, searchable=True)
 
-    sync_base_workspaces(user)
+    # Base workspaces can be synchronised in a background pass (see the
+    # syncbaseworkspaces command) instead of on every request
+    if not getattr(settings, 'WIRECLOUD_DEFER_BASE_WORKSPACES_SYNC', False):
+        sync_base_workspaces(user)
 
     # Now we can fetch all the workspaces for the user
     workspaces = Workspace.objects.filter(Q(public=True, searchable=True) | Q(users__id=user.id))
@@ -170,14 +265,14 @@ def get_workspace_list(user):
     return workspaces
 
 
-def _process_variable(component_type, component_id, vardef, value, forced_values, values_by_varname, current_user, workspace_creator):
+def _process_variable(vardef, value, forced_values, workspace_creator):
     varname = vardef['name']
     entry = {
         'type': vardef['type'],
         'secure': vardef['secure'],
     }
-    if component_id in forced_values[component_type] and varname in forced_values[component_type][component_id]:
-        fv_entry = forced_values[component_type][component_id][varname]
+    if varname in forced_values:
+        fv_entry = forced_values[varname]
 
         entry['value'] = fv_entry['value']
         if vardef['secure']:
@@ -188,80 +283,137 @@ def _process_variable(component_type, component_id, vardef, value, forced_values
         entry['readonly'] = True
         entry['hidden'] = fv_entry.get('hidden', False)
 
+    elif vardef.get("multiuser", False):
+        # Multiuser variables are resolved lazily for each user (see
+        # _materialize_variable), store the default value and the values
+        # of all the users so this entry can be shared
+        entry['value'] = parse_value_from_text(entry, vardef['default'])
+        entry['users'] = value["users"] if value is not None else {}
+        entry['readonly'] = False
+        entry['hidden'] = False
+
     else:
-        # Handle multiuser variables
-        variable_user = current_user if vardef.get("multiuser", False) else workspace_creator
-        if value is None or value["users"].get("%s" % variable_user.id, None) is None:
+        if value is None or value["users"].get("%s" % workspace_creator.id, None) is None:
             value = parse_value_from_text(entry, vardef['default'])
         else:
-            value = value["users"].get("%s" % variable_user.id, None)
+            value = value["users"].get("%s" % workspace_creator.id, None)
 
         entry['value'] = value
         entry['readonly'] = False
         entry['hidden'] = False
 
-    values_by_varname[component_type][component_id][varname] = entry
+    return entry
+
+
+def _materialize_variable(entry, user):
 
+    if 'users' not in entry:
+        return entry
 
-def _populate_variables_values_cache(workspace, user, key, forced_values=None):
-    """ populates VariableValue cached values for that user """
-    values_by_varname = {
-        "ioperator": {},
-        "iwidget": {},
+    value = entry['users'].get("%s" % user.id, None)
+    return {
+        'type': entry['type'],
+        'secure': entry['secure'],
+        'readonly': entry['readonly'],
+        'hidden': entry['hidden'],
+        'value': entry['value'] if value is None else value,
     }
-    if forced_values is None:
-        context_values = get_context_values(workspace, user)
-        preferences = get_workspace_preference_values(workspace)
-        forced_values = process_forced_values(workspace, user, context_values, preferences)
 
-    for iwidget in IWidget.objects.filter(tab__workspace=workspace):
-        # forced_values uses string keys
-        svariwidget = "%s" % iwidget.id
-        values_by_varname["iwidget"][svariwidget] = {}
 
-        if iwidget.widget is None:
-            continue
+def _populate_iwidget_variables(iwidget, forced_values, workspace_creator):
+    values = {}
 
-        iwidget_info = iwidget.widget.resource.get_processed_info()
+    if iwidget.widget is None:
+        return values
 
-        for vardef in iwidget_info.get('preferences', {}):
-            value = iwidget.variables.get(vardef['name'], None)
-            _process_variable("iwidget", svariwidget, vardef, value, forced_values, values_by_varname, user, workspace.creator)
+    iwidget_info = iwidget.widget.resource.get_processed_info()
 
-        for vardef in iwidget_info.get('properties', {}):
-            value = iwidget.variables.get(vardef['name'], None)
-            _process_variable("iwidget", svariwidget, vardef, value, forced_values, values_by_varname, user, workspace.creator)
+    for vardef in iwidget_info.get('preferences', {}):
+        value = iwidget.variables.get(vardef['name'], None)
+        values[vardef['name']] = _process_variable(vardef, value, forced_values, workspace_creator)
 
-    for operator_id, operator in six.iteritems(workspace.wiringStatus.get('operators', {})):
+    for vardef in iwidget_info.get('properties', {}):
+        value = iwidget.variables.get(vardef['name'], None)
+        values[vardef['name']] = _process_variable(vardef, value, forced_values, workspace_creator)
+
+    return values
+
+
+def _populate_operator_variables(operator, forced_values, workspace_creator):
+    values = {}
+
+    vendor, name, version = operator['name'].split('/')
+    try:
+        operator_info = CatalogueResource.objects.get(vendor=vendor, short_name=name, version=version).get_processed_info()
+    except CatalogueResource.DoesNotExist:
+        return values
+
+    for vardef in operator_info.get('preferences', {}):
+        value = operator.get("preferences", {}).get(vardef['name'], {}).get("value")
+        values[vardef['name']] = _process_variable(vardef, value, forced_values, workspace_creator)
+
+    for vardef in operator_info.get('properties', {}):
+        value = operator.get("properties", {}).get(vardef['name'], {}).get("value")
+        values[vardef['name']] = _process_variable(vardef, value, forced_values, workspace_creator)
+
+    return values
+
+
+def _get_forced_values(workspace, user):
+    normalize_forced_values(workspace)
+
+    if len(workspace.forcedValues['iwidget']) == 0 and len(workspace.forcedValues['ioperator']) == 0:
+        # There are no forced values to process, so there is no need to
+        # compute the context
+        return process_forced_values(workspace, user, {}, {})
+
+    context_values = get_context_values(workspace, user)
+    preferences = get_workspace_preference_values(workspace)
+    return process_forced_values(workspace, user, context_values, preferences)
+
+
+def _component_version(*parts):
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, cls=LazyEncoder).encode('utf8')).hexdigest()
+
+
+def _component_variables_cache_key(component_type, workspace, component_id, version):
+    return '_variables_values_cache/%s/%s/%s/%s' % (component_type, workspace.id, component_id, version)
 
-        values_by_varname["ioperator"][operator_id] = {}
-        vendor, name, version = operator['name'].split('/')
-        try:
-            operator_info = CatalogueResource.objects.get(vendor=vendor, short_name=name, version=version).get_processed_info()
-        except CatalogueResource.DoesNotExist:
-            continue
-        for vardef in operator_info.get('preferences', {}):
-            value = operator.get("preferences", {}).get(vardef['name'], {}).get("value")
-            _process_variable("ioperator", operator_id, vardef, value, forced_values, values_by_varname, user, workspace.creator)
 
-        for vardef in operator_info.get('properties', {}):
-            value = operator.get("properties", {}).get(vardef['name'], {}).get("value")
-            _process_variable("ioperator", operator_id, vardef, value, forced_values, values_by_varname, user, workspace.creator)
+def _workspace_cache_key(workspace, lang):
+    return '_workspace_global_data/%s/%s/%s' % (workspace.id, workspace.last_modified, lang)
 
-    cache.set(key, values_by_varname)
 
-    return values_by_varname
+def _workspace_stale_cache_key(workspace, lang):
+    return '_workspace_global_data/%s/latest/%s' % (workspace.id, lang)
 
 
-def _variable_values_cache_key(workspace, user):
-    return '_variables_values_cache/%s/%s/%s' % (workspace.id, workspace.last_modified, user.id)
+def _workspace_etag(workspace_id, last_modified, user, resource):
+    return get_version_etag(workspace_id, last_modified, user.id, translation.get_language(), get_active_theme_name(), resource)
 
 
-def _workspace_cache_key(workspace, user):
-    return '_workspace_global_data/%s/%s/%s' % (workspace.id, workspace.last_modified, user.id)
+def get_workspace_etag(workspace, user, resource='workspace'):
+    """
+    Returns the ETag of a resource of the workspace (the workspace itself, a
+    tab, ...) as seen by the given user. This ETag can be computed using only
+    the version of the workspace, so conditional requests can be processed
+    without loading any other data.
+    """
+
+    return _workspace_etag(workspace.id, workspace.last_modified, user, resource)
 
 
 class VariableValueCacheManager():
+    """
+    Provides the values of the variables of the components (iwidgets and
+    operators) of a workspace.
+
+    Resolved values are cached per component, using a version computed from
+    the component definition, its stored values and the forced values
+    affecting it. This way, only the components whose definition or values
+    have changed are processed again. Multiuser values are shared by all the
+    users and materialized on demand for the current user.
+    """
 
     workspace = None
     user = None
@@ -281,28 +433,73 @@ class VariableValueCacheManager():
         else:
             return entry['value']
 
+    def _load_component_values(self):
+        workspace = self.workspace
+        if self.forced_values is None:
+            self.forced_values = _get_forced_values(workspace, self.user)
+
+        lang = translation.get_language()
+        components = {}
+
+        for iwidget in IWidget.objects.filter(tab__workspace=workspace).select_related('widget__resource'):
+            # forced_values uses string keys
+            svariwidget = "%s" % iwidget.id
+            iwidget_forced_values = self.forced_values['iwidget'].get(svariwidget, {})
+            resource_id = iwidget.widget.resource_id if iwidget.widget is not None else None
+            version = _component_version(lang, workspace.creator_id, resource_id, iwidget.variables, iwidget_forced_values)
+            key = _component_variables_cache_key("iwidget", workspace, svariwidget, version)
+            components[key] = ("iwidget", svariwidget, _populate_iwidget_variables, iwidget, iwidget_forced_values)
+
+        for operator_id, operator in six.iteritems(workspace.wiringStatus.get('operators', {})):
+            operator_forced_values = self.forced_values['ioperator'].get(operator_id, {})
+            version = _component_version(lang, workspace.creator_id, operator['name'], operator.get('preferences', {}), operator.get('properties', {}), operator_forced_values)
+            key = _component_variables_cache_key("ioperator", workspace, operator_id, version)
+            components[key] = ("ioperator", operator_id, _populate_operator_variables, operator, operator_forced_values)
+
+        values = {
+            "ioperator": {},
+            "iwidget": {},
+        }
+        cached_values = cache.get_many(components.keys())
+        for key, (component_type, component_id, populate, component, forced_values) in six.iteritems(components):
+            component_values = cached_values.get(key)
+            if component_values is None:
+                component_values = get_or_rebuild(key, partial(populate, component, forced_values, workspace.creator))
+
+            values[component_type][component_id] = component_values
+
+        return values
+
+    def _get_entry(self, component_type, component_id, var_name):
+        if self.values is None:
+            self.values = self._load_component_values()
+
+        entry = self.values[component_type]["%s" % component_id][var_name]
+        return _materialize_variable(entry, self.user)
+
     def get_variable_values(self):
         if self.values is None:
-            key = _variable_values_cache_key(self.workspace, self.user)
-            self.values = cache.get(key)
-            if self.values is None:
-                self.values = _populate_variables_values_cache(self.workspace, self.user, key, self.forced_values)
+            self.values = self._load_component_values()
 
-        return self.values
+        return {
+            component_type: {
+                component_id: {
+                    var_name: _materialize_variable(entry, self.user) for var_name, entry in six.iteritems(component_values)
+                } for component_id, component_values in six.iteritems(components)
+            } for component_type, components in six.iteritems(self.values)
+        }
 
     def get_variable_value_from_varname(self, component_type, component_id, var_name):
-        values = self.get_variable_values()
-        entry = values[component_type]["%s" % component_id][var_name]
+        entry = self._get_entry(component_type, component_id, var_name)
         return self._process_entry(entry)
 
     # Get variable data
     def get_variable_data(self, component_type, component_id, var_name):
-        values = self.get_variable_values()
-        entry = values[component_type]["%s" % component_id][var_name]
+        entry = self._get_entry(component_type, component_id, var_name)
 
         # If secure and has value, censor it
-        if entry['secure'] and entry["value"] != "":
-            value = "********"
+        if entry['secure']:
+            value = "" if is_secure_value_empty(entry["value"]) else "********"
         else:
             value = entry["value"]
 
@@ -315,7 +512,7 @@ class VariableValueCacheManager():
         }
 
 
-def get_workspace_data(workspace, user):
+def _is_workspace_removable(workspace, user):
 
     user_workspace = None
 
@@ -325,9 +522,16 @@ def get_workspace_data(workspace, user):
         except UserWorkspace.DoesNotExist:
             pass
 
-    longdescription = workspace.longdescription
-    if longdescription != '':
-        longdescription = clean_html(markdown.markdown(longdescription, output_format='xhtml5'))
+    return workspace.creator == user and (user_workspace is None or user_workspace.manager == '')
+
+
+def get_workspace_data(workspace, user, removable=None, shared=None):
+
+    if workspace.longdescription != '':
+        longdescription = workspace.longdescription_html
+        if longdescription == '':
+            # Not rendered yet
+            longdescription = render_longdescription(workspace.longdescription)
     else:
         longdescription = workspace.description
 
@@ -336,15 +540,78 @@ def get_workspace_data(workspace, user):
         'name': workspace.name,
         'title': workspace.title,
         'public': workspace.public,
-        'shared': workspace.is_shared(),
+        'shared': workspace.is_shared() if shared is None else shared,
         'owner': workspace.creator.username,
-        'removable': workspace.creator == user and (user_workspace is None or user_workspace.manager == ''),
+        'removable': _is_workspace_removable(workspace, user) if removable is None else removable,
         'lastmodified': workspace.last_modified,
         'description': workspace.description,
         'longdescription': longdescription,
     }
 
 
+def filter_workspace_list(workspaces, owner=None, shared=None, public=None, search=None):
+    """
+    Applies the given filters over a list of workspaces (as returned by
+    ``get_workspace_list``). The returned queryset is sorted by id and
+    annotated with the info required by ``iter_workspace_list_data``.
+    """
+
+    workspaces = Workspace.objects.filter(id__in=workspaces.values('id')).select_related('creator').annotate(
+        users_count=Count('users', distinct=True),
+        groups_count=Count('groups', distinct=True),
+    ).order_by('id')
+
+    if owner is not None:
+        workspaces = workspaces.filter(creator__username=owner)
+
+    if public is not None:
+        workspaces = workspaces.filter(public=public)
+
+    if shared is not None:
+        shared_q = Q(public=True) | Q(users_count__gt=1) | Q(groups_count__gt=1)
+        workspaces = workspaces.filter(shared_q) if shared else workspaces.exclude(shared_q)
+
+    if search is not None:
+        workspaces = workspaces.filter(Q(name__icontains=search) | Q(title__icontains=search) | Q(description__icontains=search))
+
+    return workspaces
+
+
+def get_workspace_list_versions(workspaces, limit=None):
+    """
+    Returns the info identifying the current version of each of the
+    workspaces of a list (as returned by ``filter_workspace_list``) as a list
+    of tuples, the first item of each tuple being the id of the workspace.
+    """
+
+    versions = workspaces.values_list('id', 'last_modified', 'users_count', 'groups_count')
+    if limit is not None:
+        versions = versions[:limit]
+
+    return list(versions)
+
+
+def iter_workspace_list_data(workspaces, user, fields=None):
+    """
+    Yields the data of each of the workspaces of a list (as returned by
+    ``filter_workspace_list``) using the format of ``get_workspace_data``, but
+    using a fixed number of queries. ``fields`` can be used to limit the
+    returned attributes.
+    """
+
+    managers = {}
+    if user.is_authenticated():
+        managers = dict(UserWorkspace.objects.filter(user=user).values_list('workspace_id', 'manager'))
+
+    for workspace in workspaces:
+        removable = workspace.creator_id == user.id and managers.get(workspace.id, '') == ''
+        shared = workspace.public or workspace.users_count > 1 or workspace.groups_count > 1
+        data = get_workspace_data(workspace, user, removable=removable, shared=shared)
+        if fields is not None:
+            data = {key: value for key, value in six.iteritems(data) if key in fields}
+        yield data
+
+
 class TemplateValueProcessor:
 
     _RE = re.compile(r'(%+)\(([a-zA-Z][\w-]*(?:\.[a-zA-Z\][\w-]*)*)\)')
@@ -427,8 +694,28 @@ def process_forced_values(workspace, user, concept_values, preferences):
     return forced_values
 
 
-def _get_global_workspace_data(workspaceDAO, user):
+def _get_workspace_base_data(workspaceDAO, user):
+    """
+    Builds the data of the workspace that is shared by all the users. User
+    dependent data (variable values and the removable flag) is replaced by
+    placeholders, see _get_workspace_user_data for more info.
+    """
+
+    token = uuid4().hex
+
+    def placeholder(path):
+        return '$$%s:%s$$' % (token, path)
+
+    base = {
+        'version': workspaceDAO.last_modified,
+        'timestamp': workspaceDAO.last_modified if workspaceDAO.last_modified is not None else time.time() * 1000,
+        'token': token,
+        'iwidgets': {},
+        'operators': {},
+    }
+
     data_ret = get_workspace_data(workspaceDAO, user)
+    data_ret['removable'] = placeholder('removable')
 
     # Workspace preferences
     preferences = get_workspace_preference_values(workspaceDAO)
@@ -449,111 +736,191 @@ def _get_global_workspace_data(workspaceDAO, user):
             "accesslevel": "owner" if workspaceDAO.creator == u else "read",
         })
 
-    # Process forced variable values
-    concept_values = get_context_values(workspaceDAO, user)
-    forced_values = process_forced_values(workspaceDAO, user, concept_values, preferences)
+    # Empty params only depend on the workspace preferences
+    forced_values = _get_forced_values(workspaceDAO, user)
     data_ret['empty_params'] = forced_values['empty_params']
     data_ret['extra_prefs'] = forced_values['extra_prefs']
     if len(forced_values['empty_params']) > 0:
-        return json.dumps(data_ret, cls=LazyEncoder)
-
-    cache_manager = VariableValueCacheManager(workspaceDAO, user, forced_values)
+        with timer('json'):
+            base['data'] = json.dumps(data_ret, cls=LazyEncoder)
+        return base
 
     # Tabs processing
     # Check if the workspace's tabs have order
-    tabs = Tab.objects.filter(workspace=workspaceDAO).order_by('position')
-    if tabs.count() > 0:
-        if tabs[0].position is not None:
-            tabs = tabs.order_by('position')
-        else:
+    tabs = list(Tab.objects.filter(workspace=workspaceDAO).select_related('workspace').order_by('position'))
+    if len(tabs) > 0:
+        if tabs[0].position is None:
             # set default order
-            for i in range(len(tabs)):
-                tabs[i].position = i
-                tabs[i].save()
+            for i, tab in enumerate(tabs):
+                tab.position = i
+                tab.save()
     else:
         tabs = [createTab(_('Tab'), workspaceDAO)]
 
-    data_ret['tabs'] = [get_tab_data(tab, workspace=workspaceDAO, cache_manager=cache_manager, user=user) for tab in tabs]
+    # Availability of the resources used by the workspace (indexed by resource id)
+    available_resources = {}
+
+    def is_available(resource):
+        if resource.id not in available_resources:
+            available_resources[resource.id] = resource.is_available_for(workspaceDAO.creator)
+        return available_resources[resource.id]
+
+    data_ret['tabs'] = []
+    for tab in tabs:
+        tab_data = _get_tab_base_data(tab)
+        tab_data['iwidgets'] = []
+        for iwidget in tab.iwidget_set.select_related('widget__resource').order_by('id'):
+            iwidget_data = _get_iwidget_base_data(iwidget)
+            if iwidget.widget is not None and is_available(iwidget.widget.resource):
+                iwidget_info = iwidget.widget.resource.get_processed_info()
+                base['iwidgets']["%s" % iwidget.id] = {
+                    'preferences': [preference['name'] for preference in iwidget_info['preferences']],
+                    'properties': [property['name'] for property in iwidget_info['properties']],
+                }
+                iwidget_data['preferences'] = placeholder('iwidget/%s/preferences' % iwidget.id)
+                iwidget_data['properties'] = placeholder('iwidget/%s/properties' % iwidget.id)
+
+            tab_data['iwidgets'].append(iwidget_data)
+
+        data_ret['tabs'].append(tab_data)
+
     data_ret['wiring'] = deepcopy(workspaceDAO.wiringStatus)
+    operators = {}
     for operator_id, operator in six.iteritems(data_ret['wiring'].get('operators', {})):
         try:
             (vendor, name, version) = operator['name'].split('/')
         except:
             continue
 
-        try:
-            resource = CatalogueResource.objects.get(vendor=vendor, short_name=name, version=version)
-            operator_info = resource.get_processed_info(process_variables=True)
-            # Check if the resource is available, if not, variables should not be retrieved
-            if not resource.is_available_for(workspaceDAO.creator):
-                raise CatalogueResource.DoesNotExist
-        except CatalogueResource.DoesNotExist:
+        operators[operator_id] = (vendor, name, version)
+
+    operator_resources = catalogue.get_resources(operators.values())
+    for operator_id, operator_uri in six.iteritems(operators):
+        operator = data_ret['wiring']['operators'][operator_id]
+        resource = operator_resources.get(operator_uri)
+
+        # Check if the resource is available, if not, variables should not be retrieved
+        if resource is None or not is_available(resource):
             operator["preferences"] = {}
             operator["properties"] = {}
             continue
 
-        operator_forced_values = forced_values['ioperator'].get(operator_id, {})
-        # Build operator preference data
-        for preference_name, preference in six.iteritems(operator.get('preferences', {})):
-            vardef = operator_info['variables']['preferences'].get(preference_name)
-            value = preference.get('value', None)
-
-            # Handle multiuser
-            variable_user = user if vardef is not None and vardef["multiuser"] else workspaceDAO.creator
-
-            if preference_name in operator_forced_values:
-                preference['value'] = operator_forced_values[preference_name]['value']
-            elif value is None or value["users"].get("%s" % variable_user.id, None) is None:
-                # If not defined / not defined for the current user, take the default value
-                preference['value'] = parse_value_from_text(vardef, vardef['default'])
-            else:
-                preference['value'] = value["users"].get("%s" % variable_user.id)
+        operator_info = resource.get_processed_info(process_variables=True)
 
-            # Secure censor
-            if vardef is not None and vardef["secure"]:
-                preference['value'] = "" if preference.get('value') is None or decrypt_value(preference.get('value')) == "" else "********"
+        base['operators'][operator_id] = {}
+        for section in ('preferences', 'properties'):
+            if section not in operator:
+                continue
 
-        # Build operator property data
-        for property_name, property in six.iteritems(operator.get('properties', {})):
-            vardef = operator_info['variables']['properties'].get(property_name)
-            value = property.get('value', None)
+            base['operators'][operator_id][section] = {
+                variable_name: operator_info['variables'][section].get(variable_name) for variable_name in operator[section]
+            }
+            operator[section] = placeholder('ioperator/%s/%s' % (operator_id, section))
 
-            # Handle multiuser
-            variable_user = user if vardef is not None and vardef["multiuser"] else workspaceDAO.creator
+    with timer('json'):
+        base['data'] = json.dumps(data_ret, cls=LazyEncoder)
 
-            if property_name in operator_forced_values:
-                property['value'] = operator_forced_values[property_name]['value']
-            elif value is None or value["users"].get("%s" % variable_user.id, None) is None:
-                # If not defined / not defined for the current user, take the default value
-                property['value'] = parse_value_from_text(vardef, vardef['default'])
-            else:
-                property['value'] = value["users"].get("%s" % variable_user.id)
+    return base
 
-            # Secure censor
-            if vardef is not None and vardef["secure"]:
-                property['value'] = "" if property.get('value') is None or decrypt_value(property.get('value')) == "" else "********"
 
-    return json.dumps(data_ret, cls=LazyEncoder)
+def _get_operator_variable_value(variable_name, variable, vardef, forced_values, user, workspace):
 
+    value = variable.get('value', None)
 
-def get_global_workspace_data(workspace, user):
-    key = _workspace_cache_key(workspace, user)
-    data = cache.get(key)
-    if data is None:
-        data = CacheableData(_get_global_workspace_data(workspace, user), timestamp=workspace.last_modified)
-        key = _workspace_cache_key(workspace, user)
-        cache.set(key, data)
+    # Handle multiuser
+    variable_user = user if vardef is not None and vardef["multiuser"] else workspace.creator
 
-    return data
+    if variable_name in forced_values:
+        value = forced_values[variable_name]['value']
+    elif value is None or value["users"].get("%s" % variable_user.id, None) is None:
+        # If not defined / not defined for the current user, take the default value
+        value = parse_value_from_text(vardef, vardef['default'])
+    else:
+        value = value["users"].get("%s" % variable_user.id)
 
+    # Secure censor
+    if vardef is not None and vardef["secure"]:
+        value = "" if is_secure_value_empty(value) else "********"
 
-def get_tab_data(tab, workspace=None, cache_manager=None, user=None):
+    return value
 
-    if workspace is None:
-        workspace = tab.workspace
 
-    if cache_manager is None:
-        cache_manager = VariableValueCacheManager(workspace, user)
+def _get_workspace_user_data(base, workspace, user):
+    """
+    Computes the values for the placeholders included in the base data of
+    the workspace for the given user.
+    """
+
+    user_data = {
+        'removable': _is_workspace_removable(workspace, user),
+    }
+
+    if len(base['iwidgets']) == 0 and len(base['operators']) == 0:
+        return user_data
+
+    forced_values = _get_forced_values(workspace, user)
+    cache_manager = VariableValueCacheManager(workspace, user, forced_values)
+
+    for iwidget_id, variables in six.iteritems(base['iwidgets']):
+        for section in ('preferences', 'properties'):
+            try:
+                section_data = {
+                    variable_name: cache_manager.get_variable_data("iwidget", iwidget_id, variable_name) for variable_name in variables[section]
+                }
+            except KeyError:
+                # Base data comes from a previous version of the workspace
+                # and the iwidget has been removed or updated since then
+                section_data = {}
+
+            user_data['iwidget/%s/%s' % (iwidget_id, section)] = section_data
+
+    operators = workspace.wiringStatus.get('operators', {})
+    for operator_id, vardefs in six.iteritems(base['operators']):
+        operator = operators.get(operator_id, {})
+        operator_forced_values = forced_values['ioperator'].get(operator_id, {})
+        for section in vardefs:
+            section_data = {}
+            for variable_name, variable in six.iteritems(operator.get(section, {})):
+                section_data[variable_name] = dict(variable)
+                section_data[variable_name]['value'] = _get_operator_variable_value(variable_name, variable, vardefs[section].get(variable_name), operator_forced_values, user, workspace)
+
+            user_data['ioperator/%s/%s' % (operator_id, section)] = section_data
+
+    return user_data
+
+
+@timed('json')
+def _merge_workspace_user_data(base, user_data):
+    placeholder_re = re.compile(r'"\$\$%s:([^"]+)\$\$"' % base['token'])
+    return placeholder_re.sub(lambda matching: json.dumps(user_data[matching.group(1)], cls=LazyEncoder), base['data'])
+
+
+def get_global_workspace_data(workspace, user, allow_stale=False):
+    """
+    Returns the data of the workspace for the given user. If ``allow_stale``
+    is ``True``, data from the previous version of the workspace can be
+    returned while other worker is building the data for the current one.
+    """
+    lang = translation.get_language()
+    key = _workspace_cache_key(workspace, lang)
+    stale_key = _workspace_stale_cache_key(workspace, lang)
+    base = get_or_rebuild(key, partial(_get_workspace_base_data, workspace, user), stale_key=stale_key, allow_stale=allow_stale)
+
+    # Building the base data can modify the workspace (e.g. when creating the
+    # initial tab), so the key has to be recalculated
+    new_key = _workspace_cache_key(workspace, lang)
+    if new_key != key:
+        cache.set(new_key, base)
+
+    # The final data depends on the user, so it is not cached (nor
+    # precompressed) for keeping the cache size independent of the number of
+    # users accessing the workspace
+    user_data = _get_workspace_user_data(base, workspace, user)
+    etag = _workspace_etag(workspace.id, base['version'], user, 'workspace')
+    return CacheableData(_merge_workspace_user_data(base, user_data), timestamp=base['timestamp'], etag=etag)
+
+
+def _get_tab_base_data(tab):
 
     return {
         'id': "%s" % tab.id,
@@ -561,13 +928,26 @@ def get_tab_data(tab, workspace=None, cache_manager=None, user=None):
         'title': tab.title,
         'visible': tab.visible,
         'preferences': get_tab_preference_values(tab),
-        'iwidgets': [get_iwidget_data(widget, workspace, cache_manager, user) for widget in tab.iwidget_set.order_by('id')]
     }
 
 
-def get_iwidget_data(iwidget, workspace, cache_manager=None, user=None):
+def get_tab_data(tab, workspace=None, cache_manager=None, user=None):
+
+    if workspace is None:
+        workspace = tab.workspace
+
+    if cache_manager is None:
+        cache_manager = VariableValueCacheManager(workspace, user)
+
+    data_ret = _get_tab_base_data(tab)
+    data_ret['iwidgets'] = [get_iwidget_data(widget, workspace, cache_manager, user) for widget in tab.iwidget_set.order_by('id')]
 
-    data_ret = {
+    return data_ret
+
+
+def _get_iwidget_base_data(iwidget):
+
+    return {
         'id': "%s" % iwidget.id,
         'title': iwidget.name,
         'tab': iwidget.tab.id,
@@ -587,6 +967,11 @@ def get_iwidget_data(iwidget, workspace, cache_manager=None, user=None):
         'properties': {},
     }
 
+
+def get_iwidget_data(iwidget, workspace, cache_manager=None, user=None):
+
+    data_ret = _get_iwidget_base_data(iwidget)
+
     if iwidget.widget is None or not iwidget.widget.resource.is_available_for(workspace.creator):
         # The widget used by this iwidget is missing
         return data_ret
@@ -25,16 +25,20 @@ import os
 import zipfile
 
 from django.db import IntegrityError
+from django.db.models import Case, IntegerField, Value, When
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import translation
 from django.utils.translation import ugettext as _
 from six import string_types
 
 from wirecloud.catalogue import utils as catalogue
 from wirecloud.catalogue.models import CatalogueResource
 from wirecloud.commons.baseviews import Resource, Service
+from wirecloud.commons.utils.cache import get_not_modified_response, get_version_etag, patch_cache_headers
 from wirecloud.commons.utils.db import save_alternative
-from wirecloud.commons.utils.http import authentication_required, authentication_required_cond, build_error_response, get_content_type, normalize_boolean_param, consumes, parse_json_request, produces
+from wirecloud.commons.utils.encoding import iterencode_list
+from wirecloud.commons.utils.http import authentication_required, authentication_required_cond, build_error_response, build_json_collection_response, get_content_type, normalize_boolean_param, consumes, parse_json_request, produces
 from wirecloud.commons.utils.template import is_valid_name, is_valid_vendor, is_valid_version, TemplateParser
 from wirecloud.commons.utils.transaction import commit_on_http_success
 from wirecloud.commons.utils.urlify import URLify
@@ -45,7 +49,7 @@ from wirecloud.platform.settings import ALLOW_ANONYMOUS_ACCESS
 from wirecloud.platform.wiring.utils import get_wiring_skeleton
 from wirecloud.platform.workspace.mashupTemplateGenerator import build_json_template_from_workspace, build_xml_template_from_workspace
 from wirecloud.platform.workspace.mashupTemplateParser import check_mashup_dependencies, buildWorkspaceFromTemplate, fillWorkspaceUsingTemplate, MissingDependencies
-from wirecloud.platform.workspace.utils import deleteTab, createTab, get_tab_data, get_workspace_list, get_workspace_data, get_global_workspace_data, setVisibleTab, delete_workspace
+from wirecloud.platform.workspace.utils import deleteTab, createTab, filter_workspace_list, get_tab_data, get_workspace_list, get_workspace_list_versions, iter_workspace_list_data, get_global_workspace_data, get_workspace_etag, setVisibleTab, delete_workspace
 from wirecloud.platform.markets.utils import get_local_catalogue
 
 
@@ -72,10 +76,57 @@ class WorkspaceCollection(Resource):
     @commit_on_http_success
     def read(self, request):
 
-        workspaces = get_workspace_list(request.user)
-        data_list = [get_workspace_data(workspace, request.user) for workspace in workspaces]
-
-        return HttpResponse(json.dumps(data_list, sort_keys=True), content_type='application/json; charset=UTF-8')
+        owner = request.GET.get('owner', '').strip()
+        search = request.GET.get('search', '').strip()
+        shared = request.GET.get('shared')
+        public = request.GET.get('public')
+        workspaces = filter_workspace_list(
+            get_workspace_list(request.user),
+            owner=owner if owner != '' else None,
+            shared=normalize_boolean_param(request, 'shared', shared) if shared is not None else None,
+            public=normalize_boolean_param(request, 'public', public) if public is not None else None,
+            search=search if search != '' else None,
+        )
+
+        fields = request.GET.get('fields', '').strip()
+        fields = set(field.strip() for field in fields.split(',')) if fields != '' else None
+
+        # Cursor pagination, the cursor is the id of the last returned workspace
+        limit = request.GET.get('limit')
+        next_cursor = None
+        if limit is not None:
+            try:
+                limit = int(limit)
+                cursor = int(request.GET.get('cursor', 0))
+            except ValueError:
+                return build_error_response(request, 422, _('Invalid pagination parameters'))
+
+            if limit < 1 or cursor < 0:
+                return build_error_response(request, 422, _('Invalid pagination parameters'))
+
+            workspaces = workspaces.filter(id__gt=cursor)
+
+        # The ETag is computed from the version of the listed workspaces, so
+        # conditional requests are answered without building the list
+        versions = get_workspace_list_versions(workspaces, limit=limit + 1 if limit is not None else None)
+        if limit is not None and len(versions) > limit:
+            versions = versions[:limit]
+            next_cursor = versions[-1][0]
+            workspaces = workspaces.filter(id__lte=next_cursor)
+
+        etag = get_version_etag(request.user.id, translation.get_language(), sorted(request.GET.lists()), versions)
+        not_modified_response = get_not_modified_response(request, etag)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        data = iter_workspace_list_data(workspaces.iterator(), request.user, fields=fields)
+        response = build_json_collection_response(iterencode_list(data), len(versions), etag=etag)
+        if next_cursor is not None:
+            params = request.GET.copy()
+            params['cursor'] = next_cursor
+            response['Link'] = '<%s>; rel="next"' % request.build_absolute_uri(request.path + '?' + params.urlencode())
+
+        return response
 
     @authentication_required
     @consumes(('application/json',))
@@ -189,9 +240,16 @@ class WorkspaceEntry(Resource):
         if not workspace.is_available_for(request.user):
             return build_error_response(request, 403, _("You don't have permission to access this workspace"))
 
-        workspace_data = get_global_workspace_data(workspace, request.user)
+        not_modified_response = get_not_modified_response(request, get_workspace_etag(workspace, request.user), workspace.last_modified)
+        if not_modified_response is not None:
+            return not_modified_response
+
+        # Users not allowed to edit the workspace can be served the previous
+        # version of the workspace while it is being rebuilt
+        allow_stale = not (request.user.is_superuser or workspace.creator == request.user)
+        workspace_data = get_global_workspace_data(workspace, request.user, allow_stale=allow_stale)
 
-        return workspace_data.get_response()
+        return workspace_data.get_response(request=request)
 
     @authentication_required
     @consumes(('application/json',))
@@ -283,11 +341,13 @@ class TabOrderService(Service):
 
         order = parse_json_request(request)
 
-        tabs = Tab.objects.filter(id__in=order)
+        # Update the position of all the tabs using a single query
+        positions = [When(pk=tab_id, then=Value(position)) for position, tab_id in enumerate(order)]
+        if len(positions) > 0:
+            Tab.objects.filter(workspace=workspace, id__in=order).update(position=Case(*positions, output_field=IntegerField()))
 
-        for tab in tabs:
-            tab.position = order.index(tab.id)
-            tab.save()
+        # Invalidate workspace cache
+        workspace.save()
 
         return HttpResponse(status=204)
 
@@ -302,8 +362,14 @@ class TabEntry(Resource):
         if not tab.workspace.is_available_for(request.user):
             return build_error_response(request, 403, _("You don't have permission to access this workspace"))
 
+        etag = get_workspace_etag(tab.workspace, request.user, 'tab/%s' % tab.id)
+        not_modified_response = get_not_modified_response(request, etag, tab.workspace.last_modified)
+        if not_modified_response is not None:
+            return not_modified_response
+
         data = json.dumps(get_tab_data(tab, user=request.user), sort_keys=True)
-        return HttpResponse(data, status=200, content_type='application/json; charset=UTF-8')
+        response = HttpResponse(data, status=200, content_type='application/json; charset=UTF-8')
+        return patch_cache_headers(response, tab.workspace.last_modified, etag=etag)
 
     @authentication_required
     @consumes(('application/json',))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017 CoNWeT Lab., Universidad Politécnica de Madrid
+
+# This file is part of Wirecloud.
+
+# Wirecloud is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# Wirecloud is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+
+# You should have received a copy of the GNU Affero General Public License
+# along with Wirecloud.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.urlresolvers import get_resolver
+from django.core.wsgi import get_wsgi_application as django_get_wsgi_application
+
+
+def warm_up():
+    """
+    Loads the WireCloud plugins and fills the registries and caches derived
+    from them (scripts, styles, url patterns, context definitions, themes,
+    bundle manifests, ...). This avoids paying this cost on the first
+    requests served by each process.
+
+    Raises ``ImproperlyConfigured`` if compression is enabled and the bundle
+    manifest is missing or outdated.
+    """
+
+    from wirecloud.platform import plugins
+    from wirecloud.platform.bundles import get_bundle_manifest, PLATFORM_VIEWS
+    from wirecloud.platform.context.utils import get_platform_context_definitions, get_workspace_context_definitions, _get_platform_context_plugins
+    from wirecloud.platform.i18n import get_javascript_catalog_path
+    from wirecloud.platform.themes import get_theme_registry
+
+    plugins.get_plugins()
+    plugins.get_active_features_hash()
+    plugins.get_api_auth_backends()
+    plugins.get_constants()
+    plugins.get_proxy_processors()
+
+    for view in PLATFORM_VIEWS:
+        plugins.get_extra_javascripts(view)
+        plugins.get_platform_css(view)
+
+    get_platform_context_definitions()
+    get_workspace_context_definitions()
+    _get_platform_context_plugins()
+
+    get_theme_registry()
+
+    # Import the url patterns (including the ones provided by plugins) and
+    # build the reverse lookup tables
+    get_resolver().reverse_dict
+
+    get_javascript_catalog_path(settings.LANGUAGE_CODE)
+    if settings.COMPRESS_ENABLED:
+        get_bundle_manifest()
+
+
+def get_wsgi_application():
+    """
+    Returns the Django WSGI application after warming up WireCloud, so the
+    initialization is done at load time (and before forking the workers when
+    using servers preloading the application).
+    """
+
+    application = django_get_wsgi_application()
+    warm_up()
+    return application
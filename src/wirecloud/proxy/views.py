@@ -35,6 +35,7 @@ from django.utils.encoding import iri_to_uri
 from django.utils.translation import ugettext as _
 
 from wirecloud.commons.utils.http import build_error_response, get_current_domain
+from wirecloud.commons.utils.timing import timer
 from wirecloud.platform.models import Workspace
 from wirecloud.platform.plugins import get_request_proxy_processors, get_response_proxy_processors
 from wirecloud.proxy.utils import is_valid_response_header, ValidationError
@@ -202,7 +203,8 @@ class Proxy():
 
         # Open the request
         try:
-            res = requests.request(request_data['method'], request_data['url'], headers=request_data['headers'], data=request_data['data'], stream=True, verify=getattr(settings, 'WIRECLOUD_HTTPS_VERIFY', True))
+            with timer('proxy'):
+                res = requests.request(request_data['method'], request_data['url'], headers=request_data['headers'], data=request_data['data'], stream=True, verify=getattr(settings, 'WIRECLOUD_HTTPS_VERIFY', True))
         except requests.exceptions.Timeout as e:
             return build_error_response(request, 504, _('Gateway Timeout'), details=six.text_type(e))
         except requests.exceptions.SSLError as e: